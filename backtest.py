@@ -0,0 +1,82 @@
+import time
+import argparse
+import pandas as pd
+from backtesting import Backtester, BacktestResult, load_bars, resample_bars
+from bot_strategies import __batch_strategies__
+
+APP_NAME = f"WHATEVER FX-BOT BACKTEST"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=APP_NAME)
+
+    # mandatory CLI arguments
+    parser.add_argument('data', type=str, metavar='data', help='Path to CSV / Parquet file of historical bars (time, open, high, low, close), \
+        or to a <symbol>/<timeframe> directory of a bar store (see --bar_store of main.py)')
+
+    parser.add_argument('--timeframe', type=str, default=None, metavar='', help='Timeframe the bars are resampled to before backtesting \
+        (eg: M15 or H4 from M1 bars), the bars are used as they are if not set')
+    parser.add_argument('--volume', type=float, default=1.0, metavar='', help='Volume to trade')
+    parser.add_argument('--unit_pip', type=float, default=1e-5, metavar='', help='Value of 1 pip for symbol (necessary parameter if ATR is set to 0 (False))')
+    parser.add_argument('--use_atr', action='store_true', help='Use Average True Return (ATR) to compute stop loss, trail, \
+        take profit and sr_threshold. Note that when set to True, the unit_pip value will be set to the most recent ATR value')
+    parser.add_argument('--atr_period', type=int, default=5, metavar='', help='period of past timestamps to use for computing ATR value')
+    parser.add_argument('--default_sl', type=float, default=4.0, metavar='', help='Default stop loss value (in pip / ATR)')
+    parser.add_argument('--max_sl_dist', type=float, default=4.0, metavar='', help='Maximum distance between current price and stop loss (in pip / ATR)')
+    parser.add_argument('--sl_trail', type=float, default=0.0, metavar='', help='Stop loss trail value (in pip / ATR)')
+    parser.add_argument('--default_tp', type=float, default=8.0, metavar='', help='Take profit value (in pip / ATR)')
+    parser.add_argument('--strategy', type=str, default='composite', choices=list(__batch_strategies__.keys()), metavar='', help='Strategy to use: Options(engulf, rejection, composite)')
+    parser.add_argument('--sr_likelihood', type=float, default=0.8, metavar='', help='likelihood score for support / resistance indicator utilisation.\
+        When set to 1 or close to 1, the bot will only pick the relevant signals only at supports and resistances, and the opposite when set to 0')
+    parser.add_argument('--sr_threshold', type=float, default=3.0, metavar='', help='Threshold distance (in pips / ATR) between candle stick that triggered a signal\
+        and the corresponding support / resistance line the signal was picked')
+    parser.add_argument('--sr_period', type=int, default=60, metavar='', help='period of past timestamps to use for computing the support and resistance levels')
+    parser.add_argument('--use_trendline', action='store_true', help='Base trades on EMA trendline. Inotherwords, take long trades above trendline and short trades below tendline')
+    parser.add_argument('--trendline_period', type=int, default=10, metavar='', help='EMA Trendline Period')
+    parser.add_argument('--spread', type=float, default=0.0, metavar='', help='Spread in price units, added to buy entries and sell exits')
+    parser.add_argument('--contract_size', type=float, default=100_000.0, metavar='', help='Units of the base asset in 1 lot')
+    parser.add_argument('--starting_equity', type=float, default=10_000.0, metavar='', help='Starting equity / balance')
+    parser.add_argument('--seed', type=int, default=None, metavar='', help='Seed for the support / resistance likelihood random draws')
+    parser.add_argument('--trades_out', type=str, default=None, metavar='', help='Path to write the trade list to (CSV)')
+    parser.add_argument('--equity_out', type=str, default=None, metavar='', help='Path to write the equity curve to (CSV)')
+    args = parser.parse_args()
+
+    _start = time.time()
+    bars:pd.DataFrame = load_bars(args.data)
+    if args.timeframe: bars = resample_bars(bars, args.timeframe)
+    backtester:Backtester = Backtester(
+        bars, spread=args.spread, contract_size=args.contract_size, starting_equity=args.starting_equity
+    )
+    result:BacktestResult = backtester.run(
+        strategy=args.strategy,
+        volume=args.volume,
+        unit_pip=args.unit_pip,
+        use_atr=args.use_atr,
+        atr_period=args.atr_period,
+        default_sl=args.default_sl,
+        max_sl_dist=args.max_sl_dist,
+        sl_trail=args.sl_trail,
+        default_tp=args.default_tp,
+        sr_likelihood=args.sr_likelihood,
+        sr_threshold=args.sr_threshold,
+        sr_period=args.sr_period,
+        use_trendline=args.use_trendline,
+        trendline_period=args.trendline_period,
+        seed=args.seed
+    )
+    summary:dict = result.summary()
+
+    print(APP_NAME, '\n')
+    print(f'Bars:                   {len(backtester)}')
+    print(f'Strategy:               {args.strategy}')
+    print(f'Trades:                 {summary["trades"]}')
+    print(f'Win rate:               {round(summary["win_rate"], 2)}%')
+    print(f'Total Profit:           {round(summary["total_profit"], 2)}')
+    print(f'Profit factor:          {round(summary["profit_factor"], 4)}')
+    print(f'Max drawdown:           {round(summary["max_drawdown"], 2)}')
+    print(f'Final equity:           {round(summary["final_equity"], 2)}')
+    print(f'% Return:               {round(summary["return_pct"], 4)}%')
+    print(f'Run time:               {round(time.time() - _start, 2)} seconds')
+
+    if args.trades_out: result.trades.to_csv(args.trades_out, index=False)
+    if args.equity_out: result.equity.to_csv(args.equity_out)
@@ -0,0 +1,548 @@
+import math
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+from bot_strategies import (
+    __batch_strategies__,
+    SupportResistance
+)
+from brokers import RATES_DTYPE, parse_timeframe, resample_rates
+from utils import BarStore
+
+TRADE_COLUMNS:List[str] = [
+    'entry_time', 'exit_time', 'direction', 'volume', 'entry_price', 
+    'exit_price', 'sl', 'tp', 'exit_reason', 'profit'
+]
+
+
+def load_bars(path:str) -> pd.DataFrame:
+    r"""
+    loads historical OHLC bars from a local CSV or Parquet file. Column names are
+    case insensitive and may be wrapped in "<>" like the MetaTrader5 history export,
+    separate date and time columns are merged into one
+
+    parameters
+    -------------
+    path: (str) - path to a .csv or .parquet file with at least time, open, high,
+    low and close columns, or to the <root>/<symbol>/<timeframe> directory of a BarStore
+
+    returns
+    -------------
+    returns a dataframe sorted by time, with time as unix timestamp (seconds), 
+    in the same layout as MetaTrader5.copy_rates_range
+    """
+    if BarStore.is_store(path): return BarStore.open(path).to_frame()
+
+    if path.endswith('.parquet'):
+        df:pd.DataFrame = pd.read_parquet(path)
+    else:
+        df:pd.DataFrame = pd.read_csv(path, sep=None, engine='python')
+
+    df.columns = [str(col).strip('<>').lower() for col in df.columns]
+    if 'date' in df.columns and 'time' in df.columns:
+        df['time'] = df['date'].astype(str) + ' ' + df['time'].astype(str)
+        df = df.drop(columns='date')
+    elif 'date' in df.columns:
+        df = df.rename(columns={'date':'time'})
+
+    missing:List[str] = [col for col in ('time', 'open', 'high', 'low', 'close') if col not in df.columns]
+    assert len(missing) == 0, f'{path} is missing the columns {missing}'
+
+    if not pd.api.types.is_numeric_dtype(df['time']):
+        df['time'] = pd.to_datetime(df['time']).astype('datetime64[s]').astype(np.int64)
+
+    return df.sort_values('time').reset_index(drop=True)
+
+
+def load_ticks(path:str) -> pd.DataFrame:
+    r"""
+    loads recorded ticks from a local CSV or Parquet file. Column names are case
+    insensitive and may be wrapped in "<>" like the MetaTrader5 tick export, separate
+    date and time columns are merged into one, and the bid / ask prices that the
+    export leaves empty (unchanged) are carried forward
+
+    parameters
+    -------------
+    path: (str) - path to a .csv or .parquet file with a time_msc or time column and
+    at least a bid column
+
+    returns
+    -------------
+    returns a dataframe sorted by time, with time (seconds) and time_msc (milliseconds)
+    as unix timestamps, in the same layout as MetaTrader5.copy_ticks_range
+    """
+    if path.endswith('.parquet'):
+        df:pd.DataFrame = pd.read_parquet(path)
+    else:
+        df:pd.DataFrame = pd.read_csv(path, sep=None, engine='python')
+
+    df.columns = [str(col).strip('<>').lower() for col in df.columns]
+    if 'date' in df.columns and 'time' in df.columns:
+        df['time'] = df['date'].astype(str) + ' ' + df['time'].astype(str)
+        df = df.drop(columns='date')
+    elif 'date' in df.columns:
+        df = df.rename(columns={'date':'time'})
+
+    assert 'bid' in df.columns and ('time' in df.columns or 'time_msc' in df.columns), \
+        f'{path} needs a bid column and a time or time_msc column'
+
+    if 'time_msc' not in df.columns:
+        if pd.api.types.is_numeric_dtype(df['time']):
+            df['time_msc'] = (df['time'] * 1000).round().astype(np.int64)
+        else:
+            df['time_msc'] = pd.to_datetime(df['time']).astype('datetime64[ms]').astype(np.int64)
+    df['time'] = df['time_msc'] // 1000
+
+    df = df.sort_values('time_msc', kind='stable').reset_index(drop=True)
+    quotes:List[str] = [col for col in ('bid', 'ask') if col in df.columns]
+    df[quotes] = df[quotes].ffill()
+    others:List[str] = [col for col in ('last', 'volume', 'flags', 'volume_real') if col in df.columns]
+    df[others] = df[others].fillna(0)
+    return df.dropna(subset=['bid']).reset_index(drop=True)
+
+
+def resample_bars(df:pd.DataFrame, timeframe:str) -> pd.DataFrame:
+    r"""
+    resamples bars to a higher timeframe (eg: M15 bars from M1 bars), see
+    brokers.resample_rates
+
+    parameters
+    -------------
+    df: (pd.DataFrame) - bars returned by load_bars
+
+    timeframe: (str) - name of the new timeframe (eg: M15, H4), a multiple of the
+    bars' timeframe
+
+    returns
+    -------------
+    returns a new dataframe in the same layout as load_bars
+    """
+    rates:np.ndarray = np.zeros(len(df), dtype=RATES_DTYPE)
+    for col in RATES_DTYPE.names:
+        if col in df.columns: rates[col] = df[col].to_numpy()
+    return pd.DataFrame(resample_rates(rates, parse_timeframe(timeframe)))
+
+
+def rolling_atr(high:np.ndarray, low:np.ndarray, close:np.ndarray, period:int) -> np.ndarray:
+    r"""
+    computes compute_latest_atr for every window of `period` candles in one pass,
+    the first candle of each window only contributes its high - low range, the
+    same way it does in compute_latest_atr
+
+    parameters
+    -------------
+    high: (numpy.ndarray) - high prices
+
+    low: (numpy.ndarray) - low prices
+
+    close: (numpy.ndarray) - close prices
+
+    period: (int) - number of candles in each window
+
+    returns
+    -------------
+    returns an array where index i holds the ATR of candles i-period+1 to i, 
+    (NaN where there are fewer than `period` candles)
+    """
+    high, low, close = [np.asarray(x, dtype=np.float64) for x in (high, low, close)]
+    atr:np.ndarray = np.full(len(close), np.nan)
+    if period < 1 or len(close) < period: return atr
+
+    hl_range:np.ndarray = high - low
+    true_range:np.ndarray = hl_range.copy()
+    true_range[1:] = np.fmax(
+        hl_range[1:], np.fmax(np.abs(high[1:] - close[:-1]), np.abs(low[1:] - close[:-1]))
+    )
+    cumsum:np.ndarray = np.concatenate(([0.0], np.cumsum(true_range)))
+
+    idxs:np.ndarray = np.arange(period - 1, len(close))
+    starts:np.ndarray = idxs - period + 1
+    atr[idxs] = (hl_range[starts] + cumsum[idxs + 1] - cumsum[starts + 1]) / period
+    return atr
+
+
+class BacktestResult:
+    r"""
+    Trades and equity curve of a backtest run
+
+    parameters
+    -------------
+    trades: (pandas.core.frame.DataFrame) - one row per closed trade
+
+    equity: (pandas.core.series.Series) - account equity (balance + floating profit)
+    at the close of every bar
+
+    starting_equity: (float) - starting equity / balance of the run
+    """
+    def __init__(self, trades:pd.DataFrame, equity:pd.Series, starting_equity:float):
+        self.trades:pd.DataFrame = trades
+        self.equity:pd.Series = equity
+        self.starting_equity:float = starting_equity
+
+    def summary(self) -> Dict[str, float]:
+        r"""
+        summary statistics of the run
+
+        returns
+        -------------
+        returns a dictionary of statistics
+        """
+        profits:np.ndarray = self.trades['profit'].to_numpy()
+        gains:float = float(profits[profits > 0].sum())
+        losses:float = float(-profits[profits < 0].sum())
+
+        equity:np.ndarray = self.equity.to_numpy()
+        final_equity:float = float(equity[-1]) if len(equity) > 0 else self.starting_equity
+        drawdown:np.ndarray = np.maximum.accumulate(equity) - equity if len(equity) > 0 else np.zeros(1)
+
+        return {
+            'trades': len(profits),
+            'win_rate': float((profits > 0).mean() * 100) if len(profits) > 0 else 0.0,
+            'total_profit': float(profits.sum()),
+            'profit_factor': gains / losses if losses > 0 else np.inf,
+            'max_drawdown': float(drawdown.max()),
+            'final_equity': final_equity,
+            'return_pct': (final_equity - self.starting_equity) / self.starting_equity * 100,
+        }
+
+
+class Backtester:
+    r"""
+    Replays historical bars through the same strategies, support / resistance,
+    trendline and ATR logic as the live bot (main.py). Signals are generated for
+    the whole history in one vectorized pass and the bar by bar event loop only 
+    runs while positions are open.
+
+    A decision is made at the open of every bar from the candles closed before it,
+    orders fill at that open price (plus spread for buys). Stop loss and take profit
+    are checked against each bar's high and low (the stop loss first, if both are
+    hit in the same bar) and the trailing stop loss rules of trail_sl are applied 
+    at each bar close.
+
+    parameters
+    -------------
+    df: (pandas.core.frame.DataFrame) - bars with time, open, high, low and close 
+    columns (bid prices)
+
+    spread: (float) - spread in price units, added to buy entries and sell exits
+
+    contract_size: (float) - units of the base asset in 1 lot
+
+    starting_equity: (float) - starting equity / balance
+    """
+    def __init__(
+        self, df:pd.DataFrame, spread:float=0.0, contract_size:float=100_000.0, 
+        starting_equity:float=10_000.0):
+
+        self._set_bars(
+            df['time'].to_numpy(),
+            df['open'].to_numpy(dtype=np.float64),
+            df['high'].to_numpy(dtype=np.float64),
+            df['low'].to_numpy(dtype=np.float64),
+            df['close'].to_numpy(dtype=np.float64)
+        )
+        self.spread:float = spread
+        self.contract_size:float = contract_size
+        self.starting_equity:float = starting_equity
+
+        # cached per parameter value, so that repeated runs (parameter
+        # sweeps) do not recompute them
+        self._signals:Dict[str, Tuple[np.ndarray, np.ndarray]] = {}
+        self._atrs:Dict[int, np.ndarray] = {}
+        self._emas:Dict[int, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    @classmethod
+    def from_arrays(
+        cls, time:np.ndarray, open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray, 
+        **kwargs) -> "Backtester":
+        r"""
+        creates a backtester on existing bar arrays without copying them (eg: arrays
+        backed by shared memory)
+
+        parameters
+        -------------
+        time, open, high, low, close: (np.ndarray) - bar columns, the prices as float64
+
+        the keyword arguments are those of Backtester
+
+        returns
+        -------------
+        returns a Backtester
+        """
+        backtester:Backtester = cls(pd.DataFrame(columns=['time', 'open', 'high', 'low', 'close']), **kwargs)
+        backtester._set_bars(time, open, high, low, close)
+        return backtester
+
+    def _set_bars(
+        self, time:np.ndarray, open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> None:
+        self.time:np.ndarray = time
+        self.open:np.ndarray = open
+        self.high:np.ndarray = high
+        self.low:np.ndarray = low
+        self.close:np.ndarray = close
+
+    def signals(self, strategy:str) -> Tuple[np.ndarray, np.ndarray]:
+        r"""
+        buy and sell signal masks of a strategy over the whole history
+
+        parameters
+        -------------
+        strategy: (str) - key of the strategy in __batch_strategies__
+
+        returns
+        -------------
+        returns a Tuple of the buy and sell boolean masks
+        """
+        if strategy not in self._signals:
+            ohlc:Tuple[np.ndarray, ...] = (self.open, self.high, self.low, self.close)
+            self._signals[strategy] = (
+                __batch_strategies__[strategy]['buy'](*ohlc),
+                __batch_strategies__[strategy]['sell'](*ohlc)
+            )
+        return self._signals[strategy]
+
+    def atr(self, period:int) -> np.ndarray:
+        r"""
+        ATR of every window of `period` candles (see rolling_atr)
+        """
+        if period not in self._atrs:
+            self._atrs[period] = rolling_atr(self.high, self.low, self.close, period)
+        return self._atrs[period]
+
+    def ema(self, period:int) -> np.ndarray:
+        r"""
+        EMA trendline of the close prices, as computed by TrendLines.append_ema
+        """
+        if period not in self._emas:
+            self._emas[period] = pd.Series(self.close).ewm(span=period, adjust=True).mean().to_numpy()
+        return self._emas[period]
+
+    def run(
+        self, 
+        strategy:str='composite', 
+        volume:float=1.0, 
+        unit_pip:float=1e-5, 
+        use_atr:bool=False, 
+        atr_period:int=5, 
+        default_sl:float=4.0, 
+        max_sl_dist:float=4.0, 
+        sl_trail:float=0.0, 
+        default_tp:float=8.0, 
+        sr_likelihood:float=0.8, 
+        sr_threshold:float=3.0, 
+        sr_period:int=60, 
+        use_trendline:bool=False, 
+        trendline_period:int=10,
+        seed:Optional[int]=None) -> BacktestResult:
+        r"""
+        runs the backtest, the parameters are the same as the options of main.py
+
+        parameters
+        -------------
+        seed: (int, None) - seed for the random draws of the support / resistance
+        likelihood (default=None)
+
+        returns
+        -------------
+        returns a BacktestResult of the run
+        """
+        assert strategy in __batch_strategies__, f'{strategy} is an invalid strategy'
+
+        n:int = len(self)
+        multiplier:np.ndarray = self.atr(atr_period) if use_atr else np.full(n, unit_pip)
+        buy_mask, sell_mask = self.signals(strategy)
+
+        if use_trendline:
+            ema:np.ndarray = self.ema(trendline_period)
+            buy_mask = buy_mask & (self.close > ema)
+            sell_mask = sell_mask & (self.close < ema)
+
+        # a decision needs enough closed candles for the ATR and S/R windows and
+        # a following bar to enter on
+        warmup:int = max(atr_period, sr_period, 2)
+        decidable:np.ndarray = np.zeros(n, dtype=bool)
+        decidable[warmup-1:n-1] = True
+        decidable &= ~np.isnan(multiplier)
+
+        candidates:np.ndarray = np.flatnonzero((buy_mask | sell_mask) & decidable)
+        entries:List[Tuple[int, int]] = self._filter_sr(
+            candidates, buy_mask, sell_mask, multiplier, sr_likelihood, sr_threshold, sr_period, 
+            np.random.default_rng(seed)
+        )
+        return self._simulate(entries, multiplier, volume, default_sl, max_sl_dist, sl_trail, default_tp)
+
+    def _filter_sr(
+        self, candidates:np.ndarray, buy_mask:np.ndarray, sell_mask:np.ndarray, multiplier:np.ndarray,
+        sr_likelihood:float, sr_threshold:float, sr_period:int, 
+        rng:np.random.Generator, n1:int=2, n2:int=2) -> List[Tuple[int, int]]:
+        # applies rand_at_support / rand_at_resistance to the signal candles and
+        # returns (entry bar, direction) pairs. Whether a candle is a pivot only
+        # depends on its n1 + n2 neighbours, so the pivots are found once over the
+        # whole history and each S/R window just selects the ones inside it
+        entries:List[Tuple[int, int]] = []
+        if len(candidates) == 0: return entries
+
+        starts:np.ndarray = np.maximum(0, candidates - sr_period + 1)
+        ranges:np.ndarray = self.high - self.low
+        range_cumsum:np.ndarray = np.concatenate(([0.0], np.nancumsum(ranges)))
+        count_cumsum:np.ndarray = np.concatenate(([0], np.cumsum(~np.isnan(ranges))))
+        with np.errstate(divide='ignore', invalid='ignore'):
+            thresholds:np.ndarray = (
+                (range_cumsum[candidates + 1] - range_cumsum[starts]) / 
+                (count_cumsum[candidates + 1] - count_cumsum[starts])
+            )
+
+        pivot_windows:Dict[int, Tuple[List[float], List[int], List[int]]] = {}
+        for direction, values in ((1, self.low), (-1, self.high)):
+            pivots:np.ndarray = np.flatnonzero(SupportResistance.pivot_mask(values, n1, n2, support=(direction == 1)))
+            pivot_windows[direction] = (
+                values[pivots].tolist(),
+                np.searchsorted(pivots, starts + n1, side='left').tolist(),
+                np.searchsorted(pivots, candidates - n2, side='right').tolist()
+            )
+
+        for c_idx, i in enumerate(candidates.tolist()):
+            candle:Tuple[float, ...] = (self.open[i], self.high[i], self.low[i], self.close[i])
+
+            for direction, mask in ((1, buy_mask), (-1, sell_mask)):
+                if not mask[i]: continue
+                if rng.random() < sr_likelihood:
+                    values, lo, hi = pivot_windows[direction]
+                    pivot_values:List[float] = values[lo[c_idx]:hi[c_idx]]
+                    levels, _ = SupportResistance.boundary_trimer(
+                        pivot_values, list(range(len(pivot_values))), thresholds[c_idx]
+                    )
+                    near_level = (
+                        SupportResistance.candle_near_support if direction == 1 
+                        else SupportResistance.candle_near_resistance
+                    )
+                    if not near_level(levels, *candle, sr_threshold * multiplier[i]): continue
+
+                entries.append((i + 1, direction))
+                break
+
+        return entries
+
+    @staticmethod
+    def _trail(
+        direction:int, price:float, open_price:float, sl:float, default_sl_points:float, 
+        max_dist_sl:float, trail_amount:float) -> float:
+        # trail_sl is called many times per bar in the live loop, each call moving
+        # the stop loss by one trail_amount step, so the steps are applied here until
+        # the stop loss is within max_dist_sl of the price
+        if trail_amount == 0 or not abs(round(price - sl, 6)) > max_dist_sl: return sl
+
+        if sl == 0:
+            sl = open_price - direction * default_sl_points
+            if not abs(round(price - sl, 6)) > max_dist_sl: return sl
+
+        gap:float = direction * (price - sl)
+        steps:int = math.ceil((gap - max_dist_sl) / trail_amount) if (gap > 0 and trail_amount > 0) else 1
+        new_sl:float = sl + direction * trail_amount * steps
+
+        # the broker rejects a stop loss on the wrong side of the price
+        if direction * (price - new_sl) <= 0: 
+            steps = math.ceil(gap / trail_amount) - 1 if trail_amount > 0 else 0
+            new_sl = sl + direction * trail_amount * max(steps, 0)
+        return new_sl
+
+    def _simulate(
+        self, entries:List[Tuple[int, int]], multiplier:np.ndarray, volume:float, default_sl:float, 
+        max_sl_dist:float, sl_trail:float, default_tp:float) -> BacktestResult:
+
+        n:int = len(self)
+        spread:float = self.spread
+        units:float = volume * self.contract_size
+        opens, highs, lows, closes = (
+            self.open.tolist(), self.high.tolist(), self.low.tolist(), self.close.tolist()
+        )
+        mults:List[float] = multiplier.tolist()
+
+        realized:np.ndarray = np.zeros(n)
+        floating:np.ndarray = np.zeros(n)
+        trades:List[list] = []
+
+        # open positions: [direction, entry bar, entry price, sl, tp]
+        positions:List[list] = []
+        k:int = 0
+        j:int = entries[0][0] if entries else n
+
+        def close_position(position:list, exit_bar:int, exit_price:float, reason:str) -> None:
+            direction, entry_bar, entry_price, sl, tp = position
+            profit:float = (exit_price - entry_price) * direction * units
+            realized[exit_bar] += profit
+            trades.append([
+                entry_bar, exit_bar, 'buy' if direction == 1 else 'sell', volume, 
+                entry_price, exit_price, sl, tp, reason, profit
+            ])
+
+        while j < n:
+            o, h, l, c = opens[j], highs[j], lows[j], closes[j]
+
+            # open positions at the bar open, with the stops of make_trade
+            while k < len(entries) and entries[k][0] == j:
+                direction:int = entries[k][1]
+                price:float = o + spread if direction == 1 else o
+                sl_points:float = default_sl * mults[j-1]
+                tp_points:float = default_tp * mults[j-1]
+                sl:float = price - direction * sl_points if sl_points != 0 else 0.0
+                tp:float = price + direction * tp_points if tp_points != 0 else 0.0
+                positions.append([direction, j, price, sl, tp])
+                k += 1
+
+            survivors:List[list] = []
+            for position in positions:
+                direction, _, entry_price, sl, tp = position
+
+                if direction == 1:
+                    # long positions close at the bid
+                    if sl != 0 and l <= sl: 
+                        close_position(position, j, min(o, sl), 'sl')
+                    elif tp != 0 and h >= tp: 
+                        close_position(position, j, max(o, tp), 'tp')
+                    else:
+                        survivors.append(position)
+                else:
+                    # short positions close at the ask
+                    if sl != 0 and h + spread >= sl: 
+                        close_position(position, j, max(o + spread, sl), 'sl')
+                    elif tp != 0 and l + spread <= tp: 
+                        close_position(position, j, min(o + spread, tp), 'tp')
+                    else:
+                        survivors.append(position)
+
+            positions = survivors
+            for position in positions:
+                direction, _, entry_price, sl, _ = position
+                price:float = c if direction == 1 else c + spread
+                position[3] = self._trail(
+                    direction, price, entry_price, sl, default_sl * mults[j-1], 
+                    max_sl_dist * mults[j-1], sl_trail * mults[j-1]
+                )
+                floating[j] += (price - entry_price) * direction * units
+
+            # skip straight to the next entry when nothing is open
+            if not positions and k < len(entries):
+                j = entries[k][0]
+            elif not positions:
+                break
+            else:
+                j += 1
+
+        for position in positions:
+            direction:int = position[0]
+            close_position(position, n - 1, closes[-1] + (spread if direction == -1 else 0.0), 'end')
+        floating[n-1:] = 0.0
+
+        trades_df:pd.DataFrame = pd.DataFrame(trades, columns=TRADE_COLUMNS)
+        times:pd.DatetimeIndex = pd.to_datetime(self.time, unit='s')
+        trades_df['entry_time'] = times[trades_df['entry_time'].to_numpy(dtype=np.int64)]
+        trades_df['exit_time'] = times[trades_df['exit_time'].to_numpy(dtype=np.int64)]
+
+        equity:pd.Series = pd.Series(
+            self.starting_equity + np.cumsum(realized) + floating, index=times, name='equity'
+        )
+        return BacktestResult(trades_df, equity, self.starting_equity)
@@ -0,0 +1,188 @@
+import os
+import itertools
+import numpy as np
+import pandas as pd
+from multiprocessing import Pool, shared_memory
+from typing import Any, Dict, List, Optional, Sequence
+from .engine import Backtester
+
+SWEEP_PARAMETERS:List[str] = [
+    'strategy', 'volume', 'unit_pip', 'use_atr', 'atr_period', 'default_sl', 'max_sl_dist', 'sl_trail',
+    'default_tp', 'sr_likelihood', 'sr_threshold', 'sr_period', 'use_trendline', 'trendline_period', 'seed'
+]
+BAR_COLUMNS:List[str] = ['time', 'open', 'high', 'low', 'close']
+
+# backtester of a sweep worker process, built once on the shared bars
+_worker_backtester:Optional[Backtester] = None
+_worker_bars:Optional["SharedBars"] = None
+
+
+class SharedBars:
+    r"""
+    OHLC bars copied once into a shared memory block, so that worker processes
+    attach to them by name instead of receiving a pickled copy
+
+    parameters
+    -------------
+    df: (pandas.core.frame.DataFrame, None) - bars with time, open, high, low and
+    close columns, None to attach to an existing block
+
+    name: (str, None) - name of the shared memory block to attach to
+
+    n: (int) - number of bars in the block to attach to
+    """
+    def __init__(self, df:Optional[pd.DataFrame]=None, name:Optional[str]=None, n:int=0):
+        if df is not None:
+            self.n:int = len(df)
+            self.shm:shared_memory.SharedMemory = shared_memory.SharedMemory(
+                create=True, size=max(1, len(BAR_COLUMNS) * self.n * 8)
+            )
+            self.owner:bool = True
+            self.data[0].view(np.int64)[:] = df['time'].to_numpy(dtype=np.int64)
+            for i, col in enumerate(BAR_COLUMNS[1:], start=1):
+                self.data[i] = df[col].to_numpy(dtype=np.float64)
+        else:
+            assert name is not None, 'either df or name is required'
+            self.n:int = n
+            self.shm:shared_memory.SharedMemory = shared_memory.SharedMemory(name=name)
+            self.owner:bool = False
+
+    def __enter__(self) -> "SharedBars":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    @property
+    def data(self) -> np.ndarray:
+        r"""
+        (5, n) float64 view of the block, one row per column of BAR_COLUMNS (the
+        time row holds int64 unix timestamps)
+        """
+        return np.ndarray((len(BAR_COLUMNS), self.n), dtype=np.float64, buffer=self.shm.buf)
+
+    def backtester(self, **kwargs) -> Backtester:
+        r"""
+        creates a backtester on zero-copy views of the shared bars
+
+        the keyword arguments are those of Backtester
+        """
+        data:np.ndarray = self.data
+        return Backtester.from_arrays(data[0].view(np.int64), *data[1:], **kwargs)
+
+    def close(self) -> None:
+        r"""
+        detaches from the block, and frees it if this instance created it
+        """
+        self.shm.close()
+        if self.owner: self.shm.unlink()
+
+
+def parameter_grid(grid:Dict[str, Sequence[Any]], fixed:Optional[Dict[str, Any]]=None) -> List[Dict[str, Any]]:
+    r"""
+    expands a grid of parameter values into every combination of them
+
+    parameters
+    -------------
+    grid: (Dict[str, Sequence[Any]]) - values to try per Backtester.run parameter
+
+    fixed: (Dict[str, Any], None) - Backtester.run parameters shared by every combination
+
+    returns
+    -------------
+    returns a list of Backtester.run keyword arguments
+    """
+    unknown:List[str] = [key for key in {**grid, **(fixed or {})} if key not in SWEEP_PARAMETERS]
+    assert len(unknown) == 0, f'{unknown} are invalid parameters'
+
+    keys:List[str] = list(grid.keys())
+    return [
+        {**(fixed or {}), **dict(zip(keys, values))} for values in itertools.product(*(grid[key] for key in keys))
+    ]
+
+
+def sweep(
+    df:pd.DataFrame,
+    grid:Dict[str, Sequence[Any]],
+    fixed:Optional[Dict[str, Any]]=None,
+    rank_by:str='total_profit',
+    processes:Optional[int]=None,
+    chunksize:Optional[int]=None,
+    spread:float=0.0,
+    contract_size:float=100_000.0,
+    starting_equity:float=10_000.0) -> pd.DataFrame:
+    r"""
+    backtests every combination of a parameter grid on a process pool and ranks them.
+    The bars are shared with the workers through shared memory, and each worker keeps
+    one Backtester, so signals, ATRs and EMAs are only computed once per worker
+
+    parameters
+    -------------
+    df: (pandas.core.frame.DataFrame) - bars with time, open, high, low and close columns
+
+    grid: (Dict[str, Sequence[Any]]) - values to try per Backtester.run parameter
+    (eg: {'sr_period': [30, 60, 120], 'default_tp': [4, 8, 12]})
+
+    fixed: (Dict[str, Any], None) - Backtester.run parameters shared by every combination
+
+    rank_by: (str) - BacktestResult.summary statistic to rank by, the best (highest, or
+    lowest for max_drawdown) first
+
+    processes: (int, None) - number of worker processes (default=os.cpu_count())
+
+    chunksize: (int, None) - combinations sent to a worker at once, the default
+    splits the grid into about 4 chunks per worker
+
+    spread, contract_size, starting_equity: - the Backtester options
+
+    returns
+    -------------
+    returns a dataframe of one row per combination (its parameters and summary
+    statistics) sorted by rank, with a rank column
+    """
+    combinations:List[Dict[str, Any]] = parameter_grid(grid, fixed)
+    processes = processes or os.cpu_count() or 1
+    chunksize = chunksize or max(1, len(combinations) // (processes * 4))
+    backtester_kwargs:Dict[str, float] = {
+        'spread':spread, 'contract_size':contract_size, 'starting_equity':starting_equity
+    }
+
+    with SharedBars(df) as bars:
+        if processes == 1:
+            _init_worker(bars.name, bars.n, backtester_kwargs)
+            summaries:List[Dict[str, float]] = [_run_combination(params) for params in combinations]
+            _release_worker()
+        else:
+            with Pool(processes, initializer=_init_worker, initargs=(bars.name, bars.n, backtester_kwargs)) as pool:
+                summaries:List[Dict[str, float]] = list(pool.imap(_run_combination, combinations, chunksize))
+
+    results:pd.DataFrame = pd.concat(
+        [pd.DataFrame(combinations), pd.DataFrame(summaries)], axis=1
+    )
+    results = results.sort_values(
+        rank_by, ascending=(rank_by == 'max_drawdown'), kind='stable'
+    ).reset_index(drop=True)
+    results.insert(0, 'rank', np.arange(1, len(results) + 1))
+    return results
+
+
+def _init_worker(name:str, n:int, backtester_kwargs:Dict[str, float]) -> None:
+    global _worker_backtester, _worker_bars
+    # the shared memory block must stay attached while the views are in use
+    _worker_bars = SharedBars(name=name, n=n)
+    _worker_backtester = _worker_bars.backtester(**backtester_kwargs)
+
+
+def _release_worker() -> None:
+    global _worker_backtester, _worker_bars
+    _worker_backtester = None
+    _worker_bars.close()
+    _worker_bars = None
+
+
+def _run_combination(params:Dict[str, Any]) -> Dict[str, float]:
+    return _worker_backtester.run(**params).summary()
@@ -0,0 +1,104 @@
+import os
+import sys
+import argparse
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from benchmarks import (
+    BENCHMARKS,
+    Benchmark,
+    BenchmarkResult,
+    compare,
+    load_baseline,
+    machine_info,
+    parse_size,
+    recorded_bars,
+    run_benchmarks,
+    save_baseline,
+    synthetic_bars
+)
+
+APP_NAME = f"WHATEVER FX-BOT BENCHMARKS"
+
+
+def _format_time(seconds:float) -> str:
+    for unit, scale in (('s', 1.0), ('ms', 1e-3), ('us', 1e-6)):
+        if seconds >= scale: return f'{seconds / scale:.3f} {unit}'
+    return f'{seconds / 1e-9:.1f} ns'
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=APP_NAME)
+
+    parser.add_argument('--sizes', type=str, nargs='+', default=['1k', '100k', '10m'], metavar='', help='Bar counts of the fixtures (eg: 1k 100k 10m)')
+    parser.add_argument('--data', type=str, default=None, metavar='', help='Path to CSV / Parquet file (or bar store directory) of recorded bars, \
+        repeated up to every fixture size. Random walk bars are generated if not set')
+    parser.add_argument('--seed', type=int, default=0, metavar='', help='Seed of the random walk fixtures')
+    parser.add_argument('--filter', type=str, nargs='+', default=None, metavar='', help='Only run the benchmarks whose name contains one of these strings')
+    parser.add_argument('--repeats', type=int, default=5, metavar='', help='Timed repeats of every benchmark, the best one is compared with the baseline')
+    parser.add_argument('--min_time', type=float, default=0.2, metavar='', help='Minimum total seconds of the timed repeats of every benchmark')
+    parser.add_argument('--baseline', type=str, default=os.path.join('benchmarks', 'baseline.json'), metavar='', help='Path of the JSON baseline file')
+    parser.add_argument('--update', action='store_true', help='Write the results to the baseline file instead of comparing them with it')
+    parser.add_argument('--threshold', type=float, default=0.25, metavar='', help='Largest accepted slowdown against the baseline (0.25 = 25%% slower), \
+        the run fails (exit code 1) if a benchmark is slower, or (exit code 2) if there is no baseline')
+    parser.add_argument('--out', type=str, default=None, metavar='', help='Path to write the results to (JSON, same layout as the baseline)')
+    args = parser.parse_args()
+
+    benchmarks:List[Benchmark] = [
+        benchmark for benchmark in BENCHMARKS
+        if args.filter is None or any(name in benchmark.name for name in args.filter)
+    ]
+    if len(benchmarks) == 0:
+        print(f'no benchmark matches {args.filter}')
+        sys.exit(2)
+
+    try:
+        sizes:List[int] = [parse_size(size) for size in args.sizes]
+    except AssertionError as e:
+        print(e)
+        sys.exit(2)
+
+    fixtures:Dict[int, Callable[[], Any]] = {
+        n:(lambda n=n: recorded_bars(args.data, n)) if args.data else (lambda n=n: synthetic_bars(n, seed=args.seed))
+        for n in sizes
+    }
+
+    print(APP_NAME, '\n')
+    print(f'Fixture:                {args.data or "random walk"}')
+    print(f'Sizes:                  {", ".join(str(n) for n in sizes)} bars')
+    print(f'Threshold:              {args.threshold * 100:g}%', '\n')
+
+    # without a baseline the regression gate cannot pass, so the run fails before timing anything
+    baseline:Optional[Dict[str, Any]] = None
+    if not args.update:
+        if not os.path.isfile(args.baseline):
+            print(f'no baseline at {args.baseline}, run with --update to create it')
+            sys.exit(2)
+        baseline = load_baseline(args.baseline)
+    print(f'{"benchmark":<36}{"bars":>10}{"best":>14}{"median":>14}{"baseline":>14}{"change":>10}')
+
+    def _report(result:BenchmarkResult) -> None:
+        previous:Optional[Dict[str, Any]] = baseline['results'].get(result.key) if baseline is not None else None
+        reference:str = _format_time(previous['best']) if previous is not None else '-'
+        change:str = f'{(result.best / previous["best"] - 1) * 100:+.1f}%' if previous is not None and previous['best'] > 0 else '-'
+        print(f'{result.name:<36}{result.bars:>10}{_format_time(result.best):>14}{_format_time(result.median):>14}{reference:>14}{change:>10}', flush=True)
+
+    results:List[BenchmarkResult] = run_benchmarks(
+        benchmarks, fixtures, repeats=args.repeats, min_time=args.min_time, callback=_report
+    )
+
+    if args.out: save_baseline(args.out, results)
+
+    if args.update:
+        save_baseline(args.baseline, results)
+        print(f'\nbaseline written to {args.baseline}')
+        sys.exit(0)
+
+    if baseline['machine'] != machine_info():
+        print(f'\nthe baseline was recorded on another machine ({baseline["machine"]}), timings may not be comparable')
+
+    regressions:List[Tuple[BenchmarkResult, float]] = compare(results, baseline, threshold=args.threshold)
+    if len(regressions) > 0:
+        print(f'\n{len(regressions)} benchmarks are more than {args.threshold * 100:g}% slower than the baseline:')
+        for result, ratio in regressions:
+            print(f'  {result.key}: {ratio:.2f}x')
+        sys.exit(1)
+    print(f'\nno regression above {args.threshold * 100:g}%')
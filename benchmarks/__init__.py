@@ -0,0 +1,3 @@
+from .fixtures import *
+from .suite import *
+from .cases import *
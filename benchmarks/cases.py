@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, List
+from bot_strategies import Engulf, Rejection, SupportResistance, TrendLines
+from brokers import RATES_DTYPE, TIMEFRAME_M15, SimulatedBroker, resample_rates
+from engine import InstrumentConfig, TradingEngine
+from utils import Metrics, TradeJournal, compute_latest_atr, set_broker
+from .suite import Benchmark
+
+
+def _check(check:Callable[[pd.DataFrame], Any]) -> Callable[[pd.DataFrame], Callable[[], Any]]:
+    # a check of the latest candle, on the whole fixture like the live loop does on its buffer
+    return lambda df: lambda: check(df)
+
+
+def _mask(mask:Callable[..., np.ndarray]) -> Callable[[pd.DataFrame], Callable[[], Any]]:
+    # a vectorized check of every candle, as run by the backtester
+    def setup(df:pd.DataFrame) -> Callable[[], Any]:
+        prices:List[np.ndarray] = [df[col].to_numpy() for col in ('open', 'high', 'low', 'close')]
+        return lambda: mask(*prices)
+    return setup
+
+
+def _boundary_trimer(df:pd.DataFrame) -> Callable[[], Any]:
+    # the support pivots of the fixture, trimmed the same way as get_supports
+    low:np.ndarray = df['low'].to_numpy()
+    idxs:np.ndarray = np.flatnonzero(SupportResistance.pivot_mask(low))
+    boundaries:List[float] = low[idxs].tolist()
+    threshold:float = float(np.nanmean(df['high'].to_numpy() - low))
+    idxs_list:List[int] = idxs.tolist()
+    return lambda: SupportResistance.boundary_trimer(boundaries, idxs_list, threshold)
+
+
+def _resample(df:pd.DataFrame) -> Callable[[], Any]:
+    # M15 bars of the whole (M1) fixture
+    rates:np.ndarray = np.zeros(len(df), dtype=RATES_DTYPE)
+    for col in RATES_DTYPE.names:
+        if col in df.columns: rates[col] = df[col].to_numpy()
+    return lambda: resample_rates(rates, TIMEFRAME_M15)
+
+
+def _engine_step(df:pd.DataFrame) -> Callable[[], Any]:
+    r"""
+    one iteration of the main.py event loop (see TradingEngine.step) on a simulated
+    broker replaying the second half of the fixture, the first half is the history
+    """
+    engine:TradingEngine
+
+    def start() -> None:
+        nonlocal engine
+        broker:SimulatedBroker = SimulatedBroker({'EURUSD':df}, start=len(df) // 2, spread=1e-5)
+        broker.initialize()
+        set_broker(broker)
+        config:InstrumentConfig = InstrumentConfig(
+            'EURUSD', use_atr=True, use_trendline=True, sl_trail=0.3, sr_likelihood=0.0
+        )
+        # the trade events are only buffered, nothing is printed into the benchmark table
+        engine = TradingEngine(
+            [config], broker=broker, metrics=Metrics(), order_workers=0, journal=TradeJournal(console=False)
+        )
+
+    def step() -> None:
+        # the replay restarts once every bar has been replayed
+        if engine.broker.finished: start()
+        engine.step()
+
+    start()
+    return step
+
+
+BENCHMARKS:List[Benchmark] = [
+    Benchmark('engulf.is_bullish_engulf', _check(Engulf.is_bullish_engulf)),
+    Benchmark('engulf.is_bearish_engulf', _check(Engulf.is_bearish_engulf)),
+    Benchmark('engulf.bullish_engulf_mask', _mask(Engulf.bullish_engulf_mask)),
+    Benchmark('engulf.bearish_engulf_mask', _mask(Engulf.bearish_engulf_mask)),
+    Benchmark('rejection.is_bullish_rejection', _check(Rejection.is_bullish_rejection)),
+    Benchmark('rejection.is_bearish_rejection', _check(Rejection.is_bearish_rejection)),
+    Benchmark('rejection.bullish_rejection_mask', _mask(Rejection.bullish_rejection_mask)),
+    Benchmark('rejection.bearish_rejection_mask', _mask(Rejection.bearish_rejection_mask)),
+    Benchmark('sr.get_supports', _check(SupportResistance.get_supports)),
+    Benchmark('sr.get_resistances', _check(SupportResistance.get_resistances)),
+    Benchmark('sr.boundary_trimer', _boundary_trimer),
+    Benchmark('brokers.resample_rates', _resample),
+    Benchmark('utils.compute_latest_atr', _check(compute_latest_atr)),
+    # adds (overwrites) the ema column of the fixture
+    Benchmark('trendlines.append_ema', _check(TrendLines.append_ema)),
+    # the simulated broker copies the fixture, the loop only reads its last bars
+    Benchmark('engine.step', _engine_step, max_bars=100_000),
+]
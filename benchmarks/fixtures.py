@@ -0,0 +1,104 @@
+import numpy as np
+import pandas as pd
+from typing import Dict
+from backtesting import load_bars
+
+# bar counts of the benchmark fixtures
+FIXTURE_SIZES:Dict[str, int] = {'1k':1_000, '100k':100_000, '10m':10_000_000}
+
+
+def parse_size(size:str) -> int:
+    r"""
+    converts a fixture size (eg: 1k, 100k, 10m or 2500) to a number of bars
+    """
+    size = size.strip().lower()
+    if size in FIXTURE_SIZES: return FIXTURE_SIZES[size]
+
+    multiplier:int = {'k':1_000, 'm':1_000_000}.get(size[-1:], 1)
+    digits:str = size[:-1] if multiplier > 1 else size
+    assert digits.isdigit() and int(digits) > 0, f'{size} is not a number of bars'
+    return int(digits) * multiplier
+
+
+def synthetic_bars(
+    n:int, seed:int=0, start_time:int=1_600_000_000, period:int=60, price:float=1.1, volatility:float=1e-4) -> pd.DataFrame:
+    r"""
+    generates n M1-like bars of a random walk, in the same layout as load_bars
+
+    parameters
+    -------------
+    n: (int) - number of bars
+
+    seed: (int) - seed of the random walk, the same seed gives the same bars
+
+    start_time: (int) - open time (unix timestamp) of the first bar
+
+    period: (int) - seconds between two bars
+
+    price: (float) - open price of the first bar
+
+    volatility: (float) - standard deviation of a bar's close to close move
+
+    returns
+    -------------
+    returns a dataframe of time, open, high, low, close and tick_volume columns
+    """
+    rng:np.random.Generator = np.random.default_rng(seed)
+
+    close:np.ndarray = price + np.cumsum(rng.normal(0.0, volatility, n))
+    open:np.ndarray = np.empty(n)
+    open[0] = price
+    open[1:] = close[:-1]
+
+    # wicks of half a bar's move on average
+    high:np.ndarray = np.maximum(open, close) + np.abs(rng.normal(0.0, volatility / 2, n))
+    low:np.ndarray = np.minimum(open, close) - np.abs(rng.normal(0.0, volatility / 2, n))
+
+    return pd.DataFrame({
+        'time': start_time + period * np.arange(n, dtype=np.int64),
+        'open': open,
+        'high': high,
+        'low': low,
+        'close': close,
+        'tick_volume': rng.integers(1, 200, n, dtype=np.int64),
+    })
+
+
+def recorded_bars(path:str, n:int) -> pd.DataFrame:
+    r"""
+    loads recorded bars (see load_bars) and repeats them up to n bars. Every
+    repetition continues the times and the prices of the previous one, so the
+    fixture has no time or price jumps
+
+    parameters
+    -------------
+    path: (str) - path to a bars file or bar store directory
+
+    n: (int) - number of bars
+
+    returns
+    -------------
+    returns a dataframe in the same layout as load_bars
+    """
+    df:pd.DataFrame = load_bars(path)
+    assert len(df) > 1, f'{path} has less than 2 bars'
+    df = df[[col for col in ('time', 'open', 'high', 'low', 'close', 'tick_volume') if col in df.columns]]
+
+    repeats:int = -(-n // len(df))
+    idxs:np.ndarray = np.arange(repeats * len(df))[:n]
+    repetition:np.ndarray = idxs // len(df)
+    rows:np.ndarray = idxs % len(df)
+
+    period:int = int(np.median(np.diff(df['time'].to_numpy())))
+    time_step:int = int(df['time'].iloc[-1] - df['time'].iloc[0]) + period
+    price_step:float = float(df['close'].iloc[-1] - df['open'].iloc[0])
+
+    out:Dict[str, np.ndarray] = {}
+    for col in df.columns:
+        values:np.ndarray = df[col].to_numpy()[rows]
+        if col == 'time':
+            values = values + repetition * time_step
+        elif col in ('open', 'high', 'low', 'close'):
+            values = values + repetition * price_step
+        out[col] = values
+    return pd.DataFrame(out)
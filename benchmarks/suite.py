@@ -0,0 +1,202 @@
+import gc
+import json
+import time
+import platform
+import statistics
+import numpy as np
+import pandas as pd
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+# version of the baseline file layout
+BASELINE_VERSION:int = 1
+
+
+class Benchmark(NamedTuple):
+    r"""
+    a benchmarked operation
+
+    name: name of the operation (eg: sr.get_supports)
+
+    setup: called with the bars fixture, returns the callable that is timed
+
+    max_bars: largest fixture the operation runs on (None for every fixture), for
+    operations that would take minutes on the largest fixtures
+    """
+    name:str
+    setup:Callable[[pd.DataFrame], Callable[[], Any]]
+    max_bars:Optional[int] = None
+
+
+class BenchmarkResult(NamedTuple):
+    r"""
+    timing of a benchmark on a fixture, times are seconds per call
+    """
+    name:str
+    bars:int
+    calls:int
+    best:float
+    median:float
+
+    @property
+    def key(self) -> str:
+        return f'{self.name}[{self.bars}]'
+
+
+def time_callable(fn:Callable[[], Any], repeats:int=5, min_time:float=0.2) -> Tuple[int, List[float]]:
+    r"""
+    times a callable the way timeit does: the number of calls per repeat is
+    raised until a repeat takes at least min_time / repeats seconds, then every
+    repeat is timed with the garbage collector disabled
+
+    parameters
+    -------------
+    fn: (Callable) - callable to time
+
+    repeats: (int) - number of timed repeats
+
+    min_time: (float) - minimum total seconds of the timed repeats
+
+    returns
+    -------------
+    returns the number of calls per repeat and the seconds per call of every repeat
+    """
+    target:float = min_time / repeats
+    calls:int = 1
+    while True:
+        start:float = time.perf_counter()
+        for _ in range(calls): fn()
+        elapsed:float = time.perf_counter() - start
+        if elapsed >= target: break
+        # aim just past the target, without more than a 10x step at a time
+        calls = int(calls * min(10.0, max(2.0, 1.2 * target / max(elapsed, 1e-9))))
+
+    times:List[float] = []
+    gc_enabled:bool = gc.isenabled()
+    gc.disable()
+    try:
+        for _ in range(repeats):
+            start = time.perf_counter()
+            for _ in range(calls): fn()
+            times.append((time.perf_counter() - start) / calls)
+    finally:
+        if gc_enabled: gc.enable()
+    return calls, times
+
+
+def run_benchmarks(
+    benchmarks:List[Benchmark],
+    fixtures:Dict[int, Callable[[], pd.DataFrame]],
+    repeats:int=5,
+    min_time:float=0.2,
+    callback:Optional[Callable[[BenchmarkResult], None]]=None) -> List[BenchmarkResult]:
+    r"""
+    runs every benchmark on every fixture, the fixtures are built one at a time
+    (largest last) so that only one of them is in memory
+
+    parameters
+    -------------
+    benchmarks: (List[Benchmark]) - benchmarks to run
+
+    fixtures: (Dict[int, Callable]) - number of bars: function building the fixture
+
+    repeats: (int) - number of timed repeats of every benchmark
+
+    min_time: (float) - minimum total seconds of the timed repeats of every benchmark
+
+    callback: (Callable, None) - called with every result as soon as it is timed
+
+    returns
+    -------------
+    returns the results, in the order they were run
+    """
+    results:List[BenchmarkResult] = []
+    for bars in sorted(fixtures):
+        selected:List[Benchmark] = [
+            benchmark for benchmark in benchmarks if benchmark.max_bars is None or bars <= benchmark.max_bars
+        ]
+        if len(selected) == 0: continue
+
+        df:pd.DataFrame = fixtures[bars]()
+        for benchmark in selected:
+            calls, times = time_callable(benchmark.setup(df), repeats=repeats, min_time=min_time)
+            result:BenchmarkResult = BenchmarkResult(benchmark.name, bars, calls, min(times), statistics.median(times))
+            results.append(result)
+            if callback is not None: callback(result)
+        del df
+        gc.collect()
+
+    return results
+
+
+def machine_info() -> Dict[str, str]:
+    r"""
+    description of the machine and library versions the benchmarks ran on
+    """
+    return {
+        'platform': platform.platform(),
+        'processor': platform.processor() or platform.machine(),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+    }
+
+
+def save_baseline(path:str, results:List[BenchmarkResult]) -> None:
+    r"""
+    writes benchmark results to a JSON baseline file
+
+    parameters
+    -------------
+    path: (str) - path of the baseline file
+
+    results: (List[BenchmarkResult]) - results to store
+    """
+    baseline:Dict[str, Any] = {
+        'version': BASELINE_VERSION,
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'machine': machine_info(),
+        'results': {result.key:result._asdict() for result in results},
+    }
+    with open(path, 'w') as f:
+        json.dump(baseline, f, indent=2)
+
+
+def load_baseline(path:str) -> Dict[str, Any]:
+    r"""
+    reads a baseline file written by save_baseline
+    """
+    with open(path, 'r') as f:
+        baseline:Dict[str, Any] = json.load(f)
+    assert baseline.get('version') == BASELINE_VERSION, \
+        f'{path} is a baseline of version {baseline.get("version")}, expected {BASELINE_VERSION}'
+    return baseline
+
+
+def compare(
+    results:List[BenchmarkResult], baseline:Dict[str, Any], threshold:float=0.25) -> List[Tuple[BenchmarkResult, float]]:
+    r"""
+    compares results with a baseline. The best time of every repeat is compared,
+    it is the least sensitive to the noise of other processes
+
+    parameters
+    -------------
+    results: (List[BenchmarkResult]) - new results
+
+    baseline: (Dict[str, Any]) - baseline returned by load_baseline
+
+    threshold: (float) - largest accepted slowdown, as a fraction of the baseline
+    time (eg: 0.25 accepts results up to 25% slower)
+
+    returns
+    -------------
+    returns the (result, ratio to the baseline) of every result slower than the
+    threshold, results missing from the baseline are not compared
+    """
+    regressions:List[Tuple[BenchmarkResult, float]] = []
+    for result in results:
+        previous:Optional[Dict[str, Any]] = baseline['results'].get(result.key)
+        if previous is None or previous['best'] <= 0: continue
+
+        ratio:float = result.best / previous['best']
+        if ratio > 1 + threshold: regressions.append((result, ratio))
+    return regressions
@@ -1,21 +1,47 @@
+from __future__ import annotations
+from .bars import *
 from .strategies import *
-from typing import Dict, Callable
+from typing import TYPE_CHECKING, Dict, Callable, Union
 
+if TYPE_CHECKING: import pandas as pd
 
-def _composite_strategy_buy(df:pd.DataFrame) -> bool:
+
+def _composite_strategy_buy(df:Union[pd.DataFrame, Bars]) -> bool:
     return (
         Engulf.is_bullish_engulf(df) or 
         Rejection.is_bullish_rejection(df)
     )
 
-def _composite_strategy_sell(df:pd.DataFrame) -> bool:
+def _composite_strategy_sell(df:Union[pd.DataFrame, Bars]) -> bool:
     return (
         Engulf.is_bearish_engulf(df) or
         Rejection.is_bearish_rejection(df)
     )
 
+def _composite_strategy_buy_mask(
+    open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+    return (
+        Engulf.bullish_engulf_mask(open, high, low, close) |
+        Rejection.bullish_rejection_mask(open, high, low, close)
+    )
+
+def _composite_strategy_sell_mask(
+    open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+    return (
+        Engulf.bearish_engulf_mask(open, high, low, close) |
+        Rejection.bearish_rejection_mask(open, high, low, close)
+    )
+
 __strategies__: Dict[str, Dict[str, Callable]] = {
     "engulf": {'buy': Engulf.is_bullish_engulf, 'sell': Engulf.is_bearish_engulf},
     "rejection": {'buy': Rejection.is_bullish_rejection, 'sell': Rejection.is_bearish_rejection},
     "composite": {'buy': _composite_strategy_buy, 'sell': _composite_strategy_sell}
+}
+
+# batch counterparts of __strategies__, they take open, high, low and close
+# arrays and return a boolean signal mask for every candle in the history
+__batch_strategies__: Dict[str, Dict[str, Callable]] = {
+    "engulf": {'buy': Engulf.bullish_engulf_mask, 'sell': Engulf.bearish_engulf_mask},
+    "rejection": {'buy': Rejection.bullish_rejection_mask, 'sell': Rejection.bearish_rejection_mask},
+    "composite": {'buy': _composite_strategy_buy_mask, 'sell': _composite_strategy_sell_mask}
 }
\ No newline at end of file
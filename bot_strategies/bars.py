@@ -0,0 +1,110 @@
+from __future__ import annotations
+import sys
+import numpy as np
+from typing import TYPE_CHECKING, Any, Optional, Union
+
+# pandas is imported by the code that needs it (eg: the backtester or to_frame),
+# the live loop only passes Bars and never imports it
+if TYPE_CHECKING: import pandas as pd
+
+COLUMNS:tuple = ('time', 'open', 'high', 'low', 'close')
+
+
+class Bars:
+    r"""
+    Compact container of OHLC bars, one NumPy array per column. The strategy,
+    support / resistance and trendline functions accept it in place of a
+    dataframe and only index its arrays, which avoids the pandas overhead of
+    reading single values with .iloc.
+
+    Slicing (bars[-60:]) and window(n) return Bars of zero copy views of the
+    same arrays.
+
+    parameters
+    -------------
+    time, open, high, low, close: (np.ndarray) - bar columns of the same length
+
+    ema: (np.ndarray, None) - EMA trendline of the close prices (see TrendLines.append_ema)
+    """
+    __slots__ = ('time', 'open', 'high', 'low', 'close', 'ema')
+
+    def __init__(
+        self, time:np.ndarray, open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray,
+        ema:Optional[np.ndarray]=None):
+
+        self.time:np.ndarray = time
+        self.open:np.ndarray = open
+        self.high:np.ndarray = high
+        self.low:np.ndarray = low
+        self.close:np.ndarray = close
+        self.ema:Optional[np.ndarray] = ema
+
+    def __len__(self) -> int:
+        return len(self.close)
+
+    def __getitem__(self, key:Union[str, slice]) -> Union[np.ndarray, "Bars"]:
+        # a column name returns the column, like a dataframe, a slice returns a window
+        if isinstance(key, str):
+            value:Optional[np.ndarray] = getattr(self, key) if key in self.__slots__ else None
+            if value is None: raise KeyError(key)
+            return value
+
+        return Bars(
+            self.time[key], self.open[key], self.high[key], self.low[key], self.close[key],
+            self.ema[key] if self.ema is not None else None
+        )
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}(n={len(self)})'
+
+    def window(self, n:int) -> "Bars":
+        r"""
+        zero copy view of the last n bars
+        """
+        return self[max(0, len(self) - n):]
+
+    @classmethod
+    def from_records(cls, records:np.ndarray) -> "Bars":
+        r"""
+        zero copy Bars of a structured array of rates (eg: the result of
+        copy_rates_from_pos or a BarBuffer view)
+        """
+        return cls(*(records[col] for col in COLUMNS))
+
+    @classmethod
+    def from_frame(cls, df:pd.DataFrame) -> "Bars":
+        r"""
+        Bars of the columns of a dataframe, without copying the columns that are
+        already stored as NumPy arrays. The "ema" column is kept if present
+        """
+        time:np.ndarray = df['time'].to_numpy() if 'time' in df.columns else np.arange(len(df))
+        return cls(
+            time, *(df[col].to_numpy() for col in COLUMNS[1:]),
+            ema=df['ema'].to_numpy() if 'ema' in df.columns else None
+        )
+
+    @classmethod
+    def of(cls, bars:Union[pd.DataFrame, "Bars"]) -> "Bars":
+        r"""
+        returns bars unchanged if they are already Bars, else adapts a dataframe
+        (see from_frame)
+        """
+        return bars if isinstance(bars, Bars) else cls.from_frame(bars)
+
+    def to_frame(self) -> pd.DataFrame:
+        r"""
+        dataframe (copy) of the bars
+        """
+        import pandas as pd
+        df:pd.DataFrame = pd.DataFrame({col:getattr(self, col) for col in COLUMNS})
+        if self.ema is not None: df['ema'] = self.ema
+        return df
+
+
+def is_frame(obj:Any) -> bool:
+    r"""
+    True if obj is a pandas dataframe, without importing pandas (a dataframe can
+    only exist once pandas has been imported)
+    """
+    pd = sys.modules.get('pandas')
+    return pd is not None and isinstance(obj, pd.DataFrame)
@@ -1,80 +1,155 @@
+from __future__ import annotations
+import bisect
+import itertools
 import numpy as np
-import pandas as pd
-from typing import Tuple, List
+from collections import deque
+from typing import TYPE_CHECKING, Iterable, Tuple, List, Optional, Deque, Union
+from .bars import Bars, is_frame
+
+if TYPE_CHECKING: import pandas as pd
 
 
 # Engulf Strategy
 class Engulf:
 
     @staticmethod
-    def is_bullish_engulf(df:pd.DataFrame) -> bool:
+    def is_bullish_engulf(df:Union[pd.DataFrame, Bars]) -> bool:
         r"""
         checks bullish engulf pattern in market
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
             
         returns
         -------------
         returns True, if condition is satisfied for bullish engulf, else False
         """
-        assert isinstance(df, pd.DataFrame), \
-            f'expects input to be {pd.DataFrame}, got {type(df)} isntead'
+        assert isinstance(df, Bars) or is_frame(df), \
+            f'expects input to be a pandas DataFrame or {Bars}, got {type(df)} isntead'
+        bars:Bars = Bars.of(df)
 
-        condition_1:bool = df['close'].iloc[-1] > df['high'].iloc[-2]
-        condition_2:bool = df['open'].iloc[-1] <= df['close'].iloc[-2]
-        condition_3:bool = df['close'].iloc[-1] > df['open'].iloc[-1]
-        condition_4:bool = df['close'].iloc[-2] < df['open'].iloc[-2]
+        condition_1:bool = bars.close[-1] > bars.high[-2]
+        condition_2:bool = bars.open[-1] <= bars.close[-2]
+        condition_3:bool = bars.close[-1] > bars.open[-1]
+        condition_4:bool = bars.close[-2] < bars.open[-2]
 
         return condition_1 and condition_2 and condition_3 and condition_4
 
     @staticmethod
-    def is_bearish_engulf(df:pd.DataFrame) -> bool:
+    def is_bearish_engulf(df:Union[pd.DataFrame, Bars]) -> bool:
         r"""
         checks bearish engulf pattern in market
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
             
         returns
         -------------
         returns True, if condition is satisfied for bearish engulf, else False
         """
-        assert isinstance(df, pd.DataFrame), \
-            f'expects input to be {pd.DataFrame}, got {type(df)} isntead'
+        assert isinstance(df, Bars) or is_frame(df), \
+            f'expects input to be a pandas DataFrame or {Bars}, got {type(df)} isntead'
+        bars:Bars = Bars.of(df)
             
-        condition_1:bool = df['close'].iloc[-1] < df['low'].iloc[-2]
-        condition_2:bool = df['open'].iloc[-1] >= df['close'].iloc[-2]
-        condition_3:bool = df['close'].iloc[-1] < df['open'].iloc[-1]
-        condition_4:bool = df['close'].iloc[-2] > df['open'].iloc[-2]
+        condition_1:bool = bars.close[-1] < bars.low[-2]
+        condition_2:bool = bars.open[-1] >= bars.close[-2]
+        condition_3:bool = bars.close[-1] < bars.open[-1]
+        condition_4:bool = bars.close[-2] > bars.open[-2]
 
         return condition_1 and condition_2 and condition_3 and condition_4
 
 
+    @staticmethod
+    def bullish_engulf_mask(
+        open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+        r"""
+        checks bullish engulf pattern for every candle of a price history in one
+        vectorized pass
+
+        parameters
+        -------------
+        open: (numpy.ndarray) - open prices
+
+        high: (numpy.ndarray) - high prices
+
+        low: (numpy.ndarray) - low prices
+
+        close: (numpy.ndarray) - close prices
+            
+        returns
+        -------------
+        returns a boolean mask, True at every candle that satisfies the condition
+        for bullish engulf (is_bullish_engulf on the history up to that candle)
+        """
+        open, high, close = np.asarray(open), np.asarray(high), np.asarray(close)
+        mask:np.ndarray = np.zeros(len(close), dtype=bool)
+
+        mask[1:] = (
+            (close[1:] > high[:-1]) &
+            (open[1:] <= close[:-1]) &
+            (close[1:] > open[1:]) &
+            (close[:-1] < open[:-1])
+        )
+        return mask
+
+    @staticmethod
+    def bearish_engulf_mask(
+        open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+        r"""
+        checks bearish engulf pattern for every candle of a price history in one
+        vectorized pass
+
+        parameters
+        -------------
+        open: (numpy.ndarray) - open prices
+
+        high: (numpy.ndarray) - high prices
+
+        low: (numpy.ndarray) - low prices
+
+        close: (numpy.ndarray) - close prices
+            
+        returns
+        -------------
+        returns a boolean mask, True at every candle that satisfies the condition
+        for bearish engulf (is_bearish_engulf on the history up to that candle)
+        """
+        open, low, close = np.asarray(open), np.asarray(low), np.asarray(close)
+        mask:np.ndarray = np.zeros(len(close), dtype=bool)
+
+        mask[1:] = (
+            (close[1:] < low[:-1]) &
+            (open[1:] >= close[:-1]) &
+            (close[1:] < open[1:]) &
+            (close[:-1] > open[:-1])
+        )
+        return mask
+
 #Rjection Strategy
 class Rejection:
 
     @staticmethod
-    def is_bullish_rejection(df:pd.DataFrame, iloc_idx:int=-1) -> bool:
+    def is_bullish_rejection(df:Union[pd.DataFrame, Bars], iloc_idx:int=-1) -> bool:
         r"""
         checks if candle stick is a bullish rejection candle or not
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
             
         returns
         -------------
         returns True, if condition is satisfied for bullish rejection, else False
         """
-        assert isinstance(df, pd.DataFrame), \
-            f'expects input to be {pd.DataFrame}, got {type(df)} isntead'
+        assert isinstance(df, Bars) or is_frame(df), \
+            f'expects input to be a pandas DataFrame or {Bars}, got {type(df)} isntead'
+        bars:Bars = Bars.of(df)
 
-        wick_size:float = df['high'].iloc[iloc_idx] - max(df['open'].iloc[iloc_idx], df['close'].iloc[iloc_idx])
-        tail_size:float = min(df['open'].iloc[iloc_idx], df['close'].iloc[iloc_idx]) - df['low'].iloc[iloc_idx]
-        body_size:float = abs(df['open'].iloc[iloc_idx] - df['close'].iloc[iloc_idx])
+        wick_size:float = bars.high[iloc_idx] - max(bars.open[iloc_idx], bars.close[iloc_idx])
+        tail_size:float = min(bars.open[iloc_idx], bars.close[iloc_idx]) - bars.low[iloc_idx]
+        body_size:float = abs(bars.open[iloc_idx] - bars.close[iloc_idx])
 
         if body_size != 0:
             t2b_ratio:float = tail_size / body_size
@@ -84,24 +159,25 @@ class Rejection:
             return wick_size <= 0.25*tail_size
 
     @staticmethod
-    def is_bearish_rejection(df:pd.DataFrame, iloc_idx:int=-1) -> bool:
+    def is_bearish_rejection(df:Union[pd.DataFrame, Bars], iloc_idx:int=-1) -> bool:
         r"""
         checks if candle stick is a bearish rejection candle or not
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
             
         returns
         -------------
         returns True, if condition is satisfied for bearish rejection, else False
         """
-        assert isinstance(df, pd.DataFrame), \
-            f'expects input to be {pd.DataFrame}, got {type(df)} isntead'
+        assert isinstance(df, Bars) or is_frame(df), \
+            f'expects input to be a pandas DataFrame or {Bars}, got {type(df)} isntead'
+        bars:Bars = Bars.of(df)
 
-        wick_size:float = df['high'].iloc[iloc_idx] - max(df['open'].iloc[iloc_idx], df['close'].iloc[iloc_idx])
-        tail_size:float = min(df['open'].iloc[iloc_idx], df['close'].iloc[iloc_idx]) - df['low'].iloc[iloc_idx]
-        body_size:float = abs(df['open'].iloc[iloc_idx] - df['close'].iloc[iloc_idx])
+        wick_size:float = bars.high[iloc_idx] - max(bars.open[iloc_idx], bars.close[iloc_idx])
+        tail_size:float = min(bars.open[iloc_idx], bars.close[iloc_idx]) - bars.low[iloc_idx]
+        body_size:float = abs(bars.open[iloc_idx] - bars.close[iloc_idx])
 
         if body_size != 0:
             w2b_ratio:float = wick_size / body_size
@@ -111,14 +187,180 @@ class Rejection:
             return tail_size <= 0.25*wick_size
 
 
+    @staticmethod
+    def _candle_parts(
+        open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        # wick, tail and body sizes of every candle
+        open, high, low, close = np.asarray(open), np.asarray(high), np.asarray(low), np.asarray(close)
+        wick_size:np.ndarray = high - np.maximum(open, close)
+        tail_size:np.ndarray = np.minimum(open, close) - low
+        body_size:np.ndarray = np.abs(open - close)
+        return wick_size, tail_size, body_size
+
+    @staticmethod
+    def bullish_rejection_mask(
+        open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+        r"""
+        checks every candle of a price history for bullish rejection in one
+        vectorized pass
+
+        parameters
+        -------------
+        open: (numpy.ndarray) - open prices
+
+        high: (numpy.ndarray) - high prices
+
+        low: (numpy.ndarray) - low prices
+
+        close: (numpy.ndarray) - close prices
+            
+        returns
+        -------------
+        returns a boolean mask, True at every bullish rejection candle
+        """
+        wick_size, tail_size, body_size = Rejection._candle_parts(open, high, low, close)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            t2b_ratio:np.ndarray = tail_size / body_size
+
+        small_wick:np.ndarray = wick_size <= 0.25*tail_size
+        return np.where(body_size != 0, (t2b_ratio >= 2) & small_wick, small_wick)
+
+    @staticmethod
+    def bearish_rejection_mask(
+        open:np.ndarray, high:np.ndarray, low:np.ndarray, close:np.ndarray) -> np.ndarray:
+        r"""
+        checks every candle of a price history for bearish rejection in one
+        vectorized pass
+
+        parameters
+        -------------
+        open: (numpy.ndarray) - open prices
+
+        high: (numpy.ndarray) - high prices
+
+        low: (numpy.ndarray) - low prices
+
+        close: (numpy.ndarray) - close prices
+            
+        returns
+        -------------
+        returns a boolean mask, True at every bearish rejection candle
+        """
+        wick_size, tail_size, body_size = Rejection._candle_parts(open, high, low, close)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            w2b_ratio:np.ndarray = wick_size / body_size
+
+        small_tail:np.ndarray = tail_size <= 0.25*wick_size
+        return np.where(body_size != 0, (w2b_ratio >= 1.5) & small_tail, small_tail)
+
 #support resistance strategy
+class LevelClusters:
+    r"""
+    Greedy clustering of price levels: a level is kept if it is at least `threshold`
+    away from every level kept before it, else it joins the cluster of the nearest
+    kept level. The kept levels are also held in ascending order, so a new level is
+    only compared with the two kept levels around it (found with bisect) instead of
+    every kept level, which gives the same levels as comparing them all.
+
+    Every cluster sums the weights of the levels that fell in it, its strength, eg:
+    the number of pivots at a support, or a recency weighted count of them.
+
+    parameters
+    -------------
+    threshold: (float) - minimum distance between two kept levels
+    """
+    def __init__(self, threshold:float):
+        self.threshold:float = threshold
+
+        # kept levels, their index and strength, in the order they were kept
+        self.levels:List[float] = []
+        self.idxs:List[int] = []
+        self.strengths:List[float] = []
+
+        # kept levels in ascending order, and their position in self.levels
+        self._sorted:List[float] = []
+        self._positions:List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def add(self, level:float, idx:int, weight:float=1.0) -> bool:
+        r"""
+        adds a level to the clusters
+
+        parameters
+        -------------
+        level: (float) - level value
+
+        idx: (int) - index of the level (eg: of its pivot in the price history)
+
+        weight: (float) - weight of the level in its cluster's strength
+
+        returns
+        -------------
+        returns True if the level was kept, False if it joined a cluster
+        """
+        return self.extend((level,), (idx,), (weight,)) == 1
+
+    def extend(self, levels:Iterable[float], idxs:Iterable[int], weights:Optional[Iterable[float]]=None) -> int:
+        r"""
+        adds levels to the clusters, in order
+
+        parameters
+        -------------
+        levels: (Iterable[float]) - level values
+
+        idxs: (Iterable[int]) - corresponding index values of the levels
+
+        weights: (Iterable[float], None) - weights of the levels, 1 for each level if None
+
+        returns
+        -------------
+        returns the number of levels kept
+        """
+        threshold:float = self.threshold
+        kept:List[float] = self.levels
+        kept_idxs:List[int] = self.idxs
+        strengths:List[float] = self.strengths
+        sorted_levels:List[float] = self._sorted
+        positions:List[int] = self._positions
+        n_kept:int = len(kept)
+
+        for level, idx, weight in zip(levels, idxs, weights if weights is not None else itertools.repeat(1.0)):
+            # NaN levels are never close to another level (the comparisons are False),
+            # they are kept but left out of the sorted levels
+            if level != level:
+                strengths.append(weight)
+                kept.append(level)
+                kept_idxs.append(idx)
+                continue
+
+            pos:int = bisect.bisect_left(sorted_levels, level)
+            below:float = abs(level - sorted_levels[pos - 1]) if pos > 0 else threshold
+            above:float = abs(level - sorted_levels[pos]) if pos < len(sorted_levels) else threshold
+            if below < threshold or above < threshold:
+                # joins the nearest kept level
+                strengths[positions[pos - 1] if below <= above else positions[pos]] += weight
+                continue
+
+            sorted_levels.insert(pos, level)
+            positions.insert(pos, len(kept))
+            strengths.append(weight)
+            kept.append(level)
+            kept_idxs.append(idx)
+
+        return len(kept) - n_kept
+
+
 class SupportResistance:
 
     @staticmethod
     def boundary_trimer(boundaries:List[float], idxs:List[int], threshold:float) -> Tuple[List[float], List[int]]:
         r"""
         checks if boundary values are close to each other by some threshold and
-        trims them appropriately.
+        trims them appropriately (see LevelClusters), in O(n log n)
 
         parameters
         -------------
@@ -130,24 +372,18 @@ class SupportResistance:
         -------------
         returns Tuple of two lists, the trimed boundary list and its new index list
         """
-        new_boundaries:List[float] = []
-        new_idxs:List[int] = []
-
-        for i, b1 in enumerate(boundaries):
-            if np.sum([abs(b1 - y) < threshold for y in new_boundaries]) == 0:
-                new_boundaries.append(b1)
-                new_idxs.append(idxs[i])
-
-        return new_boundaries, new_idxs
+        clusters:LevelClusters = LevelClusters(threshold)
+        clusters.extend(boundaries, idxs)
+        return clusters.levels, clusters.idxs
 
     @staticmethod
-    def is_support_pivot(df:pd.DataFrame, idx:int) -> bool:
+    def is_support_pivot(df:Union[pd.DataFrame, Bars], idx:int) -> bool:
         r"""
         checks if index in dataframe is a support pivot
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         idx: (int) - index of potential pivot of interest
             
@@ -155,22 +391,23 @@ class SupportResistance:
         -------------
         returns True if index is a support pivot, else returns False
         """
+        bars:Bars = Bars.of(df)
         for i in range(1, idx+1):
-            if df['low'].iloc[i] > df['low'].iloc[i-1]: return False
+            if bars.low[i] > bars.low[i-1]: return False
 
-        for i in range(idx+1, len(df)):
-            if df['low'].iloc[i] < df['low'].iloc[i-1]: return False
+        for i in range(idx+1, len(bars)):
+            if bars.low[i] < bars.low[i-1]: return False
 
         return True
 
     @staticmethod
-    def is_resistance_pivot(df:pd.DataFrame, idx:int) -> bool:
+    def is_resistance_pivot(df:Union[pd.DataFrame, Bars], idx:int) -> bool:
         r"""
         checks if index in dataframe is a resistance pivot
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         idx: (int) - index of potential pivot of interest
             
@@ -178,22 +415,156 @@ class SupportResistance:
         -------------
         returns True if index is a resistance pivot, else returns False
         """
+        bars:Bars = Bars.of(df)
         for i in range(1, idx+1):
-            if df['high'].iloc[i] < df['high'].iloc[i-1]: return False
+            if bars.high[i] < bars.high[i-1]: return False
 
-        for i in range(idx+1, len(df)):
-            if df['high'].iloc[i] > df['high'].iloc[i-1]: return False
+        for i in range(idx+1, len(bars)):
+            if bars.high[i] > bars.high[i-1]: return False
 
         return True
 
     @staticmethod
-    def get_supports(df:pd.DataFrame, n1:int=2, n2:int=2) -> Tuple[List[float], List[int]]:
+    def pivot_mask(values:np.ndarray, n1:int=2, n2:int=2, support:bool=True) -> np.ndarray:
+        r"""
+        finds every support (or resistance) pivot of a price array in a single
+        vectorized pass. A candle is a pivot if the n1 steps leading into it never
+        move towards it and the n2 steps after it never move back, which is the
+        same rule applied by is_support_pivot / is_resistance_pivot
+
+        parameters
+        -------------
+        values: (numpy.ndarray) - low prices for supports or high prices for resistances
+
+        n1: (int) - number of candles to consider prior to a potential
+        pivot point
+
+        n2: (int) - number of candles to consider after a potential pivot
+        point
+
+        support: (bool) - if True, finds support pivots, else resistance pivots
+            
+        returns
+        -------------
+        returns a boolean mask, True at every pivot index
+        """
+        values = np.asarray(values, dtype=np.float64)
+        mask:np.ndarray = np.zeros(len(values), dtype=bool)
+        if len(values) < n1 + n2 + 1: return mask
+
+        # a step breaks a support pivot if it rises on the way into the pivot,
+        # or falls on the way out of it (the other way round for resistances).
+        # NaN comparisons are False, same as the scalar checks
+        steps:np.ndarray = np.diff(values)
+        left_breaks:np.ndarray = (steps > 0) if support else (steps < 0)
+        right_breaks:np.ndarray = (steps < 0) if support else (steps > 0)
+
+        # prefix sums give the number of breaks in any run of steps in O(1)
+        left_cumsum:np.ndarray = np.concatenate(([0], np.cumsum(left_breaks)))
+        right_cumsum:np.ndarray = np.concatenate(([0], np.cumsum(right_breaks)))
+
+        idxs:np.ndarray = np.arange(n1, len(values) - n2)
+        n_left:np.ndarray = left_cumsum[idxs] - left_cumsum[idxs - n1]
+        n_right:np.ndarray = right_cumsum[idxs + n2] - right_cumsum[idxs]
+
+        mask[idxs] = (n_left == 0) & (n_right == 0)
+        return mask
+
+    @staticmethod
+    def find_levels(
+        low:np.ndarray, high:np.ndarray, n1:int=2, n2:int=2, support:bool=True) -> Tuple[List[float], List[int]]:
+        r"""
+        get the trimmed support (or resistance) levels from low and high price arrays
+
+        parameters
+        -------------
+        low: (numpy.ndarray) - low prices
+
+        high: (numpy.ndarray) - high prices
+
+        n1: (int) - number of candles to consider prior to a potential
+        pivot point
+
+        n2: (int) - number of candles to consider after a potential pivot
+        point
+
+        support: (bool) - if True, finds support levels, else resistance levels
+            
+        returns
+        -------------
+        returns a Tuple of 2 lists, the level values and their corresponding
+        index in the arrays
+        """
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        if len(low) == 0: return [], []
+
+        values:np.ndarray = low if support else high
+        idxs:np.ndarray = np.flatnonzero(SupportResistance.pivot_mask(values, n1, n2, support=support))
+
+        space_threshold:float = np.nanmean(high - low)
+        return SupportResistance.boundary_trimer(values[idxs].tolist(), idxs.tolist(), space_threshold)
+
+    @staticmethod
+    def find_level_strengths(
+        low:np.ndarray, 
+        high:np.ndarray, 
+        n1:int=2, 
+        n2:int=2, 
+        support:bool=True, 
+        half_life:Optional[float]=None) -> Tuple[List[float], List[int], List[float]]:
+        r"""
+        get the trimmed support (or resistance) levels, the same as find_levels, with
+        the strength of every level: the number of pivots that fell within the
+        trimming threshold of it, which separates the levels that were touched many
+        times from single pivots on long histories
+
+        parameters
+        -------------
+        low: (numpy.ndarray) - low prices
+
+        high: (numpy.ndarray) - high prices
+
+        n1: (int) - number of candles to consider prior to a potential
+        pivot point
+
+        n2: (int) - number of candles to consider after a potential pivot
+        point
+
+        support: (bool) - if True, finds support levels, else resistance levels
+
+        half_life: (float, None) - if provided, a pivot counts 0.5 ** (age / half_life)
+        instead of 1, age being the number of candles between the pivot and the last
+        candle, so that recent pivots weigh more (default=None)
+            
+        returns
+        -------------
+        returns a Tuple of 3 lists, the level values, their corresponding index in
+        the arrays and their strength
+        """
+        low = np.asarray(low, dtype=np.float64)
+        high = np.asarray(high, dtype=np.float64)
+        if len(low) == 0: return [], [], []
+
+        values:np.ndarray = low if support else high
+        idxs:np.ndarray = np.flatnonzero(SupportResistance.pivot_mask(values, n1, n2, support=support))
+
+        weights:Optional[np.ndarray] = None
+        if half_life is not None:
+            weights = 0.5 ** ((len(values) - 1 - idxs) / half_life)
+
+        clusters:LevelClusters = LevelClusters(np.nanmean(high - low))
+        clusters.extend(values[idxs].tolist(), idxs.tolist(), weights.tolist() if weights is not None else None)
+        return clusters.levels, clusters.idxs, clusters.strengths
+
+    @staticmethod
+    def get_supports(df:Union[pd.DataFrame, Bars], n1:int=2, n2:int=2) -> Tuple[List[float], List[int]]:
         r"""
         get a list of all support pivots in the stock price dataframe
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         n1: (int) - number of candles to consider prior to a potential
         pivot point
@@ -206,26 +577,18 @@ class SupportResistance:
         returns a Tuple of 2 lists, the support values and their corresponding
         index in the dateframe
         """
-        supports:List[float] = []
-        support_idxs:List[int] = []
-
-        for i in range(n1, len(df)-n2):
-            temp_df:pd.DataFrame = df[i-n1:i+n2+1]
-            if SupportResistance.is_support_pivot(temp_df, n1):
-                supports.append(df['low'].iloc[i])
-                support_idxs.append(i)
-
-        space_threshold:float = np.mean(df['high'] - df['low'])
-        return SupportResistance.boundary_trimer(supports, support_idxs, space_threshold)
+        return SupportResistance.find_levels(
+            np.asarray(df['low']), np.asarray(df['high']), n1=n1, n2=n2, support=True
+        )
 
     @staticmethod
-    def get_resistances(df:pd.DataFrame, n1:int=2, n2:int=2) -> Tuple[List[float], List[int]]:
+    def get_resistances(df:Union[pd.DataFrame, Bars], n1:int=2, n2:int=2) -> Tuple[List[float], List[int]]:
         r"""
         get a list of all resistance pivots in the stock price dataframe
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         n1: (int) - number of candles to consider prior to a potential
         pivot point
@@ -238,156 +601,418 @@ class SupportResistance:
         returns a Tuple of 2 lists, the resistance values and their corresponding
         index in the dateframe
         """
-        resistances:List[float] = []
-        resistance_idxs:List[int] = []
+        return SupportResistance.find_levels(
+            np.asarray(df['low']), np.asarray(df['high']), n1=n1, n2=n2, support=False
+        )
+
+    @staticmethod
+    def candle_near_support(
+        supports:List[float], o:float, h:float, l:float, c:float, threshold:float) -> bool:
+        r"""
+        check if a single candle is close to the nearest of a list of support
+        levels by some threshold
+
+        parameters
+        -------------
+        supports: (List[float]) - support levels
+
+        o, h, l, c: (float) - open, high, low and close price of the candle
+
+        threshold: (float) - threshold value that defines what near a support is
+            
+        returns
+        -------------
+        returns a True if candle is near a support level, else returns False
+        """
+        if len(supports) == 0:return False
+
+        closest_support:float = min(supports, key=lambda x : abs(x - h))
+
+        c1:bool = h > closest_support and max(o, c) > closest_support
+        c2:bool = abs(l - closest_support) <= threshold
+        c3:bool = abs(min(o, c) - closest_support) <= threshold
+        
+        return c1 and (c2 or c3)
+
+    @staticmethod
+    def candle_near_resistance(
+        resistances:List[float], o:float, h:float, l:float, c:float, threshold:float) -> bool:
+        r"""
+        check if a single candle is close to the nearest of a list of resistance
+        levels by some threshold
+
+        parameters
+        -------------
+        resistances: (List[float]) - resistance levels
+
+        o, h, l, c: (float) - open, high, low and close price of the candle
+
+        threshold: (float) - threshold value that defines what near a resistance is
+            
+        returns
+        -------------
+        returns a True if candle is near a resistance level, else returns False
+        """
+        if len(resistances) == 0:return False
 
-        for i in range(n1, len(df)-n2):
-            temp_df:pd.DataFrame = df[i-n1:i+n2+1]
-            if SupportResistance.is_resistance_pivot(temp_df, n1):
-                resistances.append(df['high'].iloc[i])
-                resistance_idxs.append(i)
+        closest_resistance:float = min(resistances, key=lambda x : abs(x - h))
 
-        space_threshold:float = np.mean(df['high'] - df['low'])
-        return SupportResistance.boundary_trimer(resistances, resistance_idxs, space_threshold)
+        c1:bool = l < closest_resistance and min(o, c) < closest_resistance
+        c2:bool = abs(h - closest_resistance) <= threshold
+        c3:bool = abs(max(o, c) - closest_resistance) <= threshold
+
+        return c1 and (c2 or c3)
 
     @staticmethod
-    def is_near_support(df:pd.DataFrame, threshold:float, idx:int=-1):
+    def is_near_support(
+        df:Union[pd.DataFrame, Bars], threshold:float, idx:int=-1, tracker:Optional["SupportResistanceTracker"]=None):
         r"""
         check if a candle of interest is close to a support level by some
         threshold
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         threshold: (float) - threshold value that defines what near a support is
 
         idx: (int) - index of candle of interest
+
+        tracker: (SupportResistanceTracker, None) - if provided, the support levels
+        are read from the tracker instead of being recomputed from df (default=None)
             
         returns
         -------------
         returns a True if candle is near a support pivot, else returns False
         """
-        supports, _ = SupportResistance.get_supports(df)
+        if tracker is not None:
+            supports, _ = tracker.get_supports()
+        else:
+            supports, _ = SupportResistance.get_supports(df)
 
         if len(supports) == 0:return False
 
-        o:float = df['open'].iloc[idx]
-        l:float = df['low'].iloc[idx]
-        h:float = df['high'].iloc[idx]
-        c:float = df['close'].iloc[idx]
-
-        closest_support:float = min(supports, key=lambda x : abs(x - h))
-
-        c1:bool = h > closest_support and max(o, c) > closest_support
-        c2:bool = abs(l - closest_support) <= threshold
-        c3:bool = abs(min(o, c) - closest_support) <= threshold
-        
-        return c1 and (c2 or c3)
+        bars:Bars = Bars.of(df)
+        return SupportResistance.candle_near_support(
+            supports,
+            bars.open[idx], 
+            bars.high[idx], 
+            bars.low[idx], 
+            bars.close[idx], 
+            threshold
+        )
     
-    def rand_at_support(df:pd.DataFrame, p:float=0.5, **kwargs) -> bool:
+    def rand_at_support(df:Union[pd.DataFrame, Bars], p:float=0.5, **kwargs) -> bool:
         if np.random.random() < p:
             return SupportResistance.is_near_support(df, **kwargs)
         return True
 
-    def rand_at_resistance(df:pd.DataFrame, p:float=0.5, **kwargs) -> bool:
+    def rand_at_resistance(df:Union[pd.DataFrame, Bars], p:float=0.5, **kwargs) -> bool:
         if np.random.random() < p:
             return SupportResistance.is_near_resistance(df, **kwargs)
         return True
 
     @staticmethod
-    def is_near_resistance(df:pd.DataFrame, threshold:float, idx:int=-1):
+    def is_near_resistance(
+        df:Union[pd.DataFrame, Bars], threshold:float, idx:int=-1, tracker:Optional["SupportResistanceTracker"]=None):
         r"""
         check if a candle of interest is close to a resistance level by some
         threshold
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         threshold: (float) - threshold value that defines what near a resistance is
 
         idx: (int) - index of candle of interest
+
+        tracker: (SupportResistanceTracker, None) - if provided, the resistance levels
+        are read from the tracker instead of being recomputed from df (default=None)
             
         returns
         -------------
         returns a True if candle is near a resistance pivot, else returns False
         """
-        resistances, _ = SupportResistance.get_resistances(df)
+        if tracker is not None:
+            resistances, _ = tracker.get_resistances()
+        else:
+            resistances, _ = SupportResistance.get_resistances(df)
 
         if len(resistances) == 0:return False
 
-        o:float = df['open'].iloc[idx]
-        l:float = df['low'].iloc[idx]
-        h:float = df['high'].iloc[idx]
-        c:float = df['close'].iloc[idx]
+        bars:Bars = Bars.of(df)
+        return SupportResistance.candle_near_resistance(
+            resistances,
+            bars.open[idx], 
+            bars.high[idx], 
+            bars.low[idx], 
+            bars.close[idx], 
+            threshold
+        )
+    
 
-        closest_resistance:float = min(resistances, key=lambda x : abs(x - h))
+class SupportResistanceTracker:
+    r"""
+    Keeps the pivots of the last `period` closed candles up to date, one closed
+    candle at a time. Pivots are confirmed once the n2 candles after them have
+    closed and are dropped once they get too close to the start of the window,
+    so feeding a new candle costs amortized O(1) instead of a full pivot rescan.
+
+    The levels are trimmed on demand: the first get_supports / get_resistances
+    call after a new candle takes the mean candle range of the window (O(period))
+    and clusters the window's pivots (O(k log k) for k pivots), the result is then
+    cached until the next candle. The levels match SupportResistance.get_supports
+    / get_resistances applied to a dataframe of the same last `period` candles.
+
+    parameters
+    -------------
+    period: (int) - number of past closed candles the levels are computed from
+
+    n1: (int) - number of candles to consider prior to a potential
+    pivot point
+
+    n2: (int) - number of candles to consider after a potential pivot
+    point
+    """
+    def __init__(self, period:int=60, n1:int=2, n2:int=2):
+        self.period:int = period
+        self.n1:int = n1
+        self.n2:int = n2
+        self.reset()
+
+    def reset(self) -> None:
+        r"""
+        clears every candle and pivot held by the tracker
+        """
+        self.last_time:Optional[float] = None
+        self._count:int = 0
 
-        c1:bool = l < closest_resistance and min(o, c) < closest_resistance
-        c2:bool = abs(h - closest_resistance) <= threshold
-        c3:bool = abs(max(o, c) - closest_resistance) <= threshold
+        # last n1 + n2 + 1 candles, enough to confirm the pivot n2 candles back
+        self._lows:Deque[float] = deque(maxlen=self.n1 + self.n2 + 1)
+        self._highs:Deque[float] = deque(maxlen=self.n1 + self.n2 + 1)
+
+        # candle ranges in the window, for the level trimming threshold
+        self._ranges:Deque[float] = deque(maxlen=self.period)
+
+        # (absolute index, level) of confirmed pivots, oldest first
+        self._support_pivots:Deque[Tuple[int, float]] = deque()
+        self._resistance_pivots:Deque[Tuple[int, float]] = deque()
+
+        self._supports:Optional[Tuple[List[float], List[int]]] = None
+        self._resistances:Optional[Tuple[List[float], List[int]]] = None
+
+    def __len__(self) -> int:
+        return len(self._ranges)
+
+    @property
+    def window_start(self) -> int:
+        r"""
+        absolute index of the oldest candle in the window
+        """
+        return max(0, self._count - self.period)
+
+    def update(self, high:float, low:float, time:Optional[float]=None) -> bool:
+        r"""
+        feeds one newly closed candle to the tracker
+
+        parameters
+        -------------
+        high: (float) - high price of the closed candle
+
+        low: (float) - low price of the closed candle
+
+        time: (float, None) - open time of the closed candle, if provided, candles
+        that are not newer than the last one fed are ignored (default=None)
+            
+        returns
+        -------------
+        returns True if the candle was added, else False
+        """
+        if time is not None:
+            if self.last_time is not None and time <= self.last_time: return False
+            self.last_time = time
+
+        high, low = float(high), float(low)
+        self._lows.append(low)
+        self._highs.append(high)
+        self._count += 1
+
+        self._ranges.append(high - low)
+
+        # the candle n2 places back now has all its neighbours
+        if len(self._lows) == self.n1 + self.n2 + 1:
+            pivot_idx:int = self._count - 1 - self.n2
+            if self._is_pivot(self._lows, support=True):
+                self._support_pivots.append((pivot_idx, self._lows[self.n1]))
+            if self._is_pivot(self._highs, support=False):
+                self._resistance_pivots.append((pivot_idx, self._highs[self.n1]))
+
+        # pivots without n1 candles before them inside the window no longer count
+        min_idx:int = self.window_start + self.n1
+        while self._support_pivots and self._support_pivots[0][0] < min_idx:
+            self._support_pivots.popleft()
+        while self._resistance_pivots and self._resistance_pivots[0][0] < min_idx:
+            self._resistance_pivots.popleft()
+
+        self._supports = None
+        self._resistances = None
+        return True
+
+    def extend(self, df:Union[pd.DataFrame, Bars]) -> int:
+        r"""
+        feeds every closed candle in the dataframe that is newer than the last
+        candle fed to the tracker
+
+        parameters
+        -------------
+        df: (pandas.core.frame.DataFrame, Bars) - dataframe or bars of closed candles, sorted by time
+            
+        returns
+        -------------
+        returns the number of candles added
+        """
+        times:np.ndarray = np.asarray(df['time'])
+        start:int = 0
+        if self.last_time is not None:
+            start = int(np.searchsorted(times, self.last_time, side='right'))
+
+        # older candles would be dropped right away, so skip them. If the gap
+        # is larger than the window, the tracked candles are all stale too
+        if len(times) - start >= self.period:
+            self.reset()
+            start = len(times) - self.period
+
+        highs:np.ndarray = np.asarray(df['high'])
+        lows:np.ndarray = np.asarray(df['low'])
+        for i in range(start, len(times)):
+            self.update(highs[i], lows[i], time=times[i])
+
+        return len(times) - start
+
+    def get_supports(self) -> Tuple[List[float], List[int]]:
+        r"""
+        get the trimmed support levels of the current window
+
+        returns
+        -------------
+        returns a Tuple of 2 lists, the support values and their corresponding
+        index in the window
+        """
+        if self._supports is None:
+            self._supports = self._trim(self._support_pivots)
+        return self._supports
+
+    def get_resistances(self) -> Tuple[List[float], List[int]]:
+        r"""
+        get the trimmed resistance levels of the current window
+
+        returns
+        -------------
+        returns a Tuple of 2 lists, the resistance values and their corresponding
+        index in the window
+        """
+        if self._resistances is None:
+            self._resistances = self._trim(self._resistance_pivots)
+        return self._resistances
+
+    def _is_pivot(self, values:Deque[float], support:bool) -> bool:
+        # same rule as SupportResistance.is_support_pivot / is_resistance_pivot
+        sign:float = 1.0 if support else -1.0
+        for i in range(1, self.n1 + 1):
+            if sign * (values[i] - values[i-1]) > 0: return False
+
+        for i in range(self.n1 + 1, len(values)):
+            if sign * (values[i] - values[i-1]) < 0: return False
+
+        return True
+
+    def _trim(self, pivots:Deque[Tuple[int, float]]) -> Tuple[List[float], List[int]]:
+        if len(pivots) == 0: return [], []
+
+        # the mean is taken over the whole window (rather than kept as a running
+        # sum) so that it rounds exactly like get_supports / get_resistances
+        start:int = self.window_start
+        space_threshold:float = np.nanmean(np.fromiter(self._ranges, dtype=np.float64, count=len(self._ranges)))
+        return SupportResistance.boundary_trimer(
+            [level for _, level in pivots], [idx - start for idx, _ in pivots], space_threshold
+        )
 
-        return c1 and (c2 or c3)
-    
 
 class TrendLines:
 
     @staticmethod
-    def append_ema(df: pd.DataFrame, period: int=10) -> pd.DataFrame:
+    def append_ema(df: Union[pd.DataFrame, Bars], period: int=10) -> Union[pd.DataFrame, Bars]:
         r"""
         Computes EMA trendline from closing prices and adds to dataframe as new column
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         period: (int) - EMA period
             
         returns
         -------------
-        returns the dataframe with EMA column
+        returns the dataframe with EMA column (or the bars with their ema array set)
         """
+        import pandas as pd
+        if isinstance(df, Bars):
+            df.ema = pd.Series(df.close).ewm(span=period, adjust=True).mean().to_numpy()
+            return df
+
         ema: pd.Series = df["close"].ewm(span=period, adjust=True).mean()
         df["ema"] = ema
         return df
 
     @staticmethod
-    def is_above_trend_line(df: pd.DataFrame, idx: int=-1) -> bool:
+    def is_above_trend_line(df: Union[pd.DataFrame, Bars], idx: int=-1, ema: Optional[float]=None) -> bool:
         r"""
         checks if the closing price at a given index in the dataframe is 
         above EMA value at the index
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         idx: specified index
+
+        ema: (float, None) - latest EMA value (eg: from a StreamingEMA), if provided
+        the dataframe does not need an "ema" column (default=None)
             
         returns
         -------------
         returns True if value at the point is above EMA line, else False
         """
 
-        if len(df) == 1: return df["close"] > df["ema"]
-        return df["close"].iloc[idx] > df["ema"].iloc[-1]
+        if ema is None and is_frame(df) and len(df) == 1: return df["close"] > df["ema"]
+
+        bars:Bars = Bars.of(df)
+        if ema is None: ema = bars.ema[-1]
+        return bars.close[idx] > ema
 
     @staticmethod
-    def is_below_trend_line(df: pd.DataFrame, idx: int=-1) -> bool:
+    def is_below_trend_line(df: Union[pd.DataFrame, Bars], idx: int=-1, ema: Optional[float]=None) -> bool:
         r"""
         checks if the closing price at a given index in the dataframe is 
         below EMA value at the index
 
         parameters
         -------------
-        df: (pandas.core.frame.DataFrame) - input dataframe
+        df: (pandas.core.frame.DataFrame, Bars) - input dataframe or bars
 
         idx: specified index
+
+        ema: (float, None) - latest EMA value (eg: from a StreamingEMA), if provided
+        the dataframe does not need an "ema" column (default=None)
             
         returns
         -------------
         returns True if value at the point is below EMA line, else False
         """
 
-        if len(df) == 1: return df["close"] < df["ema"]
-        return df["close"].iloc[idx] < df["ema"].iloc[-1]
\ No newline at end of file
+        if ema is None and is_frame(df) and len(df) == 1: return df["close"] < df["ema"]
+
+        bars:Bars = Bars.of(df)
+        if ema is None: ema = bars.ema[-1]
+        return bars.close[idx] < ema
\ No newline at end of file
@@ -0,0 +1,3 @@
+from .base import *
+from .mt5_broker import *
+from .simulator import *
@@ -0,0 +1,409 @@
+import numpy as np
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, NamedTuple, Optional, Tuple, Union
+
+# MetaTrader5 constants used by the bot, with the same values as in the
+# MetaTrader5 package so that requests and results are interchangeable
+TIMEFRAME_M1:int = 1
+TIMEFRAME_M2:int = 2
+TIMEFRAME_M3:int = 3
+TIMEFRAME_M4:int = 4
+TIMEFRAME_M5:int = 5
+TIMEFRAME_M6:int = 6
+TIMEFRAME_M10:int = 10
+TIMEFRAME_M12:int = 12
+TIMEFRAME_M15:int = 15
+TIMEFRAME_M20:int = 20
+TIMEFRAME_M30:int = 30
+TIMEFRAME_H1:int = 1 | 0x4000
+TIMEFRAME_H2:int = 2 | 0x4000
+TIMEFRAME_H3:int = 3 | 0x4000
+TIMEFRAME_H4:int = 4 | 0x4000
+TIMEFRAME_H6:int = 6 | 0x4000
+TIMEFRAME_H8:int = 8 | 0x4000
+TIMEFRAME_H12:int = 12 | 0x4000
+TIMEFRAME_D1:int = 24 | 0x4000
+
+ORDER_TYPE_BUY:int = 0
+ORDER_TYPE_SELL:int = 1
+POSITION_TYPE_BUY:int = 0
+POSITION_TYPE_SELL:int = 1
+DEAL_TYPE_BUY:int = 0
+DEAL_TYPE_SELL:int = 1
+DEAL_ENTRY_IN:int = 0
+DEAL_ENTRY_OUT:int = 1
+DEAL_ENTRY_INOUT:int = 2
+DEAL_ENTRY_OUT_BY:int = 3
+DEAL_REASON_EXPERT:int = 3
+DEAL_REASON_SL:int = 4
+DEAL_REASON_TP:int = 5
+
+TRADE_ACTION_DEAL:int = 1
+TRADE_ACTION_SLTP:int = 6
+ORDER_FILLING_FOK:int = 0
+ORDER_FILLING_IOC:int = 1
+ORDER_FILLING_RETURN:int = 2
+ORDER_TIME_GTC:int = 0
+
+COPY_TICKS_ALL:int = -1
+COPY_TICKS_INFO:int = 1
+COPY_TICKS_TRADE:int = 2
+
+TRADE_RETCODE_DONE:int = 10009
+TRADE_RETCODE_INVALID:int = 10013
+TRADE_RETCODE_INVALID_VOLUME:int = 10014
+TRADE_RETCODE_INVALID_STOPS:int = 10016
+TRADE_RETCODE_MARKET_CLOSED:int = 10018
+TRADE_RETCODE_POSITION_CLOSED:int = 10036
+
+# layout of the arrays returned by copy_rates_from_pos / copy_rates_range
+RATES_DTYPE:np.dtype = np.dtype([
+    ('time', '<i8'), ('open', '<f8'), ('high', '<f8'), ('low', '<f8'), ('close', '<f8'),
+    ('tick_volume', '<u8'), ('spread', '<i4'), ('real_volume', '<u8')
+])
+
+# layout of the arrays returned by copy_ticks_from / copy_ticks_range
+TICKS_DTYPE:np.dtype = np.dtype([
+    ('time', '<i8'), ('bid', '<f8'), ('ask', '<f8'), ('last', '<f8'), ('volume', '<u8'),
+    ('time_msc', '<i8'), ('flags', '<u4'), ('volume_real', '<f8')
+])
+
+
+def timeframe_seconds(timeframe:int) -> int:
+    r"""
+    converts a MetaTrader5 timeframe constant to its duration in seconds
+
+    parameters
+    -------------
+    timeframe: (int) - MetaTrader5 timeframe constant (minutes, or hours | 0x4000)
+
+    returns
+    -------------
+    returns the timeframe duration in seconds
+    """
+    if timeframe & 0x4000:
+        return (timeframe & 0x3FFF) * 3600
+    return timeframe * 60
+
+
+def timeframe_name(timeframe:int) -> str:
+    r"""
+    converts a MetaTrader5 timeframe constant to its name (eg: M1, H4, D1)
+    """
+    if timeframe == TIMEFRAME_D1: return 'D1'
+    if timeframe & 0x4000: return f'H{timeframe & 0x3FFF}'
+    return f'M{timeframe}'
+
+
+def parse_timeframe(name:str) -> int:
+    r"""
+    converts a timeframe name (eg: M1, H4, D1) to its MetaTrader5 timeframe constant
+    """
+    assert len(name) > 1 and name[0] in 'MHD' and name[1:].isdigit(), f'{name} is not a timeframe'
+    if name == 'D1': return TIMEFRAME_D1
+    return int(name[1:]) | (0x4000 if name[0] == 'H' else 0)
+
+
+def to_timestamp(value:Union[datetime, int, float]) -> float:
+    r"""
+    converts a datetime (naive datetimes are taken as UTC, the same as MetaTrader5)
+    or unix timestamp to a unix timestamp
+    """
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            return (value - datetime(1970, 1, 1)).total_seconds()
+        return value.timestamp()
+    return float(value)
+
+
+def bar_starts(times:np.ndarray, period:int) -> np.ndarray:
+    r"""
+    index of the first element of every bar of a sorted series of times, the bars
+    are aligned on multiples of the period (eg: on midnight for D1)
+
+    parameters
+    -------------
+    times: (np.ndarray) - unix timestamps (seconds), sorted
+
+    period: (int) - bar duration in seconds
+
+    returns
+    -------------
+    returns the indexes, the first one is 0 (for a non empty series)
+    """
+    bar_times:np.ndarray = times - times % period
+    return np.flatnonzero(np.r_[True, bar_times[1:] != bar_times[:-1]])
+
+
+def resample_rates(rates:np.ndarray, timeframe:int) -> np.ndarray:
+    r"""
+    builds the bars of a higher timeframe from bars (eg: M15 or H4 bars from M1 bars),
+    the same way the MetaTrader5 terminal does: there are no bars for periods without
+    bars
+
+    parameters
+    -------------
+    rates: (np.ndarray) - bars in the layout of copy_rates_from_pos, sorted by time,
+    of a timeframe that divides the new one
+
+    timeframe: (int) - MetaTrader5 timeframe constant of the new bars
+
+    returns
+    -------------
+    returns a structured array in the layout of copy_rates_from_pos, the volumes are
+    the sums of the bars' volumes and the spread is their lowest spread
+    """
+    if len(rates) == 0: return np.zeros(0, dtype=RATES_DTYPE)
+
+    period:int = timeframe_seconds(timeframe)
+    times:np.ndarray = rates['time']
+    starts:np.ndarray = bar_starts(times, period)
+    ends:np.ndarray = np.r_[starts[1:], len(rates)]
+
+    resampled:np.ndarray = np.zeros(len(starts), dtype=RATES_DTYPE)
+    resampled['time'] = times[starts] - times[starts] % period
+    resampled['open'] = rates['open'][starts]
+    resampled['high'] = np.maximum.reduceat(rates['high'], starts)
+    resampled['low'] = np.minimum.reduceat(rates['low'], starts)
+    resampled['close'] = rates['close'][ends - 1]
+    resampled['tick_volume'] = np.add.reduceat(rates['tick_volume'], starts)
+    resampled['spread'] = np.minimum.reduceat(rates['spread'], starts)
+    resampled['real_volume'] = np.add.reduceat(rates['real_volume'], starts)
+    return resampled
+
+
+def ticks_to_rates(ticks:np.ndarray, timeframe:int, price:str='bid') -> np.ndarray:
+    r"""
+    builds the OHLC bars of ticks, the same way the MetaTrader5 terminal does: a bar
+    opens with the first tick of its period and there are no bars for periods
+    without ticks
+
+    parameters
+    -------------
+    ticks: (np.ndarray) - ticks in the layout of copy_ticks_from, sorted by time
+
+    timeframe: (int) - MetaTrader5 timeframe constant of the bars
+
+    price: (str) - tick price the bars are built from (default='bid')
+
+    returns
+    -------------
+    returns a structured array in the layout of copy_rates_from_pos, tick_volume
+    is the number of ticks of each bar
+    """
+    if len(ticks) == 0: return np.zeros(0, dtype=RATES_DTYPE)
+
+    period:int = timeframe_seconds(timeframe)
+    times:np.ndarray = ticks['time_msc'] // 1000
+    prices:np.ndarray = ticks[price]
+
+    # index of the first tick of every bar
+    starts:np.ndarray = bar_starts(times, period)
+    ends:np.ndarray = np.r_[starts[1:], len(ticks)]
+
+    rates:np.ndarray = np.zeros(len(starts), dtype=RATES_DTYPE)
+    rates['time'] = times[starts] - times[starts] % period
+    rates['open'] = prices[starts]
+    rates['high'] = np.maximum.reduceat(prices, starts)
+    rates['low'] = np.minimum.reduceat(prices, starts)
+    rates['close'] = prices[ends - 1]
+    rates['tick_volume'] = ends - starts
+    rates['real_volume'] = np.add.reduceat(ticks['volume'], starts)
+    return rates
+
+
+# records returned by the brokers, they hold the fields of their MetaTrader5
+# counterparts that the bot uses
+class SymbolInfo(NamedTuple):
+    name:str
+    bid:float
+    ask:float
+    digits:int
+    point:float
+    spread:int
+    trade_contract_size:float
+    volume_min:float
+    volume_max:float
+    volume_step:float
+    visible:bool = True
+
+
+class Tick(NamedTuple):
+    time:int
+    bid:float
+    ask:float
+    last:float
+    volume:int
+    time_msc:int
+    flags:int
+    volume_real:float
+
+
+class AccountInfo(NamedTuple):
+    login:int
+    balance:float
+    equity:float
+    profit:float
+    margin:float
+    margin_free:float
+    leverage:int
+    currency:str
+    server:str
+    name:str
+
+
+class TradePosition(NamedTuple):
+    ticket:int
+    time:int
+    time_msc:int
+    time_update:int
+    time_update_msc:int
+    type:int
+    magic:int
+    identifier:int
+    reason:int
+    volume:float
+    price_open:float
+    sl:float
+    tp:float
+    price_current:float
+    swap:float
+    profit:float
+    symbol:str
+    comment:str
+    external_id:str = ''
+
+
+class TradeDeal(NamedTuple):
+    ticket:int
+    order:int
+    time:int
+    time_msc:int
+    type:int
+    entry:int
+    magic:int
+    position_id:int
+    reason:int
+    volume:float
+    price:float
+    commission:float
+    swap:float
+    profit:float
+    fee:float
+    symbol:str
+    comment:str
+    external_id:str = ''
+
+
+class OrderSendResult(NamedTuple):
+    retcode:int
+    deal:int
+    order:int
+    volume:float
+    price:float
+    bid:float
+    ask:float
+    comment:str
+    request_id:int
+    retcode_external:int
+    request:Any
+
+
+class Broker(ABC):
+    r"""
+    Interface between the bot and a trading venue. The methods have the same
+    names, arguments and results as the functions of the MetaTrader5 package,
+    plus time / sleep so that simulated brokers can run on their own clock.
+    The MetaTrader5 constants are available as attributes of every broker.
+    """
+    TIMEFRAME_M1 = TIMEFRAME_M1
+    TIMEFRAME_M2 = TIMEFRAME_M2
+    TIMEFRAME_M3 = TIMEFRAME_M3
+    TIMEFRAME_M4 = TIMEFRAME_M4
+    TIMEFRAME_M5 = TIMEFRAME_M5
+    TIMEFRAME_M10 = TIMEFRAME_M10
+    TIMEFRAME_M12 = TIMEFRAME_M12
+    TIMEFRAME_M15 = TIMEFRAME_M15
+    ORDER_TYPE_BUY = ORDER_TYPE_BUY
+    ORDER_TYPE_SELL = ORDER_TYPE_SELL
+    DEAL_ENTRY_IN = DEAL_ENTRY_IN
+    DEAL_ENTRY_OUT = DEAL_ENTRY_OUT
+    DEAL_ENTRY_INOUT = DEAL_ENTRY_INOUT
+    DEAL_ENTRY_OUT_BY = DEAL_ENTRY_OUT_BY
+    TRADE_ACTION_DEAL = TRADE_ACTION_DEAL
+    TRADE_ACTION_SLTP = TRADE_ACTION_SLTP
+    ORDER_FILLING_FOK = ORDER_FILLING_FOK
+    ORDER_FILLING_IOC = ORDER_FILLING_IOC
+    ORDER_FILLING_RETURN = ORDER_FILLING_RETURN
+    ORDER_TIME_GTC = ORDER_TIME_GTC
+    COPY_TICKS_ALL = COPY_TICKS_ALL
+    COPY_TICKS_INFO = COPY_TICKS_INFO
+    COPY_TICKS_TRADE = COPY_TICKS_TRADE
+    TRADE_RETCODE_DONE = TRADE_RETCODE_DONE
+
+    @abstractmethod
+    def initialize(self, **kwargs) -> bool: ...
+
+    @abstractmethod
+    def shutdown(self) -> None: ...
+
+    @abstractmethod
+    def last_error(self) -> Tuple[int, str]: ...
+
+    @abstractmethod
+    def account_info(self) -> Optional[AccountInfo]: ...
+
+    @abstractmethod
+    def symbols_get(self, group:Optional[str]=None) -> Optional[Tuple[SymbolInfo, ...]]: ...
+
+    @abstractmethod
+    def symbol_info(self, symbol:str) -> Optional[SymbolInfo]: ...
+
+    @abstractmethod
+    def symbol_info_tick(self, symbol:str) -> Optional[Tick]: ...
+
+    @abstractmethod
+    def copy_rates_from_pos(self, symbol:str, timeframe:int, start_pos:int, count:int) -> Optional[np.ndarray]: ...
+
+    @abstractmethod
+    def copy_rates_range(
+        self, symbol:str, timeframe:int, date_from:Union[datetime, int], 
+        date_to:Union[datetime, int]) -> Optional[np.ndarray]: ...
+
+    @abstractmethod
+    def copy_ticks_from(
+        self, symbol:str, date_from:Union[datetime, int], count:int, flags:int) -> Optional[np.ndarray]: ...
+
+    @abstractmethod
+    def copy_ticks_range(
+        self, symbol:str, date_from:Union[datetime, int], date_to:Union[datetime, int],
+        flags:int) -> Optional[np.ndarray]: ...
+
+    @abstractmethod
+    def order_send(self, request:dict) -> Optional[OrderSendResult]: ...
+
+    @abstractmethod
+    def positions_get(self, **kwargs) -> Optional[Tuple[TradePosition, ...]]: ...
+
+    @abstractmethod
+    def history_deals_get(self, *args, **kwargs) -> Optional[Tuple[TradeDeal, ...]]: ...
+
+    @abstractmethod
+    def time(self) -> float:
+        r"""
+        current time of the broker's clock (unix timestamp)
+        """
+
+    @abstractmethod
+    def sleep(self, seconds:float) -> None:
+        r"""
+        waits for some seconds on the broker's clock
+        """
+
+    @property
+    def finished(self) -> bool:
+        r"""
+        True if the broker has no more data to serve (only for replayed data)
+        """
+        return False
@@ -0,0 +1,92 @@
+import time
+import threading
+import numpy as np
+from datetime import datetime
+from typing import Optional, Tuple, Union
+from .base import *
+
+
+class MT5Broker(Broker):
+    r"""
+    Broker backed by a MetaTrader5 terminal, every call is forwarded to the
+    MetaTrader5 package (which is only imported when this broker is created).
+
+    The MetaTrader5 package is not thread safe, while the bot calls the broker from
+    the loop and from background threads (order pipeline, symbol registry refresh),
+    so the calls are serialized by a lock. The terminal's error is read under the
+    lock right after a call fails, so last_error() returns the error of the calling
+    thread's last failed call rather than that of a call made meanwhile by another
+    thread
+    """
+    def __init__(self):
+        import MetaTrader5
+        self._mt5 = MetaTrader5
+        self._lock:threading.Lock = threading.Lock()
+        # error of each thread's last call, None if it succeeded
+        self._local:threading.local = threading.local()
+
+    def _call(self, fn, *args, **kwargs):
+        # calls a MetaTrader5 function under the lock, the terminal's error is
+        # kept for the calling thread if the call failed (returned None or False)
+        with self._lock:
+            result = fn(*args, **kwargs)
+            self._local.error = self._mt5.last_error() if result is None or result is False else None
+            return result
+
+    def initialize(self, **kwargs) -> bool:
+        return self._call(self._mt5.initialize, **kwargs)
+
+    def shutdown(self) -> None:
+        with self._lock:
+            self._mt5.shutdown()
+
+    def last_error(self) -> Tuple[int, str]:
+        error:Optional[Tuple[int, str]] = getattr(self._local, 'error', None)
+        if error is not None: return error
+        with self._lock:
+            return self._mt5.last_error()
+
+    def account_info(self):
+        return self._call(self._mt5.account_info)
+
+    def symbols_get(self, group:Optional[str]=None):
+        if group is None: return self._call(self._mt5.symbols_get)
+        return self._call(self._mt5.symbols_get, group=group)
+
+    def symbol_info(self, symbol:str):
+        return self._call(self._mt5.symbol_info, symbol)
+
+    def symbol_info_tick(self, symbol:str):
+        return self._call(self._mt5.symbol_info_tick, symbol)
+
+    def copy_rates_from_pos(self, symbol:str, timeframe:int, start_pos:int, count:int) -> Optional[np.ndarray]:
+        return self._call(self._mt5.copy_rates_from_pos, symbol, timeframe, start_pos, count)
+
+    def copy_rates_range(
+        self, symbol:str, timeframe:int, date_from:Union[datetime, int], 
+        date_to:Union[datetime, int]) -> Optional[np.ndarray]:
+        return self._call(self._mt5.copy_rates_range, symbol, timeframe, date_from, date_to)
+
+    def copy_ticks_from(
+        self, symbol:str, date_from:Union[datetime, int], count:int, flags:int) -> Optional[np.ndarray]:
+        return self._call(self._mt5.copy_ticks_from, symbol, date_from, count, flags)
+
+    def copy_ticks_range(
+        self, symbol:str, date_from:Union[datetime, int], date_to:Union[datetime, int],
+        flags:int) -> Optional[np.ndarray]:
+        return self._call(self._mt5.copy_ticks_range, symbol, date_from, date_to, flags)
+
+    def order_send(self, request:dict):
+        return self._call(self._mt5.order_send, request)
+
+    def positions_get(self, **kwargs):
+        return self._call(self._mt5.positions_get, **kwargs)
+
+    def history_deals_get(self, *args, **kwargs):
+        return self._call(self._mt5.history_deals_get, *args, **kwargs)
+
+    def time(self) -> float:
+        return time.time()
+
+    def sleep(self, seconds:float) -> None:
+        time.sleep(seconds)
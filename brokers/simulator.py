@@ -0,0 +1,670 @@
+from __future__ import annotations
+import math
+import bisect
+import numpy as np
+from datetime import datetime
+from typing import TYPE_CHECKING, Dict, Iterator, List, Optional, Tuple, Union
+from .base import *
+
+# pandas is only imported to load recorded bars / ticks, see from_files
+if TYPE_CHECKING: import pandas as pd
+
+
+class SimulatedBroker(Broker):
+    r"""
+    In-process broker that replays recorded bars on a virtual clock and matches
+    orders locally, so the trading loop can run headless and without a terminal.
+    sleep() advances the virtual clock instantly, so a replay runs at full CPU speed.
+
+    Inside a bar, the bid price moves linearly from the open to the low, the high
+    and the close (or to the high before the low for bearish bars), one third of
+    the bar duration each. Forming bars, current prices and stop loss / take profit
+    fills all follow that path, a gap between two bars fills at the next bar's open.
+
+    Symbols with recorded ticks follow the ticks instead: the bid is the bid of the
+    latest tick and stops fill at the first tick that crosses them. For the other
+    symbols, copy_ticks_from / copy_ticks_range serve one tick per turning point of
+    the price path (open, low / high, high / low and close of every bar).
+
+    The bars of every timeframe that is a multiple of the replayed one (eg: M5, M15
+    or H1 bars of M1 bars) are served too, resampled from the replayed bars.
+
+    parameters
+    -------------
+    bars: (Dict[str, pandas.core.frame.DataFrame]) - bars (bid prices) of every
+    symbol, with time, open, high, low and close columns
+
+    timeframe: (int) - MetaTrader5 timeframe constant of the bars
+
+    start: (int) - index of the bar (of the first symbol) the clock starts at, the
+    bars before it are served as history
+
+    spread: (float) - spread in price units (ask = bid + spread)
+
+    point: (float) - point size of the symbols
+
+    digits: (int) - number of digits of the symbols' prices
+
+    contract_size: (float) - units of the base asset in 1 lot
+
+    balance: (float) - starting balance of the account
+
+    commission: (float) - commission charged per lot on every deal
+
+    ticks: (Dict[str, Union[pandas.core.frame.DataFrame, np.ndarray]], None) - recorded
+    ticks of some symbols, with time_msc (or time) and bid columns (see from_tick_files)
+    """
+    def __init__(
+        self,
+        bars:Dict[str, pd.DataFrame],
+        timeframe:int=TIMEFRAME_M1,
+        start:int=1000,
+        spread:float=0.0,
+        point:float=1e-5,
+        digits:int=5,
+        contract_size:float=100_000.0,
+        balance:float=10_000.0,
+        commission:float=0.0,
+        ticks:Optional[Dict[str, Union[pd.DataFrame, np.ndarray]]]=None):
+
+        assert len(bars) > 0, 'no bars to replay'
+
+        self.timeframe:int = timeframe
+        self.period:int = timeframe_seconds(timeframe)
+        self.spread:float = spread
+        self.point:float = point
+        self.digits:int = digits
+        self.contract_size:float = contract_size
+        self.commission:float = commission
+
+        self._rates:Dict[str, np.ndarray] = {}
+        for symbol, df in bars.items():
+            rates:np.ndarray = np.zeros(len(df), dtype=RATES_DTYPE)
+            for col in RATES_DTYPE.names:
+                if col in df.columns: rates[col] = df[col].to_numpy()
+            self._rates[symbol] = rates
+
+        self._ticks:Dict[str, np.ndarray] = {
+            symbol:self._tick_array(symbol_ticks) for symbol, symbol_ticks in (ticks or {}).items()
+        }
+        self._synthetic_ticks:Dict[str, np.ndarray] = {}
+        # (symbol, timeframe) -> bars of a higher timeframe, and the index of the first
+        # replayed bar of each of them
+        self._resampled:Dict[Tuple[str, int], Tuple[np.ndarray, np.ndarray]] = {}
+        # contiguous time_msc of the ticks of every symbol, for fast searches
+        self._tick_times:Dict[str, np.ndarray] = {
+            symbol:np.ascontiguousarray(symbol_ticks['time_msc']) for symbol, symbol_ticks in self._ticks.items()
+        }
+
+        first:np.ndarray = next(iter(self._rates.values()))
+        self._now:float = float(first['time'][min(start, len(first) - 1)])
+        self._end:float = max(float(rates['time'][-1]) for rates in self._rates.values()) + self.period
+
+        self._balance:float = balance
+        self._positions:Dict[int, dict] = {}
+        self._deals:List[TradeDeal] = []
+        # deal times, in the (time) order the deals were made
+        self._deal_times:List[int] = []
+        self._next_ticket:int = 1
+        self._last_error:Tuple[int, str] = (1, 'Success')
+
+    @classmethod
+    def from_files(cls, paths:Dict[str, str], **kwargs) -> "SimulatedBroker":
+        r"""
+        creates a simulated broker from local CSV / Parquet bar files
+
+        parameters
+        -------------
+        paths: (Dict[str, str]) - path to the bars file of every symbol
+
+        kwargs: keyword arguments of SimulatedBroker
+
+        returns
+        -------------
+        returns a SimulatedBroker
+        """
+        from backtesting import load_bars
+        return cls({symbol:load_bars(path) for symbol, path in paths.items()}, **kwargs)
+
+    @classmethod
+    def from_tick_files(
+        cls, paths:Dict[str, str], timeframe:int=TIMEFRAME_M1, spread:Optional[float]=None,
+        **kwargs) -> "SimulatedBroker":
+        r"""
+        creates a simulated broker that replays recorded ticks, the bars of the
+        timeframe are built from the ticks' bid prices
+
+        parameters
+        -------------
+        paths: (Dict[str, str]) - path to the ticks file of every symbol (see load_ticks)
+
+        timeframe: (int) - MetaTrader5 timeframe constant of the bars
+
+        spread: (float, None) - spread in price units, defaults to the median spread of
+        the ticks
+
+        kwargs: keyword arguments of SimulatedBroker
+
+        returns
+        -------------
+        returns a SimulatedBroker
+        """
+        import pandas as pd
+        from backtesting import load_ticks
+        ticks:Dict[str, np.ndarray] = {symbol:cls._tick_array(load_ticks(path)) for symbol, path in paths.items()}
+
+        if spread is None:
+            spreads:np.ndarray = np.concatenate([t['ask'] - t['bid'] for t in ticks.values()])
+            spread = max(0.0, float(np.median(spreads))) if len(spreads) > 0 else 0.0
+
+        bars:Dict[str, pd.DataFrame] = {
+            symbol:pd.DataFrame(ticks_to_rates(symbol_ticks, timeframe)) for symbol, symbol_ticks in ticks.items()
+        }
+        return cls(bars, timeframe=timeframe, spread=spread, ticks=ticks, **kwargs)
+
+    # clock
+    #-------------------------------------------------------------------------------------------------------------
+    def time(self) -> float:
+        return self._now
+
+    def sleep(self, seconds:float) -> None:
+        end:float = self._now + max(seconds, 0.0)
+        self._match_stops(self._now, end)
+        self._now = end
+
+    @property
+    def finished(self) -> bool:
+        return self._now >= self._end
+    #-------------------------------------------------------------------------------------------------------------
+
+    # terminal and market data
+    #-------------------------------------------------------------------------------------------------------------
+    def initialize(self, **kwargs) -> bool:
+        return True
+
+    def shutdown(self) -> None:
+        pass
+
+    def last_error(self) -> Tuple[int, str]:
+        return self._last_error
+
+    def account_info(self) -> AccountInfo:
+        profit:float = sum(self._position_record(ticket).profit for ticket in self._positions)
+        return AccountInfo(
+            login=0, balance=self._balance, equity=self._balance + profit, profit=profit, margin=0.0,
+            margin_free=self._balance + profit, leverage=100, currency='USD', server='simulator', name='simulator'
+        )
+
+    def symbols_get(self, group:Optional[str]=None) -> Tuple[SymbolInfo, ...]:
+        return tuple(self.symbol_info(symbol) for symbol in self._rates)
+
+    def symbol_info(self, symbol:str) -> Optional[SymbolInfo]:
+        if symbol not in self._rates: return self._error(-1, f'unknown symbol {symbol}')
+
+        bid:float = self._price(symbol, self._now)
+        return SymbolInfo(
+            name=symbol, bid=bid, ask=bid + self.spread, digits=self.digits, point=self.point,
+            spread=int(round(self.spread / self.point)), trade_contract_size=self.contract_size,
+            volume_min=0.01, volume_max=100.0, volume_step=0.01
+        )
+
+    def symbol_info_tick(self, symbol:str) -> Optional[Tick]:
+        if symbol not in self._rates: return self._error(-1, f'unknown symbol {symbol}')
+
+        bid:float = self._price(symbol, self._now)
+        return Tick(
+            time=int(self._now), bid=bid, ask=bid + self.spread, last=0.0, volume=0,
+            time_msc=int(self._now * 1000), flags=0, volume_real=0.0
+        )
+
+    def copy_rates_from_pos(self, symbol:str, timeframe:int, start_pos:int, count:int) -> Optional[np.ndarray]:
+        if not self._check_series(symbol, timeframe): return None
+
+        current:int = self._bar_index(symbol, self._now)
+        if current < 0: return self._error(-1, 'no bars before the current time')
+        series, k = self._series(symbol, timeframe, current)
+
+        stop:int = k + 1 - start_pos
+        start:int = max(0, stop - count)
+        if stop <= 0: return np.zeros(0, dtype=RATES_DTYPE)
+
+        rates:np.ndarray = series[start:stop].copy()
+        if stop == k + 1: rates[-1] = self._forming_series_bar(symbol, timeframe, k, current)
+        return rates
+
+    def copy_rates_range(
+        self, symbol:str, timeframe:int, date_from:Union[datetime, int],
+        date_to:Union[datetime, int]) -> Optional[np.ndarray]:
+        if not self._check_series(symbol, timeframe): return None
+
+        current:int = self._bar_index(symbol, self._now)
+        series, k = self._series(symbol, timeframe, current)
+        times:np.ndarray = series['time']
+        start:int = int(np.searchsorted(times, to_timestamp(date_from), side='left'))
+        stop:int = min(int(np.searchsorted(times, to_timestamp(date_to), side='right')), k + 1)
+        if stop <= start: return np.zeros(0, dtype=RATES_DTYPE)
+
+        rates:np.ndarray = series[start:stop].copy()
+        if stop == k + 1: rates[-1] = self._forming_series_bar(symbol, timeframe, k, current)
+        return rates
+
+    def copy_ticks_from(
+        self, symbol:str, date_from:Union[datetime, int], count:int, flags:int=COPY_TICKS_ALL) -> Optional[np.ndarray]:
+        if symbol not in self._rates: return self._error(-1, f'unknown symbol {symbol}')
+
+        ticks:np.ndarray = self._tick_series(symbol)
+        start:int = self._tick_index(symbol, to_timestamp(date_from), side='left')
+        stop:int = self._tick_index(symbol, self._now)
+        return ticks[start:max(start, min(stop, start + count))].copy()
+
+    def copy_ticks_range(
+        self, symbol:str, date_from:Union[datetime, int], date_to:Union[datetime, int],
+        flags:int=COPY_TICKS_ALL) -> Optional[np.ndarray]:
+        if symbol not in self._rates: return self._error(-1, f'unknown symbol {symbol}')
+
+        ticks:np.ndarray = self._tick_series(symbol)
+        start:int = self._tick_index(symbol, to_timestamp(date_from), side='left')
+        stop:int = self._tick_index(symbol, min(to_timestamp(date_to), self._now))
+        return ticks[start:max(start, stop)].copy()
+    #-------------------------------------------------------------------------------------------------------------
+
+    # trading
+    #-------------------------------------------------------------------------------------------------------------
+    def order_send(self, request:dict) -> Optional[OrderSendResult]:
+        action:int = request.get('action')
+        if action == TRADE_ACTION_DEAL:
+            if request.get('position'): return self._close_by_request(request)
+            return self._open(request)
+
+        if action == TRADE_ACTION_SLTP: return self._modify(request)
+        return self._result(TRADE_RETCODE_INVALID, request, comment='Unsupported trade action')
+
+    def positions_get(self, **kwargs) -> Tuple[TradePosition, ...]:
+        tickets:List[int] = list(self._positions)
+        if 'ticket' in kwargs: tickets = [t for t in tickets if t == kwargs['ticket']]
+        if 'symbol' in kwargs: tickets = [t for t in tickets if self._positions[t]['symbol'] == kwargs['symbol']]
+        return tuple(self._position_record(ticket) for ticket in tickets)
+
+    def history_deals_get(self, *args, **kwargs) -> Tuple[TradeDeal, ...]:
+        deals:List[TradeDeal] = self._deals
+        if 'position' in kwargs:
+            return tuple(deal for deal in deals if deal.position_id == kwargs['position'])
+        if 'ticket' in kwargs:
+            return tuple(deal for deal in deals if deal.ticket == kwargs['ticket'])
+
+        date_from:float = to_timestamp(args[0] if len(args) > 0 else kwargs.get('date_from', 0))
+        date_to:float = to_timestamp(args[1] if len(args) > 1 else kwargs.get('date_to', self._now))
+        # the deals are in time order, a range query only copies the deals in range
+        start:int = bisect.bisect_left(self._deal_times, date_from)
+        end:int = bisect.bisect_right(self._deal_times, date_to)
+        return tuple(deals[start:end])
+
+    def _open(self, request:dict) -> OrderSendResult:
+        symbol:str = request['symbol']
+        if symbol not in self._rates: return self._result(TRADE_RETCODE_INVALID, request, comment='Invalid symbol')
+        if self.finished: return self._result(TRADE_RETCODE_MARKET_CLOSED, request, comment='Market closed')
+
+        volume:float = float(request.get('volume', 0.0))
+        if volume <= 0: return self._result(TRADE_RETCODE_INVALID_VOLUME, request, comment='Invalid volume')
+
+        order_type:int = request['type']
+        bid:float = self._price(symbol, self._now)
+        price:float = bid + self.spread if order_type == ORDER_TYPE_BUY else bid
+        sl, tp = float(request.get('sl', 0.0)), float(request.get('tp', 0.0))
+        if not self._valid_stops(order_type, bid, sl, tp):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, comment='Invalid stops')
+
+        ticket:int = self._new_ticket()
+        self._positions[ticket] = {
+            'symbol': symbol, 'type': order_type, 'volume': volume, 'price_open': price, 'sl': sl, 'tp': tp,
+            'time': self._now, 'time_update': self._now, 'magic': int(request.get('magic', 0)),
+            'comment': str(request.get('comment', ''))
+        }
+        deal:TradeDeal = self._add_deal(ticket, ticket, DEAL_ENTRY_IN, order_type, price, 0.0, DEAL_REASON_EXPERT)
+        return self._result(TRADE_RETCODE_DONE, request, order=ticket, deal=deal.ticket, price=price, volume=volume)
+
+    def _close_by_request(self, request:dict) -> OrderSendResult:
+        ticket:int = request['position']
+        if ticket not in self._positions:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment='Position doesn\'t exist')
+
+        position:dict = self._positions[ticket]
+        bid:float = self._price(position['symbol'], self._now)
+        price:float = bid if position['type'] == ORDER_TYPE_BUY else bid + self.spread
+        deal:TradeDeal = self._close(ticket, price, DEAL_REASON_EXPERT)
+        return self._result(
+            TRADE_RETCODE_DONE, request, order=self._new_ticket(), deal=deal.ticket, price=price, volume=deal.volume
+        )
+
+    def _modify(self, request:dict) -> OrderSendResult:
+        ticket:int = request.get('position')
+        if ticket not in self._positions:
+            return self._result(TRADE_RETCODE_POSITION_CLOSED, request, comment='Position doesn\'t exist')
+
+        position:dict = self._positions[ticket]
+        sl, tp = float(request.get('sl', 0.0)), float(request.get('tp', 0.0))
+        if not self._valid_stops(position['type'], self._price(position['symbol'], self._now), sl, tp):
+            return self._result(TRADE_RETCODE_INVALID_STOPS, request, comment='Invalid stops')
+
+        position['sl'], position['tp'], position['time_update'] = sl, tp, self._now
+        return self._result(TRADE_RETCODE_DONE, request, order=ticket)
+
+    def _close(self, ticket:int, price:float, reason:int) -> TradeDeal:
+        position:dict = self._positions.pop(ticket)
+        direction:int = 1 if position['type'] == ORDER_TYPE_BUY else -1
+        profit:float = (price - position['price_open']) * direction * position['volume'] * self.contract_size
+        close_type:int = DEAL_TYPE_SELL if direction == 1 else DEAL_TYPE_BUY
+
+        deal:TradeDeal = self._add_deal(
+            self._new_ticket(), ticket, DEAL_ENTRY_OUT, close_type, price, profit, reason, position=position
+        )
+        self._balance += profit
+        return deal
+
+    def _add_deal(
+        self, order:int, position_id:int, entry:int, deal_type:int, price:float,
+        profit:float, reason:int, position:Optional[dict]=None) -> TradeDeal:
+        position = position or self._positions[position_id]
+        commission:float = -self.commission * position['volume']
+        self._balance += commission
+
+        deal:TradeDeal = TradeDeal(
+            ticket=self._new_ticket(), order=order, time=int(self._now), time_msc=int(self._now * 1000),
+            type=deal_type, entry=entry, magic=position['magic'], position_id=position_id, reason=reason,
+            volume=position['volume'], price=price, commission=commission, swap=0.0, profit=profit, fee=0.0,
+            symbol=position['symbol'], comment=position['comment']
+        )
+        self._deals.append(deal)
+        self._deal_times.append(deal.time)
+        return deal
+    #-------------------------------------------------------------------------------------------------------------
+
+    # stop loss / take profit matching
+    #-------------------------------------------------------------------------------------------------------------
+    def _match_stops(self, t0:float, t1:float) -> None:
+        if not self._positions: return
+
+        by_symbol:Dict[str, List[int]] = {}
+        for ticket, position in self._positions.items():
+            if position['sl'] != 0 or position['tp'] != 0:
+                by_symbol.setdefault(position['symbol'], []).append(ticket)
+
+        # the stops are matched one symbol at a time, then closed in time order so
+        # that the deals (and their tickets) stay in time order across the symbols
+        fills:List[Tuple[float, int, Tuple[float, int]]] = []
+        for symbol, tickets in by_symbol.items():
+            for price_start, price_end, is_gap, time in self._segments(symbol, t0, t1):
+                for ticket in list(tickets):
+                    fill:Optional[Tuple[float, int]] = self._segment_fill(
+                        self._positions[ticket], price_start, price_end, is_gap
+                    )
+                    if fill is None: continue
+
+                    fills.append((time, ticket, fill))
+                    tickets.remove(ticket)
+
+                if not tickets: break
+
+        now:float = self._now
+        for time, ticket, fill in sorted(fills, key=lambda fill: fill[0]):
+            self._now = time
+            self._close(ticket, *fill)
+        self._now = now
+
+    def _segment_fill(
+        self, position:dict, price_start:float, price_end:float, is_gap:bool) -> Optional[Tuple[float, int]]:
+        # long positions close at the bid, short positions at the ask
+        direction:int = 1 if position['type'] == ORDER_TYPE_BUY else -1
+        if direction == -1:
+            price_start, price_end = price_start + self.spread, price_end + self.spread
+
+        sl, tp = position['sl'], position['tp']
+        lo, hi = min(price_start, price_end), max(price_start, price_end)
+        if direction == 1:
+            hit_sl, hit_tp = (sl != 0 and lo <= sl), (tp != 0 and hi >= tp)
+        else:
+            hit_sl, hit_tp = (sl != 0 and hi >= sl), (tp != 0 and lo <= tp)
+
+        if not (hit_sl or hit_tp): return None
+        if hit_sl and hit_tp:
+            # the path is monotonic within a segment, so its direction tells which comes first
+            hit_sl = (price_end < price_start) if direction == 1 else (price_end > price_start)
+
+        level, reason = (sl, DEAL_REASON_SL) if hit_sl else (tp, DEAL_REASON_TP)
+        if is_gap: return price_end, reason
+
+        already_crossed:bool = (
+            (price_start <= level if direction == 1 else price_start >= level) if hit_sl
+            else (price_start >= level if direction == 1 else price_start <= level)
+        )
+        return (price_start if already_crossed else level), reason
+
+    def _segments(self, symbol:str, t0:float, t1:float) -> Iterator[Tuple[float, float, bool, float]]:
+        # yields the linear pieces (start price, end price, is gap, end time) of the
+        # price path between t0 and t1, in time order
+        if symbol in self._ticks:
+            yield from self._tick_segments(symbol, t0, t1)
+            return
+
+        rates:np.ndarray = self._rates[symbol]
+        k:int = self._bar_index(symbol, t0)
+        t:float = t0
+
+        while t < t1:
+            if k >= 0:
+                bar_end:float = rates['time'][k] + self.period
+                if t < bar_end:
+                    seg_end:float = min(t1, bar_end)
+                    xs, ys = self._path(rates[k])
+                    f0:float = (t - rates['time'][k]) / self.period
+                    f1:float = (seg_end - rates['time'][k]) / self.period
+
+                    points:List[Tuple[float, float]] = [(f0, self._interp(xs, ys, f0))]
+                    points += [(x, y) for x, y in zip(xs, ys) if f0 < x < f1]
+                    points.append((f1, self._interp(xs, ys, f1)))
+                    for (_, p0), (x1, p1) in zip(points[:-1], points[1:]):
+                        yield p0, p1, False, rates['time'][k] + x1 * self.period
+                    t = seg_end
+                    continue
+
+            if k + 1 >= len(rates) or rates['time'][k+1] > t1: break
+
+            # jump to the next bar's open
+            if k >= 0: yield rates['close'][k], rates['open'][k+1], True, float(rates['time'][k+1])
+            k += 1
+            t = float(rates['time'][k])
+    #-------------------------------------------------------------------------------------------------------------
+
+    def _tick_segments(self, symbol:str, t0:float, t1:float) -> Iterator[Tuple[float, float, bool, float]]:
+        # recorded prices jump from tick to tick, so every tick is a gap
+        ticks:np.ndarray = self._ticks[symbol]
+        start:int = self._tick_index(symbol, t0)
+        stop:int = self._tick_index(symbol, t1)
+        if start == 0: start = min(1, stop)
+
+        bids:List[float] = ticks['bid'][start - 1:stop].tolist()
+        times:List[int] = ticks['time_msc'][start:stop].tolist()
+        for i, time in enumerate(times):
+            yield bids[i], bids[i + 1], True, time / 1000
+    #-------------------------------------------------------------------------------------------------------------
+
+    # price path
+    #-------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _path(bar:np.void) -> Tuple[Tuple[float, ...], Tuple[float, ...]]:
+        xs:Tuple[float, ...] = (0.0, 1/3, 2/3, 1.0)
+        if bar['close'] >= bar['open']:
+            return xs, (bar['open'], bar['low'], bar['high'], bar['close'])
+        return xs, (bar['open'], bar['high'], bar['low'], bar['close'])
+
+    @staticmethod
+    def _interp(xs:Tuple[float, ...], ys:Tuple[float, ...], f:float) -> float:
+        if f <= 0: return float(ys[0])
+        for i in range(1, len(xs)):
+            if f <= xs[i]:
+                w:float = (f - xs[i-1]) / (xs[i] - xs[i-1])
+                return float(ys[i-1] + w * (ys[i] - ys[i-1]))
+        return float(ys[-1])
+
+    def _bar_index(self, symbol:str, t:float) -> int:
+        return int(np.searchsorted(self._rates[symbol]['time'], t, side='right')) - 1
+
+    def _price(self, symbol:str, t:float) -> float:
+        if symbol in self._ticks:
+            ticks:np.ndarray = self._ticks[symbol]
+            i:int = self._tick_index(symbol, t) - 1
+            return float(ticks['bid'][max(i, 0)])
+
+        rates:np.ndarray = self._rates[symbol]
+        k:int = self._bar_index(symbol, t)
+        if k < 0: return float(rates['open'][0])
+
+        xs, ys = self._path(rates[k])
+        return self._interp(xs, ys, (t - rates['time'][k]) / self.period)
+
+    def _forming_bar(self, symbol:str, k:int, t:float) -> np.void:
+        bar:np.void = self._rates[symbol][k].copy()
+        if symbol in self._ticks:
+            ticks:np.ndarray = self._ticks[symbol]
+            start:int = self._tick_index(symbol, bar['time'], side='left')
+            stop:int = self._tick_index(symbol, t)
+            bids:np.ndarray = ticks['bid'][start:stop]
+            if len(bids) == 0: bids = np.array([bar['open']])
+            bar['high'], bar['low'], bar['close'] = bids.max(), bids.min(), bids[-1]
+            bar['tick_volume'] = stop - start
+            return bar
+
+        f:float = (t - bar['time']) / self.period
+        if f >= 1: return bar
+
+        xs, ys = self._path(bar)
+        price:float = self._interp(xs, ys, f)
+        visited:List[float] = [y for x, y in zip(xs, ys) if x <= f] + [price]
+        bar['high'], bar['low'], bar['close'] = max(visited), min(visited), price
+        return bar
+
+    def _series(self, symbol:str, timeframe:int, current:int) -> Tuple[np.ndarray, int]:
+        # bars of a timeframe (resampled once from the replayed bars for a higher one),
+        # and the index of the bar the replayed bar `current` belongs to
+        if timeframe == self.timeframe: return self._rates[symbol], current
+
+        key:Tuple[str, int] = (symbol, timeframe)
+        if key not in self._resampled:
+            rates:np.ndarray = self._rates[symbol]
+            self._resampled[key] = (
+                resample_rates(rates, timeframe), bar_starts(rates['time'], timeframe_seconds(timeframe))
+            )
+        series, starts = self._resampled[key]
+        return series, int(np.searchsorted(starts, current, side='right')) - 1
+
+    def _forming_series_bar(self, symbol:str, timeframe:int, k:int, current:int) -> np.void:
+        # forming bar of a timeframe, from its replayed bars up to the forming one
+        if timeframe == self.timeframe: return self._forming_bar(symbol, current, self._now)
+
+        start:int = int(self._resampled[(symbol, timeframe)][1][k])
+        rates:np.ndarray = self._rates[symbol][start:current + 1].copy()
+        rates[-1] = self._forming_bar(symbol, current, self._now)
+        return resample_rates(rates, timeframe)[0]
+    #-------------------------------------------------------------------------------------------------------------
+
+    # helpers
+    #-------------------------------------------------------------------------------------------------------------
+    @staticmethod
+    def _tick_array(ticks:Union[pd.DataFrame, np.ndarray]) -> np.ndarray:
+        # ticks in the layout of copy_ticks_from, sorted by time
+        if isinstance(ticks, np.ndarray) and ticks.dtype == TICKS_DTYPE: return ticks
+
+        columns = ticks.dtype.names if isinstance(ticks, np.ndarray) else ticks.columns
+        array:np.ndarray = np.zeros(len(ticks), dtype=TICKS_DTYPE)
+        for col in TICKS_DTYPE.names:
+            if col in columns: array[col] = np.asarray(ticks[col])
+
+        if 'time_msc' not in columns: array['time_msc'] = array['time'] * 1000
+        array['time'] = array['time_msc'] // 1000
+        if 'ask' not in columns: array['ask'] = array['bid']
+        return array[np.argsort(array['time_msc'], kind='stable')]
+
+    def _tick_series(self, symbol:str) -> np.ndarray:
+        # recorded ticks, or one tick per turning point of the price path of every bar
+        if symbol in self._ticks: return self._ticks[symbol]
+        if symbol in self._synthetic_ticks: return self._synthetic_ticks[symbol]
+
+        rates:np.ndarray = self._rates[symbol]
+        period_msc:int = self.period * 1000
+        bullish:np.ndarray = rates['close'] >= rates['open']
+        opens:np.ndarray = rates['time'].astype(np.int64) * 1000
+
+        ticks:np.ndarray = np.zeros(4 * len(rates), dtype=TICKS_DTYPE)
+        ticks['time_msc'] = np.stack(
+            (opens, opens + period_msc // 3, opens + 2 * period_msc // 3, opens + period_msc - 1), axis=1
+        ).ravel()
+        ticks['bid'] = np.stack((
+            rates['open'], np.where(bullish, rates['low'], rates['high']),
+            np.where(bullish, rates['high'], rates['low']), rates['close']
+        ), axis=1).ravel()
+        ticks['ask'] = ticks['bid'] + self.spread
+        ticks['time'] = ticks['time_msc'] // 1000
+        ticks['volume'] = 1
+
+        self._synthetic_ticks[symbol] = ticks
+        self._tick_times[symbol] = np.ascontiguousarray(ticks['time_msc'])
+        return ticks
+
+    def _tick_index(self, symbol:str, t:float, side:str='right') -> int:
+        # number of ticks before (left) or up to (right) time t, the search key is an
+        # integer like the tick times, so that numpy does not convert the whole array
+        msc:int = math.floor(t * 1000) if side == 'right' else math.ceil(t * 1000)
+        return int(self._tick_times[symbol].searchsorted(msc, side=side))
+
+    def _position_record(self, ticket:int) -> TradePosition:
+        position:dict = self._positions[ticket]
+        direction:int = 1 if position['type'] == ORDER_TYPE_BUY else -1
+        bid:float = self._price(position['symbol'], self._now)
+        price_current:float = bid if direction == 1 else bid + self.spread
+        profit:float = (price_current - position['price_open']) * direction * position['volume'] * self.contract_size
+
+        return TradePosition(
+            ticket=ticket, time=int(position['time']), time_msc=int(position['time'] * 1000),
+            time_update=int(position['time_update']), time_update_msc=int(position['time_update'] * 1000),
+            type=position['type'], magic=position['magic'], identifier=ticket, reason=DEAL_REASON_EXPERT,
+            volume=position['volume'], price_open=position['price_open'], sl=position['sl'], tp=position['tp'],
+            price_current=price_current, swap=0.0, profit=profit, symbol=position['symbol'], comment=position['comment']
+        )
+
+    def _valid_stops(self, order_type:int, bid:float, sl:float, tp:float) -> bool:
+        # stops must be on the loss / profit side of the price the position closes at
+        if order_type == ORDER_TYPE_BUY:
+            return (sl == 0 or sl < bid) and (tp == 0 or tp > bid)
+        ask:float = bid + self.spread
+        return (sl == 0 or sl > ask) and (tp == 0 or tp < ask)
+
+    def _check_series(self, symbol:str, timeframe:int) -> bool:
+        if symbol not in self._rates:
+            self._error(-1, f'unknown symbol {symbol}')
+            return False
+        period:int = timeframe_seconds(timeframe)
+        if period < self.period or period % self.period != 0:
+            self._error(-2, f'only multiples of timeframe {timeframe_name(self.timeframe)} are available in the simulator')
+            return False
+        return True
+
+    def _new_ticket(self) -> int:
+        ticket:int = self._next_ticket
+        self._next_ticket += 1
+        return ticket
+
+    def _result(
+        self, retcode:int, request:dict, order:int=0, deal:int=0, price:float=0.0,
+        volume:float=0.0, comment:str='Request executed') -> OrderSendResult:
+        symbol:Optional[str] = request.get('symbol')
+        bid:float = self._price(symbol, self._now) if symbol in self._rates else 0.0
+        return OrderSendResult(
+            retcode=retcode, deal=deal, order=order, volume=volume, price=price, bid=bid,
+            ask=bid + self.spread if bid else 0.0, comment=comment, request_id=0, retcode_external=0,
+            request=request
+        )
+
+    def _error(self, code:int, message:str) -> None:
+        self._last_error = (code, message)
+        return None
+    #-------------------------------------------------------------------------------------------------------------
@@ -0,0 +1,5 @@
+from .instrument import *
+from .checkpoint import *
+from .orders import *
+from .engine import *
+from .supervisor import *
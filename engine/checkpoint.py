@@ -0,0 +1,74 @@
+import os
+import json
+import time
+from typing import Any, Dict, Optional
+
+# version of the checkpoint layout, checkpoints of another version are not resumed
+CHECKPOINT_VERSION:int = 1
+
+
+class SessionCheckpoint:
+    r"""
+    Checkpoint file of a trading session's state (see TradingEngine.state_dict), so
+    that a session can be resumed after the process dies.
+
+    Writes are atomic: the state is written to a temporary file, flushed to disk
+    and renamed over the checkpoint, so the file always holds a complete state,
+    either the previous one or the new one.
+
+    parameters
+    -------------
+    path: (str) - path of the checkpoint file (JSON)
+
+    interval: (float) - seconds between periodic writes, changes to the session's
+    positions are written right away (default=5)
+    """
+    def __init__(self, path:str, interval:float=5.0):
+        self.path:str = path
+        self.interval:float = interval
+        self._last_write:float = float('-inf')
+
+    def exists(self) -> bool:
+        return os.path.isfile(self.path)
+
+    def due(self) -> bool:
+        r"""
+        True if the last write is older than the interval
+        """
+        return time.monotonic() - self._last_write >= self.interval
+
+    def load(self) -> Optional[Dict[str, Any]]:
+        r"""
+        returns the checkpointed state, None if there is no checkpoint, or if it cannot
+        be read or is of another version
+        """
+        try:
+            with open(self.path, 'r') as f:
+                state:Dict[str, Any] = json.load(f)
+        except (OSError, ValueError) as e:
+            if self.exists(): print(f'failed to read the checkpoint {self.path}: {e}')
+            return None
+
+        if state.get('version') != CHECKPOINT_VERSION:
+            print(f'checkpoint {self.path} is of version {state.get("version")}, expected {CHECKPOINT_VERSION}')
+            return None
+        return state
+
+    def save(self, state:Dict[str, Any]) -> None:
+        r"""
+        atomically replaces the checkpoint with a state
+        """
+        tmp_path:str = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump({'version':CHECKPOINT_VERSION, **state}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+        self._last_write = time.monotonic()
+
+    def clear(self) -> None:
+        r"""
+        removes the checkpoint, once its session has terminated
+        """
+        for path in (self.path, f'{self.path}.tmp'):
+            if os.path.exists(path): os.remove(path)
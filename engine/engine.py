@@ -0,0 +1,759 @@
+import math
+import time
+from concurrent.futures import Future
+import pytz
+import numpy as np
+from datetime import datetime, tzinfo
+from typing import Any, Dict, List, Optional, Tuple, Union
+from bot_strategies import Bars
+from brokers import Broker, OrderSendResult, TradeDeal, TradePosition, to_timestamp
+from utils import (
+    BarBuffer,
+    BarStore,
+    BarScheduler,
+    Metrics,
+    PnLLedger,
+    PositionManager,
+    ResampledBarBuffer,
+    StartupTimer,
+    TickBarBuffer,
+    TickFeed,
+    TradeJournal,
+    get_broker,
+    get_journal,
+    get_metrics,
+    get_magic_number,
+    get_symbol_registry,
+    format_uts,
+    make_trade,
+    get_percentage_profit
+)
+from .instrument import AVAIALBLE_TIMEFRAMES, FILLING_MODES_MAP, InstrumentConfig, InstrumentState
+from .checkpoint import SessionCheckpoint
+from .orders import OrderPipeline
+
+
+class TradingEngine:
+    r"""
+    Runs any number of symbol / timeframe / strategy instruments in a single
+    event loop. Each instrument keeps its own InstrumentState, while the session
+    profit target and maximum loss are shared by all of them.
+
+    Instruments that trade the same symbol and timeframe share one bar buffer,
+    a bar buffer is only polled around its own bar boundaries, and positions are
+    maintained by a PositionManager from a single positions_get snapshot per
+    maintenance run, so the
+    number of broker calls grows with the number of distinct series rather than
+    the number of instruments.
+
+    Orders are sent, logged and the session's deals fetched by an OrderPipeline,
+    so signal evaluation and stop loss trailing never wait on that I/O. The results
+    are delivered back to the loop on its next iteration.
+
+    The session P&L is kept by a PnLLedger: the deals are fetched in bulk, once per
+    maintenance run that finds closed positions (or after an order), and the
+    floating P&L is taken from the maintenance snapshot. The session risk limits
+    are checked against it on every iteration, open positions included, and the
+    session's positions are closed when a limit is reached.
+
+    The trading events (signals, orders, fills, stop loss modifications, closed
+    positions, risk and session events) are recorded in a TradeJournal, whose
+    background writer prints them and writes them to its file, so the loop and the
+    order pipeline do no console I/O.
+
+    With resample, the timeframes of a symbol that are multiples of its shortest
+    timeframe (eg: the M15 trend timeframe of an M1 instrument) are resampled from
+    the shortest one's bars by ResampledBarBuffers, instead of being downloaded.
+
+    In tick mode, the bars are built locally from the ticks of each symbol, fetched
+    incrementally every poll interval, and the stop losses of a symbol's positions
+    are trailed at the symbol's latest tick on every fetch that brings new ticks,
+    instead of on the maintenance cadence only.
+
+    parameters
+    -------------
+    instruments: (List[InstrumentConfig]) - instruments to trade
+
+    target_profit: (float) - percentage target profit for the session, 0 to disable
+
+    max_loss: (float) - percentage maximum loss for the session, 0 to disable
+
+    session_duration: (int) - duration to run the bot (in minutes)
+
+    trendline_span: (int) - number of bars to consider when computing the trendline
+
+    clock_offset: (float) - broker server time minus UTC (seconds)
+
+    pre_open: (float) - seconds before a bar boundary at which bar polling starts
+
+    poll_interval: (float) - seconds between bar polls around a bar boundary
+
+    maintenance_interval: (float) - seconds between position maintenance runs
+
+    timezone: (tzinfo, None) - timezone used for console timestamps (default=UTC)
+
+    broker: (Broker, None) - broker to trade with, defaults to the bot's broker
+
+    metrics: (Metrics, None) - latency and slippage metrics of the loop, defaults to
+    the bot's metrics (see get_metrics)
+
+    order_workers: (int) - worker threads of the order pipeline, 0 sends orders inline
+    (eg: with a simulated broker, whose clock is driven by the loop) (default=1)
+
+    tick_mode: (bool) - build the bars from ticks and trail stop losses on new ticks,
+    instead of polling bars around the bar boundaries (default=False)
+
+    bar_store: (str, None) - directory of an on-disk BarStore, the bar buffers then warm
+    start from it and append every bar that closes to it (default=None)
+
+    resample: (bool) - build the bars of the higher timeframes of a symbol from the
+    bars of its shortest timeframe, instead of downloading them (default=False)
+
+    checkpoint: (SessionCheckpoint, None) - checkpoint the session's state is written to
+    periodically and whenever its positions change, the checkpoint is cleared when the
+    session terminates (see restore to resume a session from it) (default=None)
+
+    journal: (TradeJournal, None) - journal of the session's trading events, defaults
+    to the bot's journal (see get_journal)
+
+    startup: (StartupTimer, None) - startup timings of the process, the engine adds the
+    phases up to its first decision (first position maintenance, history backfill and
+    first evaluation), then reports them in the journal and the metrics (default=None)
+    """
+    def __init__(
+        self,
+        instruments:List[InstrumentConfig],
+        target_profit:float=0.0,
+        max_loss:float=0.0,
+        session_duration:int=1440,
+        trendline_span:int=1000,
+        clock_offset:float=0.0,
+        pre_open:float=0.5,
+        poll_interval:float=0.04,
+        maintenance_interval:float=0.5,
+        timezone:Optional[tzinfo]=None,
+        broker:Optional[Broker]=None,
+        metrics:Optional[Metrics]=None,
+        order_workers:int=1,
+        tick_mode:bool=False,
+        bar_store:Optional[str]=None,
+        resample:bool=False,
+        checkpoint:Optional[SessionCheckpoint]=None,
+        journal:Optional[TradeJournal]=None,
+        startup:Optional[StartupTimer]=None):
+
+        assert len(instruments) > 0, 'no instruments to trade'
+
+        self.broker:Broker = broker or get_broker()
+        self.metrics:Metrics = metrics or get_metrics()
+        # an empty journal is falsy (see TradeJournal.__len__)
+        self.journal:TradeJournal = journal if journal is not None else get_journal()
+        self.target_profit:float = target_profit
+        self.max_loss:float = max_loss
+        self.session_duration:int = session_duration
+        self.timezone:tzinfo = timezone or pytz.utc
+        self.tick_mode:bool = tick_mode
+        self.startup:Optional[StartupTimer] = startup
+        if startup is not None: self.metrics.startup = startup
+
+        # one bar buffer per (symbol, timeframe), large enough for every
+        # instrument trading it (or using it as its trend timeframe)
+        self.feeds:Dict[Tuple[str, int], BarBuffer] = {}
+        self.feed_periods:Dict[Tuple[str, int], int] = {}
+        capacities:Dict[Tuple[str, int], int] = {}
+        for config in instruments:
+            capacity:int = max(config.atr_period, config.sr_period, trendline_span) + 1
+            for timeframe in config.timeframes:
+                key:Tuple[str, int] = (config.symbol, AVAIALBLE_TIMEFRAMES[timeframe][0])
+                capacities[key] = max(capacities.get(key, 0), capacity)
+                self.feed_periods[key] = AVAIALBLE_TIMEFRAMES[timeframe][1] * 60
+
+        # feed -> the feed its bars are resampled from, the shortest timeframe of its symbol
+        self._sources:Dict[Tuple[str, int], Tuple[str, int]] = {}
+        if resample:
+            for key, period in self.feed_periods.items():
+                source:Tuple[str, int] = min(
+                    (other for other in self.feed_periods if other[0] == key[0]), key=self.feed_periods.get
+                )
+                if source == key or period % self.feed_periods[source] != 0: continue
+                self._sources[key] = source
+                capacities[source] = max(capacities[source], 2 * period // self.feed_periods[source] + 1)
+
+        # the sources are created, and so updated, before the feeds resampled from them
+        feed_class:type = TickBarBuffer if tick_mode else BarBuffer
+        for key in sorted(capacities, key=lambda key: key in self._sources):
+            store:Optional[BarStore] = BarStore(bar_store, key[0], key[1]) if bar_store is not None else None
+            if key in self._sources:
+                self.feeds[key] = ResampledBarBuffer(self.feeds[self._sources[key]], key[1], capacities[key], store=store)
+            else:
+                self.feeds[key] = feed_class(key[0], key[1], capacity=capacities[key], broker=self.broker, store=store)
+
+        # in tick mode, the ticks of a symbol are fetched once for all its timeframes
+        self.tick_feeds:Dict[str, TickFeed] = {}
+        self._symbol_feeds:Dict[str, List[Tuple[str, int]]] = {}
+        if tick_mode:
+            for key in self.feeds:
+                self._symbol_feeds.setdefault(key[0], []).append(key)
+                if key[0] not in self.tick_feeds: self.tick_feeds[key[0]] = TickFeed(key[0], broker=self.broker)
+
+        self.states:List[InstrumentState] = [
+            InstrumentState(
+                config, self.feeds[(config.symbol, config.mt5_timeframe)],
+                trend_feed=self.feeds.get((config.symbol, config.trend_mt5_timeframe))
+            ) for config in instruments
+        ]
+
+        # every timeframe's bar boundaries are also boundaries of the greatest
+        # common divisor of the periods, so one scheduler serves all feeds. Ticks
+        # arrive at any time, so in tick mode the polling window spans the whole bar
+        period:int = math.gcd(*self.feed_periods.values())
+        self.scheduler:BarScheduler = BarScheduler(
+            period=period,
+            clock_offset=clock_offset,
+            pre_open=max(pre_open, period) if tick_mode else pre_open,
+            poll_interval=poll_interval,
+            maintenance_interval=maintenance_interval,
+            broker=self.broker
+        )
+        # the feed with the shortest period is also polled between bar
+        # boundaries, as a safety net for a wrong clock offset
+        self._probe:Tuple[str, int] = min(self.feed_periods, key=self.feed_periods.get)
+
+        # open positions of every instrument, owned by the instrument's state
+        self.positions:PositionManager = PositionManager(
+            symbols=sorted(set(config.symbol for config in instruments)), broker=self.broker
+        )
+
+        # order submission and reporting, off the loop
+        self.orders:OrderPipeline = OrderPipeline(workers=order_workers)
+
+        self.starting_equity:float = self.broker.account_info().balance
+        self.session_profit:float = 0.0
+        self.session_start:float = self.broker.time()
+
+        # realized (from the deal history) and floating session P&L
+        self.ledger:PnLLedger = PnLLedger(
+            magic=self.positions.magic, symbols=self.positions.symbols,
+            since=self.session_start + clock_offset, clock_offset=clock_offset, broker=self.broker
+        )
+        # closed positions whose closing deal has not been synced yet
+        self._closing:Dict[int, InstrumentState] = {}
+        # the ledger must be synced (eg: an order was filled), and its fetch in flight
+        self._ledger_dirty:bool = False
+        self._ledger_fetch:Optional[Future] = None
+
+        self.checkpoint:Optional[SessionCheckpoint] = checkpoint
+        # the positions changed since the last checkpoint
+        self._checkpoint_dirty:bool = False
+
+    def run(self) -> None:
+        r"""
+        runs the event loop until the session duration has elapsed, a session
+        risk limit is reached, or no bars are available
+        """
+        while True:
+            #check if stipulated session time has elapsed
+            #-------------------------------------------------------------------------------------------------------------
+            if (self.broker.time() - self.session_start) / 60 >= self.session_duration:
+                self.journal.record(
+                    'session', event='terminated', reason='duration',
+                    message=f'session has terminated after {self.session_duration} minutes, at {self._now_str()}')
+                break
+
+            # a simulated broker has run out of bars to replay
+            if self.broker.finished:
+                self.journal.record(
+                    'session', event='terminated', reason='replay_finished',
+                    message=f'session has terminated, no more bars to replay after {self._now_str()}')
+                break
+            #-------------------------------------------------------------------------------------------------------------
+
+            if not self.step(): break
+
+        # let the orders in flight complete, so that their positions are not lost
+        self.orders.shutdown()
+        self.journal.flush()
+        # the session is over, a restart starts a new one
+        if self.checkpoint is not None: self.checkpoint.clear()
+
+    def step(self) -> bool:
+        r"""
+        runs one iteration of the event loop: waits for the next bar poll or position
+        maintenance, then runs them
+
+        returns
+        -------------
+        returns False if the session must terminate (risk limit reached or no bars
+        available), else True
+        """
+        # sleep until bars need to be polled or positions need maintenance
+        poll_bars, maintain_positions = self.scheduler.wait()
+
+        # deliver the orders and deals completed since the last iteration
+        self.orders.process()
+
+        if maintain_positions: self.maintain_positions()
+        if not self.check_risk_limits(): return False
+        if poll_bars and not (self.poll_ticks() if self.tick_mode else self.poll_bars()): return False
+
+        if self.checkpoint is not None and (self._checkpoint_dirty or self.checkpoint.due()):
+            self.save_checkpoint()
+        return True
+
+    def state_dict(self) -> Dict[str, Any]:
+        r"""
+        JSON serialisable state of the session: magic number, session start, equity
+        and profit, the P&L ledger, the owner of every open position and of every
+        closed position not reported yet, and the per instrument state
+        (last evaluated bar, ATR / price multiplier and streaming indicators). The
+        support / resistance trackers are not included, they are rebuilt from the
+        buffered bars on the first evaluation
+        """
+        return {
+            'magic': self.positions.magic,
+            'session_start': self.session_start,
+            'starting_equity': self.starting_equity,
+            'session_profit': self.session_profit,
+            'ledger': self.ledger.get_state(),
+            'positions': {
+                str(ticket):state.config.name
+                for ticket, state in (*self.positions.tickets.items(), *self._closing.items())
+            },
+            'instruments': {
+                state.config.name:{
+                    'trade_start_time': to_timestamp(state.trade_start_time) if state.trade_start_time else None,
+                    'atr_value': state.atr_value,
+                    'price_multiplier': state.price_multiplier,
+                    'atr': state.atr.get_state() if state.atr is not None else None,
+                    'ema': state.ema.get_state() if state.ema is not None else None,
+                } for state in self.states
+            },
+        }
+
+    def save_checkpoint(self) -> None:
+        r"""
+        writes the session's state to the checkpoint
+        """
+        try:
+            self.checkpoint.save(self.state_dict())
+            self._checkpoint_dirty = False
+        except OSError as e:
+            print(f'failed to write the checkpoint {self.checkpoint.path}: {e}')
+
+    def restore(self, state:Dict[str, Any]) -> None:
+        r"""
+        resumes a session from a state returned by state_dict, and reconciles its
+        positions with the positions of the session's magic number at the broker:
+        open positions are tracked (and trailed) again, positions that closed while
+        the bot was down are reported and added to the session profit, and open
+        positions missing from the state (eg: opened just before a crash) are given
+        to the first instrument trading their symbol
+
+        The bot's magic number must have been set to the state's one (see
+        set_magic_number) before the engine was created
+
+        parameters
+        -------------
+        state: (Dict[str, Any]) - session state
+        """
+        assert state['magic'] == get_magic_number() == self.positions.magic, \
+            'set the magic number of the checkpoint before creating the engine'
+
+        self.session_start = state['session_start']
+        self.starting_equity = state['starting_equity']
+        self.session_profit = state['session_profit']
+        if 'ledger' in state:
+            self.ledger.set_state(state['ledger'])
+        else:
+            # the deals of the whole session are synced again
+            self.ledger.since = self.ledger.cursor = math.floor(self.session_start + self.ledger.clock_offset)
+
+        states:Dict[str, InstrumentState] = {instrument.config.name:instrument for instrument in self.states}
+        for name, saved in state['instruments'].items():
+            instrument:Optional[InstrumentState] = states.get(name)
+            if instrument is None: continue
+
+            if saved['trade_start_time'] is not None:
+                instrument.trade_start_time = format_uts(saved['trade_start_time'], dt_obj=True)
+            instrument.atr_value = saved['atr_value']
+            instrument.price_multiplier = saved['price_multiplier']
+            if instrument.atr is not None and saved['atr'] is not None: instrument.atr.set_state(saved['atr'])
+            if instrument.ema is not None and saved['ema'] is not None: instrument.ema.set_state(saved['ema'])
+
+        # a snapshot of the magic number's open positions (nothing is tracked yet)
+        self.positions.refresh()
+        open_positions:Dict[int, TradePosition] = dict(self.positions.positions)
+
+        n_closed:int = 0
+        for ticket, name in state['positions'].items():
+            ticket = int(ticket)
+            owner:Optional[InstrumentState] = states.get(name) or self._symbol_owner(
+                open_positions[ticket].symbol if ticket in open_positions else None)
+
+            if ticket in open_positions:
+                if owner is not None: self.positions.track(ticket, owner=owner)
+            elif owner is not None:
+                # reported once the ledger has synced the deals made since the checkpoint
+                n_closed += 1
+                self._closing[ticket] = owner
+
+        n_adopted:int = 0
+        for ticket, position in open_positions.items():
+            if ticket in self.positions: continue
+            owner:Optional[InstrumentState] = self._symbol_owner(position.symbol)
+            if owner is not None:
+                self.positions.track(ticket, owner=owner)
+                n_adopted += 1
+
+        self.journal.record(
+            'session', event='resumed', magic=self.positions.magic, open=len(self.positions),
+            closed=n_closed, adopted=n_adopted,
+            message=f'resumed session (magic number {self.positions.magic}): {len(self.positions)} open positions, '
+                    f'{n_closed} closed since the checkpoint, {n_adopted} adopted')
+        self.ledger.update_floating(self.positions.positions.values())
+        self._ledger_dirty = True
+        self._checkpoint_dirty = True
+
+    def maintain_positions(self) -> None:
+        r"""
+        trails the stop loss of every open position, updates the floating P&L and
+        syncs the P&L ledger when positions have closed
+        """
+        if len(self.positions) > 0:
+            # a single snapshot of the session's positions serves every instrument
+            with self.metrics.timer('positions_refresh'):
+                closed:Optional[Dict[int, InstrumentState]] = self.positions.refresh()
+            if closed is None: return
+
+            self._closing.update(closed)
+            self.ledger.update_floating(self.positions.positions.values())
+
+            # trailing stop loss for each ticket
+            self.trail_positions()
+
+        # the deals of every closed position are fetched at once by the order pipeline
+        if (self._closing or self._ledger_dirty) and (self._ledger_fetch is None or self._ledger_fetch.done()):
+            self._ledger_dirty = False
+            self._ledger_fetch = self.orders.submit(self.ledger.fetch, callback=self._on_deals)
+
+    def check_risk_limits(self) -> bool:
+        r"""
+        checks the session P&L (realized and floating) against the session's target
+        profit and maximum loss, and closes the session's positions if one of them
+        is reached
+
+        returns
+        -------------
+        returns False if a session risk limit has been reached, else True
+        """
+        if self.target_profit <= 0 and self.max_loss <= 0: return True
+        pnl:float = self.ledger.pnl
+        if pnl == 0: return True
+
+        percentage_profit:float = get_percentage_profit(self.starting_equity, pnl)
+        if self.target_profit > 0 and percentage_profit >= self.target_profit:
+            self.journal.record(
+                'risk', limit='target_profit', pnl=pnl, percentage=percentage_profit,
+                message=f'\nTarget profit has been reached or exceeded at {round(percentage_profit, 4)}%, \
+                this session will be terminated')
+        elif self.max_loss > 0 and percentage_profit <= -self.max_loss:
+            self.journal.record(
+                'risk', limit='max_loss', pnl=pnl, percentage=percentage_profit,
+                message=f'\nMaximum session loss has been reached or exceeded at {round(percentage_profit, 4)}%, \
+                this session will be terminated')
+        else:
+            return True
+
+        self.close_positions()
+        return False
+
+    def close_positions(self) -> None:
+        r"""
+        closes the open positions of the latest snapshot, through the order pipeline
+        """
+        for position_id, state in self.positions.tickets.items():
+            position:Optional[TradePosition] = self.positions.positions.get(position_id)
+            if position is None: continue
+
+            config:InstrumentConfig = state.config
+            self.orders.submit(
+                make_trade,
+                symbol = config.symbol,
+                buy = position.type == self.broker.ORDER_TYPE_SELL,
+                position_id = position_id,
+                volume = position.volume,
+                deviation = config.deviation,
+                filling_mode = FILLING_MODES_MAP[config.filling_mode],
+                callback = lambda order, config=config, position_id=position_id: self.journal.record(
+                    'order', instrument=config.name, symbol=config.symbol, action='close', position_id=position_id,
+                    retcode=order.retcode, price=order.price, comment=order.comment,
+                    message=f'{config.name}: {order.comment}')
+            )
+
+    def trail_positions(self, symbol:Optional[str]=None) -> None:
+        r"""
+        trails the stop loss of the open positions from the latest snapshot
+
+        parameters
+        -------------
+        symbol: (str, None) - only trail the positions of this symbol, None for all
+        """
+        for position_id, state in self.positions.tickets.items():
+            config:InstrumentConfig = state.config
+            if symbol is not None and config.symbol != symbol: continue
+
+            with self.metrics.timer('trail_sl'):
+                result:Union[int, OrderSendResult, TradePosition] = self.positions.trail(
+                    position_id,
+                    default_sl_points=config.default_sl * state.price_multiplier,
+                    max_dist_sl=config.max_sl_dist * state.price_multiplier,
+                    trail_amount=config.sl_trail * state.price_multiplier)
+
+            # the stop loss was moved (MetaTrader5 results are not brokers.OrderSendResult instances)
+            if getattr(result, 'retcode', None) == self.broker.TRADE_RETCODE_DONE:
+                self.journal.record(
+                    'sl_modified', instrument=config.name, position_id=position_id,
+                    sl=self.positions.positions[position_id].sl if position_id in self.positions.positions else None)
+
+    def poll_bars(self) -> bool:
+        r"""
+        updates the bar buffers whose bar boundary has passed, then evaluates the
+        instruments that got a new bar
+
+        returns
+        -------------
+        returns False if no bars are available (eg: market closed), else True
+        """
+        # error handle for if Index error (IndexError) is thrown. The index
+        # error is thrown when no bars are available for a symbol, or when
+        # the market is closed.
+        try:
+            self._startup_phase('positions')
+            updated:Dict[Tuple[str, int], int] = {}
+            for key, feed in self.feeds.items():
+                if key == self._probe or self._is_due(key):
+                    with self.metrics.timer('resample' if key in self._sources else 'rate_fetch'):
+                        n_new:int = feed.update()
+                    if n_new > 0: updated[key] = n_new
+            # the first poll backfills the feeds
+            self._startup_phase('history')
+
+            # stop polling once every feed due at this boundary has its new bar
+            if updated and not any(self._is_due(key) for key in self.feeds):
+                self.scheduler.bar_received(max(self.feeds[key].last_time for key in updated))
+
+            self._evaluate(updated)
+
+        except IndexError:
+            self.journal.record(
+                'session', event='market_closed',
+                message='Market is currently closed, or no bars are available for the symbol.')
+            self.broker.shutdown()
+            return False
+
+        return True
+
+    def poll_ticks(self) -> bool:
+        r"""
+        tick mode counterpart of poll_bars: fetches the new ticks of every symbol,
+        trails the stop loss of the symbol's positions at its latest tick, adds the
+        ticks to the symbol's bar buffers and evaluates the instruments that got a
+        new bar
+
+        returns
+        -------------
+        returns False if no bars are available (eg: market closed), else True
+        """
+        try:
+            self._startup_phase('positions')
+            updated:Dict[Tuple[str, int], int] = {}
+            # the history is only downloaded once, the bars are then built from ticks
+            for key, feed in self.feeds.items():
+                if len(feed) == 0: updated[key] = feed.backfill()
+            self._startup_phase('history')
+
+            for symbol, tick_feed in self.tick_feeds.items():
+                with self.metrics.timer('tick_fetch'):
+                    ticks:np.ndarray = tick_feed.update()
+                if len(ticks) == 0: continue
+
+                if self.positions.update_prices(symbol, tick_feed.bid, tick_feed.ask) > 0:
+                    self.trail_positions(symbol)
+
+                for key in self._symbol_feeds[symbol]:
+                    with self.metrics.timer('bar_build'):
+                        # the resampled feeds come after their source
+                        n_new:int = self.feeds[key].update() if key in self._sources else self.feeds[key].add_ticks(ticks)
+                    if n_new > 0: updated[key] = updated.get(key, 0) + n_new
+
+            self._evaluate(updated)
+
+        except IndexError:
+            self.journal.record(
+                'session', event='market_closed',
+                message='Market is currently closed, or no bars are available for the symbol.')
+            self.broker.shutdown()
+            return False
+
+        return True
+
+    def _evaluate(self, updated:Dict[Tuple[str, int], int]) -> None:
+        # evaluates the instruments whose feed got new bars, and every instrument
+        # that has not been evaluated yet
+        for state in self.states:
+            key:Tuple[str, int] = (state.config.symbol, state.config.mt5_timeframe)
+            if key not in updated and state.bars is not None: continue
+
+            # zero copy view of the closed bars in the feed
+            self.on_bar(state, state.feed.bars(closed_only=True))
+        self._startup_phase('first_decision', last=True)
+
+    def on_bar(self, state:InstrumentState, bars:Bars) -> None:
+        r"""
+        evaluates the strategy of an instrument on its latest closed bars and
+        trades if the buying or selling conditions are satisfied
+
+        parameters
+        -------------
+        state: (InstrumentState) - instrument to evaluate
+
+        bars: (Bars) - closed bars of the instrument's feed
+        """
+        previous_time:Optional[datetime] = state.trade_start_time
+        signal:Optional[bool] = state.evaluate(bars, metrics=self.metrics)
+
+        # time from the open of the new bar (close of the signal candle) to the decision
+        if previous_time is not None and state.trade_start_time != previous_time:
+            self.metrics.observe(
+                'bar_to_decision', self.broker.time() + self.scheduler.clock_offset - state.feed.last_time
+            )
+
+        if signal is not None: self.submit_order(state, signal)
+
+    def submit_order(self, state:InstrumentState, buy:bool) -> None:
+        r"""
+        sends an order of an instrument, with its stop loss and take profit at the
+        instrument's current price multiplier, through the order pipeline. The opened
+        position is tracked once the order is filled
+
+        parameters
+        -------------
+        state: (InstrumentState) - instrument to trade
+
+        buy: (bool) - True to buy, False to sell
+        """
+        config:InstrumentConfig = state.config
+        self.journal.record('signal', instrument=config.name, symbol=config.symbol, side='buy' if buy else 'sell')
+        self.orders.submit(
+            self._send_order, state, buy,
+            sl_points = config.default_sl * state.price_multiplier,
+            tp_points = config.default_tp * state.price_multiplier,
+            atr_value = state.atr_value,
+            callback = lambda order: self._on_order_sent(state, order, buy)
+        )
+
+    def _send_order(
+        self, state:InstrumentState, buy:bool, sl_points:float, tp_points:float,
+        atr_value:Optional[float]) -> OrderSendResult:
+        # runs on the order pipeline: sends the order, then logs the opened position
+        config:InstrumentConfig = state.config
+        start:float = time.perf_counter()
+        order:OrderSendResult = make_trade(
+            symbol = config.symbol,
+            buy = buy,
+            position_id = None,
+            volume = config.volume,
+            sl_points = sl_points,
+            tp_points = tp_points,
+            deviation = config.deviation,
+            filling_mode = FILLING_MODES_MAP[config.filling_mode])
+        self.metrics.observe('order_send', time.perf_counter() - start)
+        # the failure was journaled by make_trade
+        if not order: return order
+
+        message:str = f'{config.name}: {order.comment}'
+        if config.use_atr: message += f'\ncurrent ATR: {round(atr_value, 4)}'
+        self.journal.record(
+            'order', instrument=config.name, symbol=config.symbol, action='buy' if buy else 'sell',
+            volume=config.volume, retcode=order.retcode, ticket=order.order, comment=order.comment,
+            atr=atr_value, message=message)
+        if order.order != 0: self._journal_fill(state, order, buy)
+        return order
+
+    def _journal_fill(self, state:InstrumentState, order:OrderSendResult, buy:bool) -> None:
+        # the opened position, from the order's result rather than a positions_get call.
+        # The request is a dict (simulator) or a TradeRequest (MetaTrader5)
+        request = order.request
+        sl:float = request['sl'] if isinstance(request, dict) else request.sl
+        tp:float = request['tp'] if isinstance(request, dict) else request.tp
+        open_time:int = int(self.broker.time() + self.scheduler.clock_offset)
+        deal_order:str = 'buy' if buy else 'sell'
+
+        self.journal.record(
+            'fill', instrument=state.config.name, symbol=state.config.symbol, side=deal_order,
+            position_id=order.order, price=order.price, volume=order.volume, sl=sl, tp=tp, open_time=open_time,
+            message=f'\n{deal_order} order is opened at position_id:  {order.order}\n'
+                    f'open price: -----------------------  {order.price}\n'
+                    f'time of trade:---------------------  {format_uts(open_time, dt_obj=False)}\n'
+                    f'initial stop loss:-----------------  {sl}\n'
+                    f'initial take profit:---------------  {tp}')
+
+    def _on_order_sent(self, state:InstrumentState, order:OrderSendResult, buy:bool) -> None:
+        # runs on the loop: tracks the opened position
+        if not order or order.order == 0: return
+        self._record_fill(state.config.symbol, order, buy)
+        self.positions.track(order.order, owner=state)
+        self._ledger_dirty = True
+        self._checkpoint_dirty = True
+
+    def _on_deals(self, deals:Optional[Tuple[TradeDeal, ...]]) -> None:
+        # runs on the loop: adds the fetched deals to the ledger, and reports the
+        # closed positions whose closing deal has been synced
+        self.ledger.apply(deals)
+        for position_id in list(self._closing):
+            profit:Optional[float] = self.ledger.take_closed(position_id)
+            if profit is not None: self._on_position_closed(self._closing.pop(position_id), position_id, profit)
+
+    def _on_position_closed(self, state:InstrumentState, position_id:int, profit:float) -> None:
+        # runs on the loop: adds the profit of a closed position to the session
+        self.session_profit += profit
+        self._checkpoint_dirty = True
+        self.journal.record(
+            'closed', instrument=state.config.name, position_id=position_id, profit=profit,
+            session_profit=self.session_profit,
+            message=f'\n{state.config.name} order at position_id {position_id} is closed\n'
+                    f'Deal Profit value:---------------------  {profit}\n'
+                    f'Total session Profit value:------------  {self.session_profit}\n')
+
+    def _record_fill(self, symbol:str, order:OrderSendResult, buy:bool) -> None:
+        # slippage between the ask / bid the order was sent at and its fill price,
+        # the request is a dict (simulator) or a TradeRequest (MetaTrader5). Orders
+        # that report no fill price (eg: some market execution brokers) are skipped
+        request = order.request
+        requested:float = request['price'] if isinstance(request, dict) else getattr(request, 'price', 0.0)
+        if not requested or not order.price: return
+
+        spec = get_symbol_registry().get(symbol)
+        self.metrics.record_fill(symbol, buy, requested, order.price, point=spec.point if spec else None)
+
+    def _startup_phase(self, phase:str, last:bool=False) -> None:
+        # ends a startup phase, the startup timings are reported with the first decision
+        if self.startup is None or self.startup.finished: return
+        self.startup.mark(phase, last=last)
+        if last:
+            self.journal.record('session', event='startup', **self.startup.summary(), message=self.startup.report())
+
+    def _symbol_owner(self, symbol:Optional[str]) -> Optional[InstrumentState]:
+        # first instrument trading a symbol
+        return next((state for state in self.states if state.config.symbol == symbol), None)
+
+    def _is_due(self, key:Tuple[str, int]) -> bool:
+        # a feed is due once the server clock has passed the end of its newest bar
+        feed:BarBuffer = self.feeds[key]
+        if len(feed) == 0: return True
+
+        server_now:float = self.broker.time() + self.scheduler.clock_offset
+        return feed.last_time + self.feed_periods[key] <= server_now
+
+    def _now_str(self) -> str:
+        return datetime.fromtimestamp(self.broker.time(), self.timezone).strftime("%Y-%m-%d %H:%M:%S")
@@ -0,0 +1,273 @@
+import brokers
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from bot_strategies import __strategies__, Bars, SupportResistance, SupportResistanceTracker, TrendLines
+from utils import BarBuffer, Metrics, StreamingATR, StreamingEMA, format_uts, get_metrics
+
+FILLING_MODES_MAP:Dict[str, int] = {
+    'IOC': brokers.ORDER_FILLING_IOC, 
+    'FOK': brokers.ORDER_FILLING_FOK, 
+    'RETURN': brokers.ORDER_FILLING_RETURN
+}
+AVAIALBLE_TIMEFRAMES:dict = {
+    'M1':(brokers.TIMEFRAME_M1, 1),
+    'M2':(brokers.TIMEFRAME_M2, 2),
+    'M3':(brokers.TIMEFRAME_M3, 3),
+    'M4':(brokers.TIMEFRAME_M4, 4),
+    'M5':(brokers.TIMEFRAME_M5, 5),
+    'M10':(brokers.TIMEFRAME_M10, 10),
+    'M12':(brokers.TIMEFRAME_M12, 12),
+    'M15':(brokers.TIMEFRAME_M15, 15),
+    'M20':(brokers.TIMEFRAME_M20, 20),
+    'M30':(brokers.TIMEFRAME_M30, 30),
+    'H1':(brokers.TIMEFRAME_H1, 60),
+    'H2':(brokers.TIMEFRAME_H2, 120),
+    'H4':(brokers.TIMEFRAME_H4, 240),
+    'D1':(brokers.TIMEFRAME_D1, 1440),
+}
+
+
+class InstrumentConfig:
+    r"""
+    Symbol, timeframe, strategy and risk settings of one traded instrument,
+    the options have the same meaning as those of main.py
+
+    parameters
+    -------------
+    symbol: (str) - trade symbol
+
+    timeframe: (str) - trade timeframe, a key of AVAIALBLE_TIMEFRAMES
+
+    strategy: (str) - strategy, a key of __strategies__
+
+    trend_timeframe: (str, None) - timeframe of the EMA trendline, a key of
+    AVAIALBLE_TIMEFRAMES (eg: M15 to confirm M1 signals with the M15 trend), None
+    for the trade timeframe
+
+    the remaining keyword arguments are the strategy and risk options of main.py,
+    raises ValueError for an unknown timeframe, strategy or filling mode
+    """
+    OPTIONS:List[str] = [
+        'symbol', 'timeframe', 'strategy', 'volume', 'deviation', 'unit_pip', 'use_atr', 'atr_period', 
+        'default_sl', 'max_sl_dist', 'sl_trail', 'default_tp', 'sr_likelihood', 'sr_threshold', 'sr_period', 
+        'use_trendline', 'trendline_period', 'trend_timeframe', 'filling_mode'
+    ]
+
+    def __init__(
+        self,
+        symbol:str,
+        timeframe:str='M1',
+        strategy:str='composite',
+        volume:float=1.0,
+        deviation:int=0,
+        unit_pip:float=1e-5,
+        use_atr:bool=False,
+        atr_period:int=5,
+        default_sl:float=4.0,
+        max_sl_dist:float=4.0,
+        sl_trail:float=0.0,
+        default_tp:float=8.0,
+        sr_likelihood:float=0.8,
+        sr_threshold:float=3.0,
+        sr_period:int=60,
+        use_trendline:bool=False,
+        trendline_period:int=10,
+        trend_timeframe:Optional[str]=None,
+        filling_mode:str='IOC'):
+
+        # user input (command line or instruments file), checked even under python -O
+        if timeframe not in AVAIALBLE_TIMEFRAMES: raise ValueError(f'{timeframe} is an invalid timeframe')
+        if trend_timeframe is not None and trend_timeframe not in AVAIALBLE_TIMEFRAMES:
+            raise ValueError(f'{trend_timeframe} is an invalid trend timeframe')
+        if strategy not in __strategies__: raise ValueError(f'{strategy} is an invalid strategy')
+        if filling_mode not in FILLING_MODES_MAP: raise ValueError(f'{filling_mode} is an invalid filling mode')
+
+        self.symbol:str = symbol
+        self.timeframe:str = timeframe
+        self.strategy:str = strategy
+        self.volume:float = volume
+        self.deviation:int = deviation
+        self.unit_pip:float = unit_pip
+        self.use_atr:bool = use_atr
+        self.atr_period:int = atr_period
+        self.default_sl:float = default_sl
+        self.max_sl_dist:float = max_sl_dist
+        self.sl_trail:float = sl_trail
+        self.default_tp:float = default_tp
+        self.sr_likelihood:float = sr_likelihood
+        self.sr_threshold:float = sr_threshold
+        self.sr_period:int = sr_period
+        self.use_trendline:bool = use_trendline
+        self.trendline_period:int = trendline_period
+        self.trend_timeframe:Optional[str] = trend_timeframe
+        self.filling_mode:str = filling_mode
+
+    def __repr__(self) -> str:
+        return f'{self.__class__.__name__}({self.name})'
+
+    @property
+    def name(self) -> str:
+        return f'{self.symbol}:{self.timeframe}:{self.strategy}'
+
+    @property
+    def mt5_timeframe(self) -> int:
+        return AVAIALBLE_TIMEFRAMES[self.timeframe][0]
+
+    @property
+    def period(self) -> int:
+        r"""
+        bar duration in seconds
+        """
+        return AVAIALBLE_TIMEFRAMES[self.timeframe][1] * 60
+
+    @property
+    def trend_mt5_timeframe(self) -> Optional[int]:
+        r"""
+        MetaTrader5 timeframe of the trend timeframe, None if the trend is computed on
+        the trade timeframe
+        """
+        return AVAIALBLE_TIMEFRAMES[self.timeframes[1]][0] if len(self.timeframes) > 1 else None
+
+    @property
+    def timeframes(self) -> List[str]:
+        r"""
+        timeframes whose bars the instrument needs: the trade timeframe, then the
+        trend timeframe (if it is another one)
+        """
+        if self.trend_timeframe is None or self.trend_timeframe == self.timeframe: return [self.timeframe]
+        return [self.timeframe, self.trend_timeframe]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {option:getattr(self, option) for option in self.OPTIONS}
+
+    @classmethod
+    def from_dict(cls, config:Dict[str, Any], defaults:Optional[Dict[str, Any]]=None) -> "InstrumentConfig":
+        r"""
+        creates an instrument config from a dictionary, unknown keys are ignored
+
+        parameters
+        -------------
+        config: (Dict[str, Any]) - options of the instrument
+
+        defaults: (Dict[str, Any], None) - values of the options missing from config
+        (eg: the main.py CLI options)
+
+        returns
+        -------------
+        returns an InstrumentConfig
+        """
+        merged:Dict[str, Any] = {**(defaults or {}), **config}
+        return cls(**{option:merged[option] for option in cls.OPTIONS if option in merged})
+
+
+class InstrumentState:
+    r"""
+    Trading state of one instrument in a session: its bar feed, support and
+    resistance tracker, latest closed bars and ATR (its open positions are tracked
+    by the engine's PositionManager)
+
+    parameters
+    -------------
+    config: (InstrumentConfig) - instrument settings
+
+    feed: (BarBuffer) - bar buffer of the instrument's symbol and timeframe, shared by
+    every instrument that trades the same series (or any feed with the same last_time
+    and bars, eg: a SharedBarReader)
+
+    trend_feed: (BarBuffer, None) - bar buffer of the instrument's trend timeframe, the
+    EMA trendline is computed on its closed bars. None computes it on the bars of feed
+    """
+    def __init__(self, config:InstrumentConfig, feed:BarBuffer, trend_feed:Optional[BarBuffer]=None):
+        self.config:InstrumentConfig = config
+        self.feed:BarBuffer = feed
+        self.trend_feed:Optional[BarBuffer] = trend_feed
+        self.sr_tracker:SupportResistanceTracker = SupportResistanceTracker(period=config.sr_period)
+        self.bars:Optional[Bars] = None
+        self.trade_start_time:Optional[datetime] = None
+        self.atr_value:Optional[float] = None
+
+        # O(1) per closed candle indicators, the same values as compute_latest_atr on
+        # the last atr_period candles and TrendLines.append_ema
+        self.atr:Optional[StreamingATR] = StreamingATR(config.atr_period) if config.use_atr else None
+        self.ema:Optional[StreamingEMA] = StreamingEMA(config.trendline_period) if config.use_trendline else None
+
+        # set price_multiplier to atr if use_atr == True, else set it to unit pip
+        self.price_multiplier:Optional[float] = self.atr_value if config.use_atr else config.unit_pip
+
+    def evaluate(self, bars:Bars, metrics:Optional[Metrics]=None) -> Optional[bool]:
+        r"""
+        evaluates the instrument's strategy on its latest closed bars: feeds the newly
+        closed candle(s) to the indicators and, once a new bar has opened, checks the
+        buying and selling conditions
+
+        parameters
+        -------------
+        bars: (Bars) - closed bars of the instrument's feed
+
+        metrics: (Metrics, None) - metrics the stages are timed in, defaults to the
+        bot's metrics (see get_metrics)
+
+        returns
+        -------------
+        returns True to buy, False to sell, None if no trade should be opened (or no
+        new bar has opened since the last evaluation)
+        """
+        config:InstrumentConfig = self.config
+        metrics = metrics or get_metrics()
+        self.bars = bars
+
+        # feed the newly closed candle(s) to the streaming indicators
+        with metrics.timer('indicators'):
+            if self.ema is not None:
+                self.ema.extend(self.trend_feed.bars(closed_only=True) if self.trend_feed is not None else bars)
+            if self.atr is not None: self.atr.extend(bars)
+
+        current_trade_time:datetime = format_uts(self.feed.last_time, dt_obj=True)
+
+        # if no time is set (bot just started), set to latest time in bar buffer
+        if not self.trade_start_time:
+            self.trade_start_time = current_trade_time
+
+        # check if new bar has started by the current time, and initialise trade
+        if self.trade_start_time == current_trade_time: return None
+        self.trade_start_time = current_trade_time
+
+        # set the multiplier to the ATR of past candle sticks prior to current one
+        #-------------------------------------------------------------------------------------------------------------
+        if config.use_atr:
+            self.atr_value = self.atr.value
+            self.price_multiplier = self.atr_value
+        #-------------------------------------------------------------------------------------------------------------
+
+        price_multiplier:float = self.price_multiplier
+
+        # define buying and selling conditions, the support / resistance check
+        # (and its random draw) only runs for candles that passed the strategy
+        #-------------------------------------------------------------------------------------------------------------
+        with metrics.timer('strategy'):
+            # no trend, no trade (eg: the trend timeframe has no closed bar yet)
+            use_trendline:bool = bool(config.use_trendline)
+            has_trend:bool = not use_trendline or self.ema.value is not None
+            buy_signal: bool = has_trend and (
+                (TrendLines.is_above_trend_line(bars, ema=self.ema.value) if use_trendline else True) and
+                __strategies__[config.strategy]['buy'](bars)
+            )
+            sell_signal: bool = has_trend and (
+                (TrendLines.is_below_trend_line(bars, ema=self.ema.value) if use_trendline else True) and
+                __strategies__[config.strategy]['sell'](bars)
+            )
+
+        with metrics.timer('sr_check'):
+            # feed the newly closed candle(s) to the support and resistance tracker
+            self.sr_tracker.extend(bars)
+
+            buying_conditions: bool = buy_signal and SupportResistance.rand_at_support(
+                bars, p=config.sr_likelihood, threshold=config.sr_threshold * price_multiplier,
+                tracker=self.sr_tracker)
+            selling_condtions: bool = sell_signal and SupportResistance.rand_at_resistance(
+                bars, p=config.sr_likelihood, threshold=config.sr_threshold * price_multiplier,
+                tracker=self.sr_tracker)
+        #-------------------------------------------------------------------------------------------------------------
+
+        if buying_conditions or selling_condtions: return bool(buying_conditions)
+        return None
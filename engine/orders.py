@@ -0,0 +1,106 @@
+import queue
+import traceback
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+
+class OrderPipeline:
+    r"""
+    Runs order submission, post-trade enrichment (eg: fetching the opened
+    position) and reporting (eg: closed position profits) off the trading loop.
+
+    Jobs run on a pool of worker threads, while their callbacks are queued and
+    only run when the loop calls process(), so the callbacks can update the
+    loop's state (tracked positions, session profit) without locks. The broker
+    calls of the jobs run concurrently with the loop's, the broker must serialize
+    them (MT5Broker does). With MT5Broker, a broker call of the loop (eg: a bar
+    fetch, the positions snapshot or a stop loss modification) therefore still
+    waits for an order_send in flight on a worker: the pipeline keeps the order's
+    enrichment and reporting off the loop, not the terminal's round trip.
+
+    parameters
+    -------------
+    workers: (int) - number of worker threads, 0 runs every job inline when it is
+    submitted, eg: for a simulated broker whose clock is driven by the loop (default=1)
+
+    usage
+    -------------
+    pipeline.submit(make_trade, symbol, buy, callback=on_order, **kwargs)
+    ...
+    pipeline.process()  # runs on_order(order) once make_trade has returned
+    """
+    def __init__(self, workers:int=1):
+        assert workers >= 0, 'workers cannot be negative'
+        self.workers:int = workers
+        self._executor:Optional[ThreadPoolExecutor] = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix='order-pipeline'
+        ) if workers > 0 else None
+        # (future, callback) of completed jobs, filled from the worker threads
+        self._completed:"queue.SimpleQueue[Tuple[Future, Optional[Callable[[Any], None]]]]" = queue.SimpleQueue()
+        self._pending:int = 0
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def submit(self, fn:Callable[..., Any], *args, callback:Optional[Callable[[Any], None]]=None, **kwargs) -> Future:
+        r"""
+        submits a job to the pipeline
+
+        parameters
+        -------------
+        fn: (Callable) - job to run, called with *args and **kwargs
+
+        callback: (Callable, None) - called with the job's result by process(), it is
+        not called if the job raised an exception
+
+        returns
+        -------------
+        returns the Future of the job
+        """
+        future:Future
+        if self._executor is not None:
+            future = self._executor.submit(fn, *args, **kwargs)
+        else:
+            future = Future()
+            try:
+                future.set_result(fn(*args, **kwargs))
+            except Exception as e:
+                future.set_exception(e)
+
+        self._pending += 1
+        future.add_done_callback(lambda done: self._completed.put((done, callback)))
+        return future
+
+    def process(self) -> int:
+        r"""
+        runs the callbacks of the jobs completed since the last call, on the
+        calling thread
+
+        returns
+        -------------
+        returns the number of completed jobs
+        """
+        n_completed:int = 0
+        while True:
+            try:
+                future, callback = self._completed.get_nowait()
+            except queue.Empty:
+                return n_completed
+
+            n_completed += 1
+            self._pending -= 1
+            error:Optional[BaseException] = future.exception()
+            if error is not None:
+                print('order pipeline job failed:')
+                traceback.print_exception(type(error), error, error.__traceback__)
+            elif callback is not None:
+                callback(future.result())
+
+    def shutdown(self) -> None:
+        r"""
+        waits for the submitted jobs to complete and runs their callbacks
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        self.process()
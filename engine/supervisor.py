@@ -0,0 +1,301 @@
+import time
+import traceback
+import numpy as np
+import multiprocessing as mp
+from multiprocessing import shared_memory
+from typing import Dict, List, Optional, Tuple
+from utils import LatencyHistogram, Metrics, SharedBarReader, SharedBarRing, SharedQueue
+from .engine import TradingEngine
+from .instrument import InstrumentConfig, InstrumentState
+
+# message of a worker for every new bar it evaluated: the instrument (index in the
+# supervisor's instruments), the bar's open time, the signal (1 buy, -1 sell, 0 no
+# trade), the instrument's price multiplier / ATR (NaN for None) at that bar and
+# the seconds the worker spent in each stage of the evaluation (NaN if not run)
+INTENT_DTYPE:np.dtype = np.dtype([
+    ('instrument', np.int32),
+    ('signal', np.int8),
+    ('time', np.int64),
+    ('price_multiplier', np.float64),
+    ('atr_value', np.float64),
+    ('indicators_s', np.float64),
+    ('strategy_s', np.float64),
+    ('sr_check_s', np.float64),
+])
+
+# stages of InstrumentState.evaluate timed by the workers, see INTENT_DTYPE
+_WORKER_STAGES:Tuple[str, ...] = ('indicators', 'strategy', 'sr_check')
+
+# the workers never inherit the supervisor's broker connection or threads
+_context = mp.get_context('spawn')
+
+# control block: publish sequence, stop flag, then the sequence acknowledged by
+# every worker (-1 until the worker is ready)
+_CONTROL_SEQ:int = 0
+_CONTROL_STOP:int = 1
+_CONTROL_ACKS:int = 2
+
+
+class FeedSupervisor(TradingEngine):
+    r"""
+    TradingEngine that shards the strategy evaluation of its instruments across
+    worker processes, while it alone talks to the broker.
+
+    The supervisor fetches the bars (and ticks, in tick mode) of every symbol /
+    timeframe as TradingEngine does, and publishes them into one SharedBarRing
+    per series. Each worker evaluates a subset of the instruments on zero copy
+    views of the rings, and sends an order intent per evaluated bar back through
+    its own SharedQueue. The supervisor sends the orders, trails the stop losses
+    and tracks the positions, so the broker sees a single connection while the
+    strategies use every core.
+
+    The stages of the loop that run in the supervisor (rate_fetch, publish,
+    positions_refresh, trail_sl, order_send) are timed in its metrics as in
+    TradingEngine. The workers time the stages of the strategy evaluation
+    (indicators, strategy, sr_check) and send the durations with each intent,
+    the supervisor records them in its metrics along with bar_to_decision when
+    it collects the intent (the evaluations whose intent is dropped are not
+    recorded).
+
+    parameters
+    -------------
+    instruments: (List[InstrumentConfig]) - instruments to trade, instrument i is
+    evaluated by worker i % workers
+
+    workers: (int) - number of worker processes
+
+    lockstep: (bool) - wait for every worker to evaluate each publish before going
+    on, so that a simulated broker's clock does not run ahead of the strategies
+    (default=False)
+
+    worker_poll_interval: (float) - seconds between the workers' checks for new
+    publishes (default=0.002)
+
+    the remaining keyword arguments are those of TradingEngine
+    """
+    def __init__(
+        self,
+        instruments:List[InstrumentConfig],
+        workers:int=2,
+        lockstep:bool=False,
+        worker_poll_interval:float=0.002,
+        **kwargs):
+
+        assert workers > 0, 'workers must be positive'
+        super().__init__(instruments, **kwargs)
+
+        self.workers:int = min(workers, len(instruments))
+        self.lockstep:bool = lockstep
+        self._published:int = 0
+
+        self.rings:Dict[Tuple[str, int], SharedBarRing] = {
+            key:SharedBarRing(feed.capacity) for key, feed in self.feeds.items()
+        }
+        self.queues:List[SharedQueue] = [SharedQueue(INTENT_DTYPE) for _ in range(self.workers)]
+        self._control_shm:shared_memory.SharedMemory = shared_memory.SharedMemory(
+            create=True, size=8 * (_CONTROL_ACKS + self.workers)
+        )
+        self.control:np.ndarray = np.ndarray((_CONTROL_ACKS + self.workers,), dtype=np.int64, buffer=self._control_shm.buf)
+        self.control[:] = 0
+        self.control[_CONTROL_ACKS:] = -1
+
+        ring_specs:Dict[Tuple[str, int], Tuple[str, int, int]] = {key:ring.spec() for key, ring in self.rings.items()}
+        self.processes:List[mp.Process] = []
+        for worker in range(self.workers):
+            assigned:List[Tuple[int, InstrumentConfig]] = [
+                (i, config) for i, config in enumerate(instruments) if i % self.workers == worker
+            ]
+            process:mp.Process = _context.Process(
+                target=_worker_main,
+                args=(worker, assigned, ring_specs, self.queues[worker].name, self._control_shm.name,
+                      self.workers, worker_poll_interval),
+                name=f'strategy-worker-{worker}',
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        # wait for the workers to attach to the shared memory
+        while np.any(self.control[_CONTROL_ACKS:] < 0):
+            if not self._workers_alive():
+                self.close()
+                raise RuntimeError('a strategy worker failed to start')
+            time.sleep(0.01)
+
+    def run(self) -> None:
+        r"""
+        runs the event loop (see TradingEngine.run), then stops the workers
+        """
+        try:
+            super().run()
+        finally:
+            self.close()
+
+    def step(self) -> bool:
+        r"""
+        runs one iteration of the event loop (see TradingEngine.step), then handles
+        the intents the workers sent since the last iteration
+
+        returns
+        -------------
+        returns False if the session must terminate (risk limit reached, no bars
+        available or a worker died), else True
+        """
+        if not super().step(): return False
+        self.collect()
+        # every worker has evaluated the first publish
+        if self._published > 0 and np.all(self.control[_CONTROL_ACKS:] >= 1):
+            self._startup_phase('first_decision', last=True)
+
+        if not self._workers_alive():
+            self.journal.record(
+                'session', event='worker_died', message='a strategy worker has died, this session will be terminated')
+            return False
+        return True
+
+    def collect(self) -> int:
+        r"""
+        handles the intents queued by the workers: updates the instruments' price
+        multipliers (used to trail their stop losses) and sends their orders
+
+        returns
+        -------------
+        returns the number of intents handled
+        """
+        if not any(len(queue) for queue in self.queues): return 0
+
+        batches:List[np.ndarray] = [queue.get_all() for queue in self.queues]
+        intents:np.ndarray = np.concatenate(batches) if len(batches) > 1 else batches[0]
+        if len(intents) == 0: return 0
+
+        # instrument order, the order of a single process engine
+        intents = intents[np.argsort(intents['instrument'], kind='stable')]
+        server_now:float = self.broker.time() + self.scheduler.clock_offset
+        for intent in intents:
+            state:InstrumentState = self.states[int(intent['instrument'])]
+            state.price_multiplier = None if np.isnan(intent['price_multiplier']) else float(intent['price_multiplier'])
+            state.atr_value = None if np.isnan(intent['atr_value']) else float(intent['atr_value'])
+
+            self.metrics.observe('bar_to_decision', server_now - int(intent['time']))
+            for stage in _WORKER_STAGES:
+                seconds:float = float(intent[f'{stage}_s'])
+                if not np.isnan(seconds): self.metrics.observe(stage, seconds)
+            if intent['signal'] != 0: self.submit_order(state, bool(intent['signal'] > 0))
+
+        return len(intents)
+
+    def close(self) -> None:
+        r"""
+        stops the workers and frees the shared memory
+        """
+        if self._control_shm is None: return
+
+        self.control[_CONTROL_STOP] = 1
+        for process in self.processes:
+            process.join(timeout=5)
+            if process.is_alive(): process.terminate()
+
+        for ring in self.rings.values(): ring.close()
+        for queue in self.queues: queue.close()
+        self.control = None
+        self._control_shm.close()
+        self._control_shm.unlink()
+        self._control_shm = None
+
+    def _evaluate(self, updated:Dict[Tuple[str, int], int]) -> None:
+        # publishes the feeds (forming bars included) and latest ticks, the workers
+        # evaluate the instruments of the feeds that got new bars
+        n_new:int = 0
+        for key, feed in self.feeds.items():
+            with self.metrics.timer('publish'):
+                n_new += self.rings[key].publish(feed)
+                tick_feed = self.tick_feeds.get(key[0])
+                if tick_feed is not None and tick_feed.started:
+                    self.rings[key].publish_tick(tick_feed.time_msc, tick_feed.bid, tick_feed.ask)
+
+        # the workers only evaluate closed bars
+        if n_new == 0: return
+        self._published += 1
+        self.control[_CONTROL_SEQ] = self._published
+
+        if self.lockstep:
+            while np.any(self.control[_CONTROL_ACKS:] < self._published):
+                if not self._workers_alive(): return
+                time.sleep(0)
+            self.collect()
+
+    def _workers_alive(self) -> bool:
+        return all(process.is_alive() for process in self.processes)
+
+
+def _worker_main(
+    worker:int,
+    assigned:List[Tuple[int, InstrumentConfig]],
+    ring_specs:Dict[Tuple[str, int], Tuple[str, int, int]],
+    queue_name:str,
+    control_name:str,
+    n_workers:int,
+    poll_interval:float) -> None:
+    # strategy worker: evaluates its instruments whenever the supervisor publishes
+    # new bars, and queues an intent for every new bar evaluated, with the time
+    # spent in each stage (the worker's metrics are never exported)
+    control_shm:shared_memory.SharedMemory = shared_memory.SharedMemory(name=control_name)
+    control:np.ndarray = np.ndarray((_CONTROL_ACKS + n_workers,), dtype=np.int64, buffer=control_shm.buf)
+    queue:SharedQueue = SharedQueue(INTENT_DTYPE, name=queue_name)
+    readers:Dict[Tuple[str, int], SharedBarReader] = {
+        key:SharedBarReader(*spec) for key, spec in ring_specs.items()
+        if any(key in ((config.symbol, config.mt5_timeframe), (config.symbol, config.trend_mt5_timeframe))
+               for _, config in assigned)
+    }
+    states:List[Tuple[int, InstrumentState]] = [
+        (i, InstrumentState(
+            config, readers[(config.symbol, config.mt5_timeframe)],
+            trend_feed=readers.get((config.symbol, config.trend_mt5_timeframe))
+        )) for i, config in assigned
+    ]
+    metrics:Metrics = Metrics()
+    histograms:List[LatencyHistogram] = [metrics.histogram(stage) for stage in _WORKER_STAGES]
+
+    try:
+        seen:int = 0
+        control[_CONTROL_ACKS + worker] = 0
+        while control[_CONTROL_STOP] == 0:
+            published:int = int(control[_CONTROL_SEQ])
+            if published == seen:
+                time.sleep(poll_interval)
+                continue
+
+            new_bars:Dict[Tuple[str, int], int] = {key:reader.refresh() for key, reader in readers.items()}
+            for i, state in states:
+                key:Tuple[str, int] = (state.config.symbol, state.config.mt5_timeframe)
+                reader:SharedBarReader = readers[key]
+                if len(reader) == 0 or (new_bars[key] == 0 and state.bars is not None): continue
+
+                previous_time = state.trade_start_time
+                before:List[Tuple[int, float]] = [(histogram.count, histogram.total) for histogram in histograms]
+                signal:Optional[bool] = state.evaluate(reader.bars(closed_only=True), metrics=metrics)
+                # the bars were overwritten while they were evaluated (the worker fell
+                # more than the ring's margin behind), the signal is dropped
+                if not reader.valid() or previous_time is None or state.trade_start_time == previous_time: continue
+
+                queue.put((
+                    i,
+                    0 if signal is None else (1 if signal else -1),
+                    reader.last_time,
+                    np.nan if state.price_multiplier is None else state.price_multiplier,
+                    np.nan if state.atr_value is None else state.atr_value,
+                    *(histogram.total - total if histogram.count > count else np.nan
+                      for histogram, (count, total) in zip(histograms, before)),
+                ))
+
+            seen = published
+            control[_CONTROL_ACKS + worker] = published
+
+    except Exception:
+        traceback.print_exc()
+        raise
+    finally:
+        for reader in readers.values(): reader.close()
+        queue.close()
+        del control
+        control_shm.close()
@@ -1,44 +1,39 @@
-import pytz
 import time
+# start of the startup timings, before the imports
+_started_at:float = time.perf_counter()
+
+import os
+import pytz
 import sys
+import json
 import argparse
-import pandas as pd
-import numpy as np
-import MetaTrader5 as mt5
-from datetime import datetime, timedelta
-from bot_strategies import (
-    __strategies__,
-    SupportResistance, 
-    TrendLines
+import brokers
+from datetime import datetime
+from engine import (
+    AVAIALBLE_TIMEFRAMES,
+    FILLING_MODES_MAP,
+    FeedSupervisor,
+    InstrumentConfig,
+    SessionCheckpoint,
+    TradingEngine
 )
 from utils import *
 from typing import *
 
 APP_NAME = f"WHATEVER FX-BOT"
-FILLING_MODES_MAP = {
-    'IOC': mt5.ORDER_FILLING_IOC, 
-    'FOK': mt5.ORDER_FILLING_FOK, 
-    'RETURN': mt5.ORDER_FILLING_RETURN
-}
-AVAIALBLE_TIMEFRAMES:dict = {
-    'M1':(mt5.TIMEFRAME_M1, 1),
-    'M2':(mt5.TIMEFRAME_M2, 2),
-    'M3':(mt5.TIMEFRAME_M3, 3),
-    'M4':(mt5.TIMEFRAME_M4, 4),
-    'M5':(mt5.TIMEFRAME_M5, 5),
-    'M10':(mt5.TIMEFRAME_M10, 10),
-    'M12':(mt5.TIMEFRAME_M12, 12),
-    'M15':(mt5.TIMEFRAME_M15, 15),
-}
 
 
 if __name__ == "__main__":
+    # durations of the startup phases, up to the first decision
+    startup:StartupTimer = StartupTimer(started_at=_started_at)
+    startup.mark('imports')
+
     parser = argparse.ArgumentParser(description=APP_NAME)
 
     # mandatory CLI arguments
-    parser.add_argument('login', type=int, metavar='login', help='Login ID')
-    parser.add_argument('password', type=str, metavar='password', help='Password')
-    parser.add_argument('server', type=str, metavar='server', help='Broker Server')
+    parser.add_argument('login', type=int, nargs='?', default=None, metavar='login', help='Login ID (not needed with --broker sim)')
+    parser.add_argument('password', type=str, nargs='?', default=None, metavar='password', help='Password (not needed with --broker sim)')
+    parser.add_argument('server', type=str, nargs='?', default=None, metavar='server', help='Broker Server (not needed with --broker sim)')
 
     parser.add_argument('--symbol', type=str, default='EURUSD', metavar='', help='Trade symbol')
     parser.add_argument('--volume', type=float, default=1.0, metavar='', help='Volume to trade')
@@ -59,268 +54,235 @@ if __name__ == "__main__":
         and the corresponding support / resistance line the signal was picked')
     parser.add_argument('--sr_period', type=int, default=60, metavar='', help='period of past timestamps to use for computing the support and resistance levels')
     parser.add_argument('--timezone', type=str, default="UTC", metavar='', help='Broker server timezone (UTC, CAT, US/Eastern ...)')
-    parser.add_argument('--target_profit', type=float, default=0.0, metavar='', help='Percentage target profit for the session. The session will terminate when it is reached')
-    parser.add_argument('--max_loss', type=float, default=0.0, metavar='', help='Percentage maximum loss for the session. The session will terminate when it is reached')
+    parser.add_argument('--target_profit', type=float, default=0.0, metavar='', help='Percentage target profit for the session (realized and floating). The session will terminate and close its positions when it is reached')
+    parser.add_argument('--max_loss', type=float, default=0.0, metavar='', help='Percentage maximum loss for the session (realized and floating). The session will terminate and close its positions when it is reached')
     parser.add_argument('--filling_mode', type=str, default='IOC', choices=list(FILLING_MODES_MAP.keys()), metavar='', help='Appropriate order filling mode for your broker')
     parser.add_argument('--session_duration', type=int, default=1440, metavar='', help='Duration to run the bot (in minutes)')
     parser.add_argument('--use_trendline', action='store_true', help='Base trades on EMA trendline. Inotherwords, take long trades above trendline and short trades below tendline')
     parser.add_argument('--trendline_period', type=int, default=10, metavar='', help='EMA Trendline Period')
+    parser.add_argument('--trend_timeframe', type=str, default=None, choices=list(AVAIALBLE_TIMEFRAMES.keys()), metavar='', help='Timeframe of the EMA trendline \
+        (eg: M15 to only take M1 trades in the direction of the M15 trend), defaults to the trade timeframe')
+    parser.add_argument('--poll_interval', type=float, default=0.04, metavar='', help='Seconds between bar polls around a bar boundary')
+    parser.add_argument('--pre_open', type=float, default=0.5, metavar='', help='Seconds before a bar boundary at which bar polling starts')
+    parser.add_argument('--maintenance_interval', type=float, default=0.5, metavar='', help='Seconds between position maintenance runs (trailing stop loss, closure checks)')
+    parser.add_argument('--resample', action='store_true', help='Build the bars of the higher timeframes of a symbol (eg: the --trend_timeframe) \
+        from the bars of its shortest timeframe, instead of downloading them')
+    parser.add_argument('--tick_mode', action='store_true', help='Build the bars locally from ticks (fetched incrementally every poll interval) \
+        and trail stop losses on every new tick, instead of polling bars around the bar boundaries')
+    parser.add_argument('--bar_store', type=str, default=None, metavar='', help='Directory of the on-disk bar history. The session only downloads the bars \
+        that closed since the last session, and appends every closed bar to it (it can be read by backtest.py and sweep.py)')
+    parser.add_argument('--fast_start', type=str, default=None, metavar='', help='Directory of the startup snapshot. The broker symbols are restored from it \
+        (and refreshed in the background) and the bar history is kept in it (unless --bar_store is given), so a restart only downloads the bars that closed since')
+    parser.add_argument('--checkpoint', type=str, default=None, metavar='', help='Path of a checkpoint file of the session state, written periodically and \
+        on every position change. If it exists at startup, the interrupted session is resumed (its positions are trailed and reported again)')
+    parser.add_argument('--checkpoint_interval', type=float, default=5.0, metavar='', help='Seconds between periodic writes of the checkpoint')
+    parser.add_argument('--symbol_ttl', type=float, default=3600.0, metavar='', help='Seconds between background refreshes of the cached broker symbols')
+    parser.add_argument('--metrics_file', type=str, default=None, metavar='', help='Path of a JSON file the loop latency (p50 / p99 / max per stage) and slippage metrics are written to')
+    parser.add_argument('--metrics_port', type=int, default=None, metavar='', help='Port of a local HTTP endpoint (http://127.0.0.1:<port>/metrics) serving the loop metrics')
+    parser.add_argument('--metrics_interval', type=float, default=10.0, metavar='', help='Seconds between writes of the metrics file')
+    parser.add_argument('--journal', type=str, default=None, metavar='', help='Path of a JSONL file the trade events (signals, orders, fills, stop loss \
+        modifications, closed positions, risk and session events) are appended to, one JSON object per line')
+    parser.add_argument('--quiet', action='store_true', help='Do not print the trade events to the console (they are still written to --journal)')
+    parser.add_argument('--order_workers', type=int, default=1, metavar='', help='Worker threads that send orders and report trades off the trading loop \
+        (0 sends them inline, always the case with --broker sim)')
+    parser.add_argument('--workers', type=int, default=0, metavar='', help='Worker processes the strategy evaluation of the instruments is shared across \
+        (supervisor mode). The main process alone talks to the broker and publishes the bars to the workers through shared memory. 0 evaluates every instrument in the main process')
+    parser.add_argument('--broker', type=str, default='mt5', choices=['mt5', 'sim'], metavar='', help='Broker to trade with: Options(mt5, sim). \
+        "sim" replays the bars of --sim_data on a simulated broker, without a MetaTrader5 terminal')
+    parser.add_argument('--sim_data', type=str, default=None, metavar='', help='Path to CSV / Parquet file of bars (of --sim_timeframe) replayed by the simulated broker')
+    parser.add_argument('--sim_timeframe', type=str, default=None, choices=list(AVAIALBLE_TIMEFRAMES.keys()), metavar='', help='Timeframe of the bars replayed by the \
+        simulated broker, the bars of its multiples are resampled from them. Defaults to the shortest timeframe of the instruments')
+    parser.add_argument('--sim_ticks', type=str, default=None, metavar='', help='Path to CSV / Parquet file of recorded ticks replayed by the simulated broker \
+        (instead of --sim_data), the bars of --timeframe are built from the ticks')
+    parser.add_argument('--sim_start', type=int, default=1000, metavar='', help='Index of the bar the simulated broker starts at (earlier bars serve as history)')
+    parser.add_argument('--sim_spread', type=float, default=0.0, metavar='', help='Spread (in price units) of the simulated broker')
+    parser.add_argument('--sim_balance', type=float, default=10_000.0, metavar='', help='Starting balance of the simulated broker account')
+    parser.add_argument('--instruments', type=str, default=None, metavar='', help='Path to JSON file with a list of instruments to trade in one session, \
+        each instrument is an object of symbol, timeframe, strategy and risk options (and a "sim_data" or "sim_ticks" path with --broker sim), \
+        missing options default to the values passed on the command line')
     args = parser.parse_args()
 
     _timezone = pytz.timezone(args.timezone)
+    # the simulated broker's clock already runs on bar (server) time
+    _clock_offset:float = 0.0 if args.broker == 'sim' else datetime.now(_timezone).utcoffset().total_seconds()
+
+    # instruments to trade, either from the --instruments file or from the command line options
+    _instrument_options:List[Dict[str, Any]] = [{}]
+    if args.instruments:
+        with open(args.instruments, 'r') as f:
+            _instrument_options = json.load(f)
+
+    try:
+        instruments:List[InstrumentConfig] = [
+            InstrumentConfig.from_dict(options, defaults=vars(args)) for options in _instrument_options
+        ]
+    except ValueError as e:
+        print(f'{e}, go to the help menu for available options')
+        sys.exit()
+    startup.mark('config')
+
+    # initialise the broker (MetaTrader 5 app or simulator)
+    broker:brokers.Broker
+    if args.broker == 'sim':
+        # recorded ticks are replayed if any are given, else bars
+        _use_ticks:bool = args.sim_ticks is not None or any('sim_ticks' in options for options in _instrument_options)
+        _sim_key:str = 'sim_ticks' if _use_ticks else 'sim_data'
+        _sim_data:Dict[str, str] = {}
+        for options in _instrument_options:
+            _sim_data[options.get('symbol', args.symbol)] = options.get(_sim_key, vars(args)[_sim_key])
+
+        if None in _sim_data.values():
+            print(f'--{_sim_key} (or a "{_sim_key}" path for every instrument) is required with --broker sim')
+            sys.exit()
+        # the other timeframes are resampled from the replayed one
+        _timeframes:List[str] = [timeframe for config in instruments for timeframe in config.timeframes]
+        _sim_timeframe:str = args.sim_timeframe or min(_timeframes, key=lambda timeframe: AVAIALBLE_TIMEFRAMES[timeframe][1])
+        if any(AVAIALBLE_TIMEFRAMES[timeframe][1] % AVAIALBLE_TIMEFRAMES[_sim_timeframe][1] != 0 for timeframe in _timeframes):
+            print(f'the timeframes of the instruments must be multiples of the {_sim_timeframe} timeframe with --broker sim')
+            sys.exit()
+        broker = (brokers.SimulatedBroker.from_tick_files if _use_ticks else brokers.SimulatedBroker.from_files)(
+            _sim_data, 
+            timeframe=AVAIALBLE_TIMEFRAMES[_sim_timeframe][0], 
+            start=args.sim_start, 
+            spread=args.sim_spread if not _use_ticks or args.sim_spread > 0 else None, 
+            balance=args.sim_balance
+        )
+        init_env:bool = broker.initialize()
+    else:
+        if None in (args.login, args.password, args.server):
+            print('login, password and server are required with --broker mt5')
+            sys.exit()
+        broker = brokers.MT5Broker()
+        init_env:bool = broker.initialize(login=args.login, password=args.password, server=args.server)
 
-    # initialise the MetaTrader 5 app
-    init_env:bool =  mt5.initialize(login=args.login, password=args.password, server=args.server)
     if not init_env:
         print('failed to initialise metatrader5')
-        mt5.shutdown()
+        broker.shutdown()
         sys.exit()
-
-    # check if symbol is valid
-    if not is_valid_symbol(args.symbol):
-        print(f'{args.symbol} is an invalid symbol')
-        sys.exit()
-
-    # check if strategy is valid
-    if not args.strategy in __strategies__.keys():
-        print(f'{args.strategy} is an invalid strategy, go to the help menu for available options')
-        sys.exit()
-
-    # Parameters
+    set_broker(broker)
+    startup.mark('broker')
+
+    # load the broker's symbols once (or restore them from the startup snapshot), the
+    # cache is refreshed in the background since the MetaTrader5 symbols can change
+    # during a session
+    symbol_registry:SymbolRegistry = get_symbol_registry()
+    symbol_registry.ttl = args.symbol_ttl
+    if args.fast_start:
+        os.makedirs(args.fast_start, exist_ok=True)
+        symbol_registry.path = os.path.join(args.fast_start, 'symbols.json')
+    if args.broker == 'mt5': symbol_registry.start()
+
+    # check if symbols are valid
+    for config in instruments:
+        if not is_valid_symbol(config.symbol):
+            print(f'{config.symbol} is an invalid symbol')
+            sys.exit()
+    startup.mark('symbols')
+
+    # Session Parameters (the strategy and risk parameters are set per instrument)
     ###############################################################################################################################################################
-    STARTING_EQUITY:float = mt5.account_info().balance                  # current equity / balance                                                                #
-    SYMBOL:str = args.symbol                                            # symbol                                                                                  #
-    VOLUME:float = args.volume                                          # volume to trade                                                                         #
-    DEVIATION:int = args.deviation                                      # allowable deviation for trade                                                           #
-    UNIT_PIP:float = args.unit_pip                                      # unit pip value                                                                          #
-    DEFAULT_SL:float = args.default_sl                                  # stop loss points                                                                        #
-    MAX_DIST_SL:float = args.max_sl_dist                                # maximun distance between price and stop loss                                            #
-    TRAIL_AMOUNT:float = args.sl_trail                                  # icrement / decrement value for stop loss                                                #
-    DEFAULT_TP:float = args.default_tp                                  # take profit points                                                                      #
-    STRATEGY:str = args.strategy                                        # strategy                                                                                #
-    USE_ATR:bool = args.use_atr                                         # option for using atr instead of unit pip value                                          #
-    ATR_PERIOD:int = args.atr_period                                    # period of past timestamps to use for computing ATR                                      #
-    TIMEFRAME:str = args.timeframe                                      # trade timeframe                                                                         #     
-    SR_LIKELIHOOD:float = args.sr_likelihood                            # probability score that controls how support resistance indicators are used              #
-    SR_THRESHOLD:float = args.sr_threshold                              # minimum distance between signal candle and support / resistance line (in atr or pip)    #
-    SR_PERIOD:int = args.sr_period                                      # period of past timestamps to use for compute support and resistance levels              #
     TIMEZONE:str = args.timezone                                        # time zone of broker's server
     TARGET_PROFIT:float = args.target_profit                            # percentage target profit for a given session                                            #
     MAX_LOSS:float = args.max_loss                                      # percentage maximum loss for a given session                                             #
-    FILLING_MODE:str = args.filling_mode                                # appropriate order filling mode for your broker                                          #
     SESSIION_DURATION:int = args.session_duration                       # duration to run the bot (minutes)                                                       #
     TRENDLINE_SPAN: int = 1000                                          # number of datapoints to consider when computing trendline                               #
-    USE_TRENDLINE:bool = args.use_trendline                             # option to base trades on EMA trendline                                                  #
-    TRENDLINE_PERIOD:int = args.trendline_period                        # EMA Trendline Period                                                                    #
+    POLL_INTERVAL:float = args.poll_interval                            # seconds between bar polls around a bar boundary                                         #
+    PRE_OPEN:float = args.pre_open                                      # seconds before a bar boundary at which bar polling starts                               #
+    MAINTENANCE_INTERVAL:float = args.maintenance_interval              # seconds between position maintenance runs                                               #
+    CLOCK_OFFSET:float = _clock_offset                                  # broker server time minus UTC (secs), bar times are in server time                       #
     ###############################################################################################################################################################
 
-    _start = time.time()
     # initial console comments
     print(APP_NAME, '\n')
-    print(f'Trade Symbol:           {SYMBOL}')
-    print(f'Trade Volume:           {VOLUME}')
-    print(f'Trade Deviation:        {DEVIATION}')
-    print(f'Trade Unit PIP:         {UNIT_PIP}')
-    print(f'Use ATR:                {USE_ATR}')
-    print(f'ATR Period:             {ATR_PERIOD}')
-    print(f'Trade Default SL:       {DEFAULT_SL}')
-    print(f'Trade max SL distance:  {MAX_DIST_SL}')
-    print(f'Trail SL Value:         {TRAIL_AMOUNT}')
-    print(f'Trade TP:               {DEFAULT_TP}')
-    print(f'Strategy:               {STRATEGY}')
-    print(f'Timeframe:              {TIMEFRAME}')
-    print(f'SR likelihood           {SR_LIKELIHOOD}')
-    print(f'SR contact treshold     {SR_THRESHOLD}')
-    print(f'SR Period:              {SR_PERIOD}')
+    for config in instruments:
+        print(f'Instrument:             {config.name}')
+        print(f'Trade Symbol:           {config.symbol}')
+        print(f'Trade Volume:           {config.volume}')
+        print(f'Trade Deviation:        {config.deviation}')
+        print(f'Trade Unit PIP:         {config.unit_pip}')
+        print(f'Use ATR:                {config.use_atr}')
+        print(f'ATR Period:             {config.atr_period}')
+        print(f'Trade Default SL:       {config.default_sl}')
+        print(f'Trade max SL distance:  {config.max_sl_dist}')
+        print(f'Trail SL Value:         {config.sl_trail}')
+        print(f'Trade TP:               {config.default_tp}')
+        print(f'Strategy:               {config.strategy}')
+        print(f'Timeframe:              {config.timeframe}')
+        print(f'SR likelihood           {config.sr_likelihood}')
+        print(f'SR contact treshold     {config.sr_threshold}')
+        print(f'SR Period:              {config.sr_period}')
+        print(f'Filling Mode:           {config.filling_mode}')
+        print(f'Use Trendline:          {bool(config.use_trendline)}')
+        print(f'Trendline period:       {config.trendline_period}')
+        print(f'Trend timeframe:        {config.trend_timeframe or config.timeframe}', '\n')
+
+        if config.use_trendline and config.trendline_period > TRENDLINE_SPAN:
+            print(f"Trend Period cannot be more than {TRENDLINE_SPAN}")
+            sys.exit()
+
     print(f'Broker Timezone:        {TIMEZONE}')
     print(f'% Target Profit:        {TARGET_PROFIT}%')
     print(f'% Maximmun Loss:        {MAX_LOSS}%')
-    print(f'Filling Mode:           {FILLING_MODE}')
     print(f'Session Duration:       {SESSIION_DURATION} minutes')
-    print(f'Use Trendline:          {bool(USE_TRENDLINE)}')
-    print(f'Trendline period:       {TRENDLINE_PERIOD}')
-    print(f'Bot Session start time: {datetime.now(_timezone).strftime("%Y-%m-%d %H:%M:%S")}', '\n')
-
-    if USE_TRENDLINE and TRENDLINE_PERIOD > TRENDLINE_SPAN:
-        print(f"Trend Period cannot be more than {TRENDLINE_SPAN}")
-        sys.exit()
-
-    # utility variables for the event loop
-    trade_start_time:Optional[datetime] = None
-    lagtime:timedelta = timedelta(minutes=AVAIALBLE_TIMEFRAMES[TIMEFRAME][1] * max(ATR_PERIOD, SR_PERIOD, TRENDLINE_SPAN))
-    position_ids:List[int] = []
-    session_profit:float = 0
-    atr_value:Optional[float] = None
-
-    # set price_multiplier to atr if USE_ATR == True, else set it to UNIT PIP
-    price_multiplier:Optional[float] = atr_value if (USE_ATR) else UNIT_PIP
-
-    while True:
-        #check if stipulated session time has elapsed
-        #-------------------------------------------------------------------------------------------------------------
-        if (time.time() - _start) / 60 >= SESSIION_DURATION:
-            now = datetime.now(_timezone).strftime("%Y-%m-%d %H:%M:%S")
-            print(f'session has terminated after {SESSIION_DURATION} minutes, at {now}')
-            break
-        #-------------------------------------------------------------------------------------------------------------
-
-
-        # trailing stop loss for each ticket
-        #-------------------------------------------------------------------------------------------------------------
-        if len(position_ids) > 0:
-            for id in position_ids:
-                trailed_order:Union[int, mt5.OrderSendResult] = trail_sl(
-                    position_id=id, 
-                    default_sl_points=DEFAULT_SL * price_multiplier, 
-                    max_dist_sl=MAX_DIST_SL * price_multiplier, 
-                    trail_amount=TRAIL_AMOUNT * price_multiplier)
-
-                if isinstance(trailed_order, int):
-                    profit:float = check_profit(trailed_order)
-                    session_profit += profit
-                    print(f'\nOrder at position_id {trailed_order} is closed')
-                    print(f'Deal Profit value:---------------------  {profit}')
-                    print(f'Total session Profit value:------------  {session_profit}\n')
-                    position_ids.remove(trailed_order)
-
-        elif len(position_ids) == 0 and session_profit != 0:
-            percentage_profit:float = get_percentage_profit(STARTING_EQUITY, session_profit)
-            
-            if TARGET_PROFIT > 0 and percentage_profit >= TARGET_PROFIT:
-                print(f'\nTarget profit has been reached or exceeded at {round(percentage_profit, 4)}%, \
-                    this session will be terminated')
-                break
-            elif MAX_LOSS > 0 and percentage_profit <= -MAX_LOSS:
-                print(f'\nMaximum session loss has been reached or exceeded at {round(percentage_profit, 4)}%, \
-                    this session will be terminated')
-                break
-        #-------------------------------------------------------------------------------------------------------------
-        # delay between each iteration (secs)
-        time.sleep(0.04)
-
-        # set datetime to now
-        now:datetime = datetime.now(_timezone)
-
-        # error handle for if Index error (IndexError) is thrown. The index
-        # error is thrown when the "lagtime" variable that specifies the 
-        # time difference is incorrectly set, or when the market is closed.
-        try:
-            # get rates datapoints by timeframe and convert to dataframe
-            #-------------------------------------------------------------------------------------------------------------
-            rates:np.array = mt5.copy_rates_range(
-                SYMBOL, AVAIALBLE_TIMEFRAMES[TIMEFRAME][0], (now - lagtime), now
-            )
-            rates_df:pd.DataFrame = pd.DataFrame(rates)
-            #-------------------------------------------------------------------------------------------------------------
-
-
-            # compute EMA trendline if USE_TRENDLINE is True
-            #-------------------------------------------------------------------------------------------------------------
-            if USE_TRENDLINE: 
-                try:
-                    rates_df = TrendLines.append_ema(rates_df, period=TRENDLINE_PERIOD)
-                except KeyError:
-                    print("MetaTrader 5 application has been terminated, or somethining else went wrong!")
-            #-------------------------------------------------------------------------------------------------------------
-
-
-            # if no time is set (bot just started), set to latest time in rates_df
-            #-------------------------------------------------------------------------------------------------------------
-            if not trade_start_time:
-                trade_start_time = format_uts(rates_df['time'].values[-1], dt_obj=True)
-            #-------------------------------------------------------------------------------------------------------------
-
-
-            # get current time from rates_df dataframe
-            #-------------------------------------------------------------------------------------------------------------
-            current_trade_time:datetime = format_uts(rates_df['time'].values[-1], dt_obj=True)
-            #-------------------------------------------------------------------------------------------------------------
-        
-        except IndexError:
-            print('Market is currently closed, or timezone difference is incorrect.')
-            mt5.shutdown()
-            break
-
-        # check if new session has started by the current time, and initialise trade
-        if trade_start_time != current_trade_time:
-            
-            #input dateframe for strategies
-            input_df:pd.DataFrame = rates_df.iloc[:-1, :]
-
-            # compute the ATR of past candle sticks prior to current one
-            # and set the multiplier to the atr value
-            #-------------------------------------------------------------------------------------------------------------
-            if USE_ATR: 
-                #input dataframe for computing ATR
-                atr_input:pd.DataFrame = input_df.iloc[-ATR_PERIOD:, :]
-                atr_value = compute_latest_atr(atr_input)
-                price_multiplier = atr_value
-            #-------------------------------------------------------------------------------------------------------------
-
-            else: 
-                trade_start_time = current_trade_time
-
-            # input dataframe to use to compute support and resistance levels
-            sr_input:pd.DataFrame = input_df.iloc[-SR_PERIOD:, :]
-
-            
-            # define buying and selling conditions
-            #-------------------------------------------------------------------------------------------------------------
-            buying_conditions: bool = (
-                (TrendLines.is_above_trend_line(input_df) if USE_TRENDLINE else True) and
-                __strategies__[STRATEGY]['buy'](input_df) and
-                SupportResistance.rand_at_support(sr_input, p=SR_LIKELIHOOD, threshold=SR_THRESHOLD * price_multiplier)
-            )
-            
-            selling_condtions: bool = (
-                (TrendLines.is_below_trend_line(input_df) if USE_TRENDLINE else True) and
-                __strategies__[STRATEGY]['sell'](input_df) and
-                SupportResistance.rand_at_resistance(sr_input, p=SR_LIKELIHOOD, threshold=SR_THRESHOLD * price_multiplier)
-            )
-            #-------------------------------------------------------------------------------------------------------------
-
-
-            # check if condition for buying is satisfied and trade
-            # then append the position id to the positions_id
-            # list
-            #-------------------------------------------------------------------------------------------------------------
-            if buying_conditions:
-                order = make_trade(
-                    symbol = SYMBOL, 
-                    buy = True, 
-                    position_id = None, 
-                    volume = VOLUME, 
-                    sl_points = DEFAULT_SL * price_multiplier,
-                    tp_points = DEFAULT_TP * price_multiplier,
-                    deviation = DEVIATION, 
-                    filling_mode = FILLING_MODES_MAP[FILLING_MODE])
-                
-                print(order.comment)
-                if USE_ATR: print(f'current ATR: {round(atr_value, 4)}')
-                if order.order != 0:
-                    log_open_order(order, buy=True)
-                    position_ids.append(order.order)
-            #-------------------------------------------------------------------------------------------------------------
-
-
-            # likewise, check if condition for selling is satisfied and
-            # trade then append the position id to the positions_id
-            # list
-            #-------------------------------------------------------------------------------------------------------------
-            elif selling_condtions:
-                order = make_trade(
-                    symbol = SYMBOL, 
-                    buy = False, 
-                    position_id = None, 
-                    volume = VOLUME, 
-                    sl_points = DEFAULT_SL * price_multiplier,
-                    tp_points = DEFAULT_TP * price_multiplier,
-                    deviation = DEVIATION,
-                    filling_mode = FILLING_MODES_MAP[FILLING_MODE])
-                
-                print(order.comment)
-                if USE_ATR: print(f'current ATR: {round(atr_value, 4)}')
-                if order.order != 0:
-                    log_open_order(order, buy=False)
-                    position_ids.append(order.order)
-            #-------------------------------------------------------------------------------------------------------------
\ No newline at end of file
+    print(f'Tick mode:              {args.tick_mode}')
+    print(f'Strategy workers:       {args.workers}')
+    print(f'Poll interval:          {POLL_INTERVAL} secs')
+    print(f'Maintenance interval:   {MAINTENANCE_INTERVAL} secs')
+    print(f'Bot Session start time: {datetime.fromtimestamp(broker.time(), _timezone).strftime("%Y-%m-%d %H:%M:%S")}', '\n')
+
+    # resume the session of an existing checkpoint, its positions are found by the
+    # session's magic number, so it is set before the engine is created
+    checkpoint:Optional[SessionCheckpoint] = None
+    resume_state:Optional[Dict[str, Any]] = None
+    if args.checkpoint:
+        checkpoint = SessionCheckpoint(args.checkpoint, interval=args.checkpoint_interval)
+        resume_state = checkpoint.load()
+        if resume_state is not None: set_magic_number(resume_state['magic'])
+
+    # run every instrument in a single event loop, or in supervisor mode, share their
+    # evaluation across worker processes (in step with the simulated broker's clock)
+    _supervisor_options:Dict[str, Any] = {}
+    if args.workers > 0:
+        _supervisor_options = dict(workers=args.workers, lockstep=args.broker == 'sim')
+
+    # the trade events are written and printed by the journal's background writer
+    journal:TradeJournal = TradeJournal(path=args.journal, console=not args.quiet, clock=broker.time)
+    set_journal(journal)
+    journal.start()
+
+    engine:TradingEngine = (FeedSupervisor if args.workers > 0 else TradingEngine)(
+        instruments,
+        target_profit=TARGET_PROFIT,
+        max_loss=MAX_LOSS,
+        session_duration=SESSIION_DURATION,
+        trendline_span=TRENDLINE_SPAN,
+        clock_offset=CLOCK_OFFSET,
+        pre_open=PRE_OPEN,
+        poll_interval=POLL_INTERVAL,
+        maintenance_interval=MAINTENANCE_INTERVAL,
+        timezone=_timezone,
+        broker=broker,
+        # the simulated broker's clock is driven by the loop, so its orders are sent inline
+        order_workers=0 if args.broker == 'sim' else args.order_workers,
+        tick_mode=args.tick_mode,
+        bar_store=args.bar_store or (os.path.join(args.fast_start, 'bars') if args.fast_start else None),
+        resample=args.resample,
+        checkpoint=checkpoint,
+        journal=journal,
+        startup=startup,
+        **_supervisor_options
+    )
+    if resume_state is not None: engine.restore(resume_state)
+    startup.mark('engine')
+
+    # export the latency / slippage metrics of the loop while it runs
+    exporter:Optional[MetricsExporter] = None
+    if args.metrics_file or args.metrics_port:
+        exporter = MetricsExporter(
+            engine.metrics, path=args.metrics_file, port=args.metrics_port, interval=args.metrics_interval
+        )
+        exporter.start()
+
+    engine.run()
+    journal.close()
+    if exporter is not None: exporter.stop()
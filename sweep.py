@@ -0,0 +1,79 @@
+import time
+import argparse
+import pandas as pd
+from typing import Any, Dict, List
+from backtesting import load_bars, resample_bars, sweep
+from bot_strategies import __batch_strategies__
+
+APP_NAME = f"WHATEVER FX-BOT PARAMETER SWEEP"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=APP_NAME)
+
+    # mandatory CLI arguments
+    parser.add_argument('data', type=str, metavar='data', help='Path to CSV / Parquet file of historical bars (time, open, high, low, close), \
+        or to a <symbol>/<timeframe> directory of a bar store (see --bar_store of main.py)')
+
+    parser.add_argument('--timeframe', type=str, default=None, metavar='', help='Timeframe the bars are resampled to before backtesting \
+        (eg: M15 or H4 from M1 bars), the bars are used as they are if not set')
+
+    # swept options, each takes one or more values and every combination of them is backtested
+    parser.add_argument('--strategy', type=str, nargs='+', default=['composite'], choices=list(__batch_strategies__.keys()), metavar='', help='Strategies to use: Options(engulf, rejection, composite)')
+    parser.add_argument('--atr_period', type=int, nargs='+', default=[5], metavar='', help='periods of past timestamps to use for computing ATR value')
+    parser.add_argument('--default_sl', type=float, nargs='+', default=[4.0], metavar='', help='Default stop loss values (in pip / ATR)')
+    parser.add_argument('--max_sl_dist', type=float, nargs='+', default=[4.0], metavar='', help='Maximum distances between current price and stop loss (in pip / ATR)')
+    parser.add_argument('--sl_trail', type=float, nargs='+', default=[0.0], metavar='', help='Stop loss trail values (in pip / ATR)')
+    parser.add_argument('--default_tp', type=float, nargs='+', default=[8.0], metavar='', help='Take profit values (in pip / ATR)')
+    parser.add_argument('--sr_likelihood', type=float, nargs='+', default=[0.8], metavar='', help='likelihood scores for support / resistance indicator utilisation')
+    parser.add_argument('--sr_threshold', type=float, nargs='+', default=[3.0], metavar='', help='Threshold distances (in pips / ATR) between candle stick that triggered a signal\
+        and the corresponding support / resistance line the signal was picked')
+    parser.add_argument('--sr_period', type=int, nargs='+', default=[60], metavar='', help='periods of past timestamps to use for computing the support and resistance levels')
+    parser.add_argument('--trendline_period', type=int, nargs='+', default=[10], metavar='', help='EMA Trendline Periods (used with --use_trendline)')
+
+    # options shared by every combination
+    parser.add_argument('--volume', type=float, default=1.0, metavar='', help='Volume to trade')
+    parser.add_argument('--unit_pip', type=float, default=1e-5, metavar='', help='Value of 1 pip for symbol (necessary parameter if ATR is set to 0 (False))')
+    parser.add_argument('--use_atr', action='store_true', help='Use Average True Return (ATR) to compute stop loss, trail, take profit and sr_threshold')
+    parser.add_argument('--use_trendline', action='store_true', help='Base trades on EMA trendline')
+    parser.add_argument('--spread', type=float, default=0.0, metavar='', help='Spread in price units, added to buy entries and sell exits')
+    parser.add_argument('--contract_size', type=float, default=100_000.0, metavar='', help='Units of the base asset in 1 lot')
+    parser.add_argument('--starting_equity', type=float, default=10_000.0, metavar='', help='Starting equity / balance')
+    parser.add_argument('--seed', type=int, default=0, metavar='', help='Seed for the support / resistance likelihood random draws (the same for every combination)')
+    parser.add_argument('--rank_by', type=str, default='total_profit', choices=['total_profit', 'return_pct', 'profit_factor', 'win_rate', 'max_drawdown'], metavar='', help='Statistic to rank the combinations by')
+    parser.add_argument('--processes', type=int, default=None, metavar='', help='Number of worker processes (default: number of CPU cores)')
+    parser.add_argument('--top', type=int, default=20, metavar='', help='Number of best combinations to print')
+    parser.add_argument('--results_out', type=str, default=None, metavar='', help='Path to write the ranked results table to (CSV)')
+    args = parser.parse_args()
+
+    SWEPT:List[str] = [
+        'strategy', 'atr_period', 'default_sl', 'max_sl_dist', 'sl_trail', 'default_tp',
+        'sr_likelihood', 'sr_threshold', 'sr_period'
+    ]
+    grid:Dict[str, List[Any]] = {key:getattr(args, key) for key in SWEPT}
+    if args.use_trendline: grid['trendline_period'] = args.trendline_period
+    fixed:Dict[str, Any] = {
+        'volume':args.volume, 'unit_pip':args.unit_pip, 'use_atr':args.use_atr,
+        'use_trendline':args.use_trendline, 'seed':args.seed
+    }
+
+    _start = time.time()
+    bars:pd.DataFrame = load_bars(args.data)
+    if args.timeframe: bars = resample_bars(bars, args.timeframe)
+    results:pd.DataFrame = sweep(
+        bars, grid, fixed=fixed, rank_by=args.rank_by, processes=args.processes,
+        spread=args.spread, contract_size=args.contract_size, starting_equity=args.starting_equity
+    )
+
+    print(APP_NAME, '\n')
+    print(f'Bars:                   {len(bars)}')
+    print(f'Combinations:           {len(results)}')
+    print(f'Run time:               {round(time.time() - _start, 2)} seconds', '\n')
+
+    columns:List[str] = ['rank'] + [key for key in grid if len(grid[key]) > 1] + [
+        'trades', 'win_rate', 'total_profit', 'profit_factor', 'max_drawdown', 'return_pct'
+    ]
+    with pd.option_context('display.max_columns', None, 'display.width', 200):
+        print(results[columns].head(args.top).round(4).to_string(index=False))
+
+    if args.results_out: results.to_csv(args.results_out, index=False)
@@ -1 +1,12 @@
-from .utilities import *
\ No newline at end of file
+from .symbols import *
+from .utilities import *
+from .bar_store import *
+from .bar_buffer import *
+from .ticks import *
+from .shared_feed import *
+from .scheduler import *
+from .positions import *
+from .ledger import *
+from .indicators import *
+from .metrics import *
+from .journal import *
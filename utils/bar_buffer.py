@@ -0,0 +1,292 @@
+from __future__ import annotations
+import numpy as np
+from typing import TYPE_CHECKING, Optional
+from brokers import Broker, resample_rates, timeframe_seconds
+from bot_strategies import Bars
+from .bar_store import BarStore
+from .utilities import get_broker
+
+if TYPE_CHECKING: import pandas as pd
+
+
+class BarBuffer:
+    r"""
+    Fixed-size, preallocated buffer of the latest bars of a symbol / timeframe.
+    After the initial backfill, each update only fetches the newest few bars with
+    copy_rates_from_pos, overwrites the forming bar in place and appends bars that
+    have just opened, instead of re-downloading the whole history window.
+
+    Every bar is written twice, at slot i and i + capacity, so the latest 
+    `capacity` bars are always a contiguous (zero copy) slice of the storage.
+
+    parameters
+    -------------
+    symbol: (str) - trade symbol
+
+    timeframe: (int) - MetaTrader5 timeframe constant (eg: MetaTrader5.TIMEFRAME_M1)
+
+    capacity: (int) - number of bars kept (the forming bar included)
+
+    fetch_count: (int) - number of newest bars fetched on each update
+
+    broker: (Broker, None) - broker to fetch bars from, defaults to the bot's
+    broker (see set_broker)
+
+    store: (BarStore, None) - on-disk store of the symbol / timeframe's closed bars.
+    The backfill then only downloads the bars that closed since the store's newest
+    bar (warm start), and every bar that closes is appended to the store
+    """
+    def __init__(
+        self, symbol:str, timeframe:int, capacity:int, fetch_count:int=3, broker:Optional[Broker]=None,
+        store:Optional[BarStore]=None):
+        assert capacity >= fetch_count, 'capacity cannot be less than fetch_count'
+
+        self.symbol:str = symbol
+        self.timeframe:int = timeframe
+        self.capacity:int = capacity
+        self.fetch_count:int = fetch_count
+        self.broker:Broker = broker or get_broker()
+        self.store:Optional[BarStore] = store
+
+        self._storage:Optional[np.ndarray] = None
+        self._slot:int = -1
+        self._count:int = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    @property
+    def last_time(self) -> int:
+        r"""
+        open time (unix timestamp) of the newest (forming) bar, raises IndexError
+        if the buffer is empty
+        """
+        if self._count == 0: raise IndexError('bar buffer is empty')
+        return int(self._storage['time'][self._slot + self.capacity])
+
+    def backfill(self) -> int:
+        r"""
+        (re)loads the buffer with the latest `capacity` bars
+
+        returns
+        -------------
+        returns the number of bars loaded
+        """
+        if self.store is not None: return self._warm_start()
+
+        rates:Optional[np.ndarray] = self.broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.capacity)
+        if rates is None or len(rates) == 0:
+            raise IndexError(f'no bars available for {self.symbol}')
+
+        self._reset(rates.dtype)
+        for bar in rates: self._append(bar)
+        return len(rates)
+
+    def update(self) -> int:
+        r"""
+        fetches the newest bars, updates the forming bar in place and appends 
+        newly opened bars. Falls back to a full backfill on the first call, or 
+        if bars were missed since the last update
+
+        returns
+        -------------
+        returns the number of new bars appended
+        """
+        if self._count == 0: return self.backfill()
+
+        rates:Optional[np.ndarray] = self.broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.fetch_count)
+        if rates is None or len(rates) == 0: return 0
+
+        last_time:int = self.last_time
+        if rates['time'][0] > last_time:
+            # the oldest fetched bar is already new, so bars in between were missed
+            self.backfill()
+            return int(np.count_nonzero(self.view()['time'] > last_time))
+
+        n_new:int = self._add_rates(rates)
+        if n_new > 0: self._store_closed()
+        return n_new
+
+    def view(self, closed_only:bool=False) -> np.ndarray:
+        r"""
+        zero copy view of the buffered bars, oldest first
+
+        parameters
+        -------------
+        closed_only: (bool) - if True, the forming (newest) bar is left out
+
+        returns
+        -------------
+        returns a structured array in the layout of MetaTrader5.copy_rates_from_pos
+        """
+        if self._count == 0: return np.zeros(0, dtype=self._storage.dtype if self._storage is not None else float)
+
+        end:int = self._slot + self.capacity + 1
+        return self._storage[end - self._count : end - (1 if closed_only else 0)]
+
+    def bars(self, closed_only:bool=False) -> Bars:
+        r"""
+        zero copy Bars of the buffered bars, for the strategy functions. Like view,
+        the arrays are backed by the buffer, so they are only valid until the next
+        update
+
+        parameters
+        -------------
+        closed_only: (bool) - if True, the forming (newest) bar is left out
+
+        returns
+        -------------
+        returns Bars of the buffered bars, oldest first
+        """
+        return Bars.from_records(self.view(closed_only=closed_only))
+
+    def to_frame(self, closed_only:bool=False) -> pd.DataFrame:
+        r"""
+        dataframe of the buffered bars, in the same layout as the dataframes built
+        from MetaTrader5.copy_rates_range
+
+        parameters
+        -------------
+        closed_only: (bool) - if True, the forming (newest) bar is left out
+
+        returns
+        -------------
+        returns a new dataframe
+        """
+        import pandas as pd
+        return pd.DataFrame(self.view(closed_only=closed_only))
+
+    def _warm_start(self) -> int:
+        # history from the store, brought up to date with the bars that closed since
+        # it was last written, then the newest bars (the forming bar included)
+        self.store.sync(self.broker, count=self.capacity)
+        rates:Optional[np.ndarray] = self.broker.copy_rates_from_pos(self.symbol, self.timeframe, 0, self.fetch_count)
+        if rates is None or len(rates) == 0:
+            raise IndexError(f'no bars available for {self.symbol}')
+
+        # a replayed session may start before the store's newest bar
+        history:np.ndarray = self.store.records(self.capacity, date_to=int(rates['time'][0]) - 1)
+
+        self._reset(rates.dtype)
+        for bar in history: self._append(bar)
+        self._add_rates(rates)
+        return self._count
+
+    def _add_rates(self, rates:np.ndarray) -> int:
+        # appends the bars newer than the newest buffered bar and overwrites the others
+        n_new:int = 0
+        last_time:Optional[int] = self.last_time if self._count > 0 else None
+        for bar in rates:
+            if last_time is None or bar['time'] > last_time:
+                self._append(bar)
+                last_time = int(bar['time'])
+                n_new += 1
+            else:
+                self._overwrite(bar)
+        return n_new
+
+    def _store_closed(self) -> None:
+        # appends the bars that closed to the store (it skips the bars it already has)
+        if self.store is not None: self.store.append(self.view(closed_only=True))
+
+    def _reset(self, dtype:np.dtype) -> None:
+        if self._storage is None or self._storage.dtype != dtype:
+            self._storage = np.zeros(2 * self.capacity, dtype=dtype)
+        self._slot = -1
+        self._count = 0
+
+    def _append(self, bar:np.void) -> None:
+        self._slot = (self._slot + 1) % self.capacity
+        self._storage[self._slot] = bar
+        self._storage[self._slot + self.capacity] = bar
+        self._count = min(self._count + 1, self.capacity)
+
+    def _overwrite(self, bar:np.void) -> None:
+        # the fetched bar is one of the newest bars already buffered
+        for back in range(min(self.fetch_count, self._count)):
+            slot:int = (self._slot - back) % self.capacity
+            if self._storage['time'][slot] == bar['time']:
+                self._storage[slot] = bar
+                self._storage[slot + self.capacity] = bar
+                return
+
+
+class ResampledBarBuffer(BarBuffer):
+    r"""
+    BarBuffer of a higher timeframe (eg: M15 or H4) whose bars are built from the
+    bars of another buffer of the same symbol (eg: M1, polled from the broker or
+    built from ticks), instead of being downloaded. Only the backfill downloads
+    the timeframe's history (or reads it from the store), every update resamples
+    the source's bars of the forming bar's period and after, without broker I/O.
+
+    The source must be updated first, and hold more than two bars of this
+    timeframe, so that it always has every bar of the forming bar's period.
+
+    parameters
+    -------------
+    source: (BarBuffer) - buffer of the bars resampled, of a timeframe that divides
+    this timeframe
+
+    timeframe: (int) - MetaTrader5 timeframe constant (eg: MetaTrader5.TIMEFRAME_M15)
+
+    capacity: (int) - number of bars kept (the forming bar included)
+
+    store: (BarStore, None) - on-disk store of the timeframe's closed bars (see BarBuffer)
+    """
+    def __init__(self, source:BarBuffer, timeframe:int, capacity:int, store:Optional[BarStore]=None):
+        super().__init__(source.symbol, timeframe, capacity=capacity, broker=source.broker, store=store)
+        self.source:BarBuffer = source
+        self.period:int = timeframe_seconds(timeframe)
+
+        source_period:int = timeframe_seconds(source.timeframe)
+        assert self.period % source_period == 0, 'the source timeframe must divide the timeframe'
+        assert source.capacity > 2 * self.period // source_period, \
+            'the source must hold more than two bars of the timeframe'
+
+    def backfill(self) -> int:
+        r"""
+        (re)loads the buffer with the latest `capacity` bars, the bars the source
+        holds are rebuilt from it
+
+        returns
+        -------------
+        returns the number of bars loaded
+        """
+        super().backfill()
+        self._resample_source()
+        return self._count
+
+    def update(self) -> int:
+        r"""
+        resamples the source's newest bars, updates the forming bar in place and
+        appends newly opened bars. Falls back to a full backfill on the first call,
+        or if the source no longer holds the bars of the forming bar's period
+
+        returns
+        -------------
+        returns the number of new bars appended
+        """
+        if self._count == 0: return self.backfill()
+
+        last_time:int = self.last_time
+        n_new:Optional[int] = self._resample_source()
+        if n_new is None:
+            self.backfill()
+            return int(np.count_nonzero(self.view()['time'] > last_time))
+
+        if n_new > 0: self._store_closed()
+        return n_new
+
+    def _resample_source(self) -> Optional[int]:
+        # resamples the source's bars from the start of the forming bar's period, None
+        # if the source does not hold all of them
+        rates:np.ndarray = self.source.view()
+        if len(rates) == 0: return 0
+
+        last_time:int = self.last_time
+        times:np.ndarray = rates['time']
+        start:int = int(np.searchsorted(times, last_time, side='left'))
+        if start == 0 and times[0] > last_time: return None
+        if start == len(rates): return 0
+
+        return self._add_rates(resample_rates(rates[start:], self.timeframe))
@@ -0,0 +1,216 @@
+from __future__ import annotations
+import os
+import numpy as np
+from typing import TYPE_CHECKING, Dict, Optional, Tuple
+from brokers import Broker, RATES_DTYPE, parse_timeframe, timeframe_name, timeframe_seconds
+from bot_strategies import Bars
+
+if TYPE_CHECKING: import pandas as pd
+
+
+class BarStore:
+    r"""
+    Append-only, on-disk store of the closed bars of a symbol / timeframe, so that
+    the history is downloaded from the terminal once and then only extended with
+    the bars that closed since.
+
+    The bars are stored column by column, one raw binary file per column of
+    copy_rates_from_pos (<root>/<symbol>/<timeframe>/<column>.bin), and read through
+    memory maps, so reading a time range returns zero copy (contiguous) views of
+    the files. Readers only see the bars written to every column, so a reader never
+    sees a partially appended bar and an interrupted append is trimmed by the next
+    append.
+
+    parameters
+    -------------
+    root: (str) - directory of the store
+
+    symbol: (str) - trade symbol
+
+    timeframe: (int) - MetaTrader5 timeframe constant (eg: MetaTrader5.TIMEFRAME_M1)
+    """
+    def __init__(self, root:str, symbol:str, timeframe:int):
+        self.root:str = root
+        self.symbol:str = symbol
+        self.timeframe:int = timeframe
+        self.period:int = timeframe_seconds(timeframe)
+        self.path:str = os.path.join(root, symbol, timeframe_name(timeframe))
+
+        # memory maps of the columns, reopened when the store grows
+        self._maps:Dict[str, np.ndarray] = {}
+        self._mapped_len:int = 0
+        self._repaired:bool = False
+
+    @classmethod
+    def open(cls, path:str) -> "BarStore":
+        r"""
+        opens the store of a <root>/<symbol>/<timeframe> directory (eg: data/EURUSD/M1)
+        """
+        path = os.path.normpath(path)
+        root, symbol = os.path.split(os.path.dirname(path))
+        return cls(root, symbol, parse_timeframe(os.path.basename(path)))
+
+    @staticmethod
+    def is_store(path:str) -> bool:
+        r"""
+        True if path is the directory of a symbol / timeframe of a bar store
+        """
+        return os.path.isfile(os.path.join(path, 'time.bin'))
+
+    def __len__(self) -> int:
+        return min(self._file_len(col) for col in RATES_DTYPE.names)
+
+    @property
+    def first_time(self) -> Optional[int]:
+        r"""
+        open time (unix timestamp) of the oldest stored bar, None if the store is empty
+        """
+        times:np.ndarray = self.column('time')
+        return int(times[0]) if len(times) > 0 else None
+
+    @property
+    def last_time(self) -> Optional[int]:
+        r"""
+        open time (unix timestamp) of the newest stored bar, None if the store is empty
+        """
+        times:np.ndarray = self.column('time')
+        return int(times[-1]) if len(times) > 0 else None
+
+    def column(self, name:str, date_from:Optional[int]=None, date_to:Optional[int]=None) -> np.ndarray:
+        r"""
+        zero copy (read only) view of a column for the bars opened between date_from
+        and date_to (unix timestamps, both included)
+
+        parameters
+        -------------
+        name: (str) - column of copy_rates_from_pos (time, open, high, low, close, ...)
+
+        date_from, date_to: (int, None) - time range, None for no bound
+        """
+        self._map()
+        start, stop = self._range(date_from, date_to)
+        return self._maps[name][start:stop]
+
+    def read(self, date_from:Optional[int]=None, date_to:Optional[int]=None) -> Bars:
+        r"""
+        zero copy Bars of the bars opened between date_from and date_to (unix
+        timestamps, both included)
+        """
+        self._map()
+        start, stop = self._range(date_from, date_to)
+        return Bars(*(self._maps[col][start:stop] for col in ('time', 'open', 'high', 'low', 'close')))
+
+    def records(self, count:int, date_to:Optional[int]=None) -> np.ndarray:
+        r"""
+        the newest `count` bars opened at or before date_to (unix timestamp, None for
+        no bound), as a (new) structured array in the layout of copy_rates_from_pos
+        """
+        self._map()
+        _, stop = self._range(None, date_to)
+        rates:np.ndarray = np.zeros(min(count, stop), dtype=RATES_DTYPE)
+        for col in RATES_DTYPE.names: rates[col] = self._maps[col][stop - len(rates):stop]
+        return rates
+
+    def to_frame(self, date_from:Optional[int]=None, date_to:Optional[int]=None) -> pd.DataFrame:
+        r"""
+        dataframe (copy) of the bars opened between date_from and date_to, in the
+        same layout as load_bars
+        """
+        self._map()
+        start, stop = self._range(date_from, date_to)
+        import pandas as pd
+        return pd.DataFrame({col:np.array(self._maps[col][start:stop]) for col in RATES_DTYPE.names})
+
+    def append(self, rates:np.ndarray) -> int:
+        r"""
+        appends the bars that are newer than the newest stored bar, the bars must be
+        closed (the forming bar would be stored with its current prices)
+
+        parameters
+        -------------
+        rates: (np.ndarray) - bars in the layout of copy_rates_from_pos, oldest first
+
+        returns
+        -------------
+        returns the number of bars appended
+        """
+        if not self._repaired: self._repair()
+
+        last_time:Optional[int] = self.last_time
+        if last_time is not None and len(rates) > 0:
+            rates = rates[rates['time'] > last_time]
+        if len(rates) == 0: return 0
+
+        os.makedirs(self.path, exist_ok=True)
+        # the time column is written last, a bar only counts once it is in every column
+        for col in RATES_DTYPE.names[1:] + ('time',):
+            with open(self._file(col), 'ab') as f:
+                f.write(np.ascontiguousarray(rates[col], dtype=RATES_DTYPE[col]).tobytes())
+        return len(rates)
+
+    def sync(self, broker:Broker, count:int=100_000) -> int:
+        r"""
+        downloads and appends the bars that closed since the newest stored bar, or
+        the latest `count` closed bars if the store is empty
+
+        parameters
+        -------------
+        broker: (Broker) - broker to download the bars from
+
+        count: (int) - number of bars to download into an empty store
+
+        returns
+        -------------
+        returns the number of bars appended
+        """
+        last_time:Optional[int] = self.last_time
+        rates:Optional[np.ndarray]
+        if last_time is None:
+            # position 1 leaves out the forming bar
+            rates = broker.copy_rates_from_pos(self.symbol, self.timeframe, 1, count)
+        else:
+            # the range ends a day after the broker's clock, whatever the server's
+            # timezone, and its last bar is the forming bar
+            rates = broker.copy_rates_range(
+                self.symbol, self.timeframe, last_time + self.period, int(broker.time()) + 86400
+            )
+            if rates is not None: rates = rates[:-1]
+
+        if rates is None or len(rates) == 0: return 0
+        return self.append(rates)
+
+    def _file(self, col:str) -> str:
+        return os.path.join(self.path, f'{col}.bin')
+
+    def _file_len(self, col:str) -> int:
+        try:
+            return os.path.getsize(self._file(col)) // RATES_DTYPE[col].itemsize
+        except OSError:
+            return 0
+
+    def _map(self) -> None:
+        n:int = len(self)
+        if n == self._mapped_len and self._maps: return
+
+        self._maps = {
+            col:(np.memmap(self._file(col), dtype=RATES_DTYPE[col], mode='r', shape=(n,)) if n > 0
+                 else np.zeros(0, dtype=RATES_DTYPE[col]))
+            for col in RATES_DTYPE.names
+        }
+        self._mapped_len = n
+
+    def _range(self, date_from:Optional[int], date_to:Optional[int]) -> Tuple[int, int]:
+        times:np.ndarray = self._maps['time']
+        start:int = int(times.searchsorted(int(date_from), side='left')) if date_from is not None else 0
+        stop:int = int(times.searchsorted(int(date_to), side='right')) if date_to is not None else len(times)
+        return start, max(start, stop)
+
+    def _repair(self) -> None:
+        # trims the columns of an interrupted append to the bars written to every column
+        n:int = len(self)
+        for col in RATES_DTYPE.names:
+            size:int = n * RATES_DTYPE[col].itemsize
+            if os.path.exists(self._file(col)) and os.path.getsize(self._file(col)) != size:
+                self._maps = {}
+                os.truncate(self._file(col), size)
+        self._repaired = True
@@ -0,0 +1,237 @@
+from __future__ import annotations
+import math
+import numpy as np
+from collections import deque
+from typing import TYPE_CHECKING, Any, Deque, Dict, Optional, Union
+from bot_strategies import Bars
+
+if TYPE_CHECKING: import pandas as pd
+
+
+class StreamingATR:
+    r"""
+    ATR (Average True Range) updated in constant time per closed candle
+
+    With simple smoothing the value is the mean true range of the last `period`
+    candles, where the first candle of the window only contributes its high - low
+    range, the same as compute_latest_atr on the last `period` rows. With Wilder
+    smoothing the value is the true range smoothed with alpha = 1 / period, the same
+    as pandas' tr.ewm(alpha=1/period, adjust=False).mean() over the candles fed.
+
+    parameters
+    -------------
+    period: (int) - number of candles in the ATR window (default=14)
+
+    wilder: (bool) - use Wilder smoothing instead of a simple mean (default=False)
+    """
+    def __init__(self, period:int=14, wilder:bool=False):
+        assert period > 0, 'period must be positive'
+        self.period:int = period
+        self.wilder:bool = wilder
+        self.reset()
+
+    def reset(self) -> None:
+        r"""
+        forgets every candle fed so far
+        """
+        self.value:Optional[float] = None
+        self.last_time:Optional[int] = None
+        self._prev_close:Optional[float] = None
+        self._count:int = 0
+        # true ranges and high - low ranges of the simple ATR window
+        self._trs:Deque[float] = deque(maxlen=self.period)
+        self._hls:Deque[float] = deque(maxlen=self.period)
+        self._tr_sum:float = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_state(self) -> Dict[str, Any]:
+        r"""
+        JSON serialisable state of the indicator, see set_state
+        """
+        return {
+            'value': self.value, 'last_time': self.last_time, 'prev_close': self._prev_close,
+            'count': self._count, 'trs': list(self._trs), 'hls': list(self._hls),
+        }
+
+    def set_state(self, state:Dict[str, Any]) -> None:
+        r"""
+        restores a state returned by get_state (eg: after a restart), the candles fed
+        next continue from it
+        """
+        self.reset()
+        self.value, self.last_time = state['value'], state['last_time']
+        self._prev_close, self._count = state['prev_close'], state['count']
+        self._trs.extend(state['trs'])
+        self._hls.extend(state['hls'])
+        self._tr_sum = math.fsum(self._trs)
+
+    def update(self, high:float, low:float, close:float, time:Optional[int]=None) -> Optional[float]:
+        r"""
+        adds a closed candle, a candle with a time that is not newer than the last
+        one is ignored
+
+        parameters
+        -------------
+        high, low, close: (float) - prices of the candle
+
+        time: (int, None) - time of the candle (unix timestamp)
+
+        returns
+        -------------
+        returns the updated ATR value
+        """
+        if time is not None:
+            if self.last_time is not None and time <= self.last_time: return self.value
+            self.last_time = time
+
+        hl:float = high - low
+        tr:float = hl if self._prev_close is None else max(
+            hl, abs(high - self._prev_close), abs(low - self._prev_close)
+        )
+        self._prev_close = close
+        self._count += 1
+
+        if self.wilder:
+            self.value = tr if self.value is None else self.value + (tr - self.value) / self.period
+            return self.value
+
+        if len(self._trs) == self.period: self._tr_sum -= self._trs[0]
+        self._trs.append(tr)
+        self._hls.append(hl)
+        self._tr_sum += tr
+
+        # the running sum is recomputed once per window so that rounding errors
+        # cannot build up over a long session
+        if self._count % self.period == 0: self._tr_sum = math.fsum(self._trs)
+
+        self.value = (self._hls[0] + self._tr_sum - self._trs[0]) / len(self._trs)
+        return self.value
+
+    def extend(self, df:Union[pd.DataFrame, Bars]) -> Optional[float]:
+        r"""
+        adds the candles of a dataframe that are newer than the last candle fed
+
+        parameters
+        -------------
+        df: (pandas.core.frame.DataFrame, Bars) - candles with time, high, low and close columns
+
+        returns
+        -------------
+        returns the updated ATR value
+        """
+        times:np.ndarray = np.asarray(df['time'])
+        start:int = 0
+        if self.last_time is not None:
+            start = int(np.searchsorted(times, self.last_time, side='right'))
+
+        for high, low, close, time in zip(
+            np.asarray(df['high'])[start:].tolist(), np.asarray(df['low'])[start:].tolist(),
+            np.asarray(df['close'])[start:].tolist(), times[start:].tolist()):
+            self.update(high, low, close, time)
+        return self.value
+
+
+class StreamingEMA:
+    r"""
+    EMA (Exponential Moving Average) updated in constant time per closed candle, the
+    same as pandas' ewm(span=period, adjust=adjust).mean() over the values fed
+
+    parameters
+    -------------
+    period: (int) - EMA span (default=10)
+
+    adjust: (bool) - use the adjusted (normalised weights) EMA, like TrendLines.append_ema,
+    instead of the recursive one (default=True)
+    """
+    def __init__(self, period:int=10, adjust:bool=True):
+        assert period > 0, 'period must be positive'
+        self.period:int = period
+        self.adjust:bool = adjust
+        self.alpha:float = 2 / (period + 1)
+        self.reset()
+
+    def reset(self) -> None:
+        r"""
+        forgets every value fed so far
+        """
+        self.value:Optional[float] = None
+        self.last_time:Optional[int] = None
+        self._count:int = 0
+        # weighted sum of the values and sum of the weights of the adjusted EMA
+        self._numerator:float = 0.0
+        self._denominator:float = 0.0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def get_state(self) -> Dict[str, Any]:
+        r"""
+        JSON serialisable state of the indicator, see set_state
+        """
+        return {
+            'value': self.value, 'last_time': self.last_time, 'count': self._count,
+            'numerator': self._numerator, 'denominator': self._denominator,
+        }
+
+    def set_state(self, state:Dict[str, Any]) -> None:
+        r"""
+        restores a state returned by get_state (eg: after a restart), the values fed
+        next continue from it
+        """
+        self.value, self.last_time, self._count = state['value'], state['last_time'], state['count']
+        self._numerator, self._denominator = state['numerator'], state['denominator']
+
+    def update(self, value:float, time:Optional[int]=None) -> Optional[float]:
+        r"""
+        adds a value (eg: a closing price), a value with a time that is not newer than
+        the last one is ignored
+
+        parameters
+        -------------
+        value: (float) - new value
+
+        time: (int, None) - time of the value (unix timestamp)
+
+        returns
+        -------------
+        returns the updated EMA value
+        """
+        if time is not None:
+            if self.last_time is not None and time <= self.last_time: return self.value
+            self.last_time = time
+
+        self._count += 1
+        if self.adjust:
+            decay:float = 1 - self.alpha
+            self._numerator = self._numerator * decay + value
+            self._denominator = self._denominator * decay + 1
+            self.value = self._numerator / self._denominator
+        else:
+            self.value = value if self.value is None else self.value + self.alpha * (value - self.value)
+        return self.value
+
+    def extend(self, df:Union[pd.DataFrame, Bars], column:str='close') -> Optional[float]:
+        r"""
+        adds the values of a dataframe column for the rows that are newer than the last
+        row fed
+
+        parameters
+        -------------
+        df: (pandas.core.frame.DataFrame, Bars) - rows with a time column
+
+        column: (str) - column to average (default='close')
+
+        returns
+        -------------
+        returns the updated EMA value
+        """
+        times:np.ndarray = np.asarray(df['time'])
+        start:int = 0
+        if self.last_time is not None:
+            start = int(np.searchsorted(times, self.last_time, side='right'))
+
+        for value, time in zip(np.asarray(df[column])[start:].tolist(), times[start:].tolist()):
+            self.update(value, time)
+        return self.value
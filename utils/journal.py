@@ -0,0 +1,181 @@
+import sys
+import json
+import time
+import threading
+import collections
+import numpy as np
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+# (time, kind, fields, console message) of a journal event
+JournalEvent = Tuple[float, str, Dict[str, Any], Optional[str]]
+
+
+def _to_json(value:Any) -> Any:
+    # numpy scalars (eg: bar times, prices) and anything else json cannot encode
+    if isinstance(value, np.generic): return value.item()
+    return str(value)
+
+
+class TradeJournal:
+    r"""
+    Structured journal of the session's trading events (signals, orders, fills,
+    stop loss modifications, closed positions, risk and session events). Recording
+    an event only appends it to an in-memory ring buffer, a background writer
+    flushes the buffer in batches to an append-only JSONL file (one JSON object
+    per event, with its time and kind) and prints the events' console messages.
+    The trading loop therefore never waits on file or console I/O.
+
+    If the writer is not started (see start), the events are only written by
+    flush(). When the buffer is full, the oldest events are dropped and counted.
+
+    parameters
+    -------------
+    path: (str, None) - JSONL file the events are appended to, None to not write them
+
+    console: (bool) - print the events' console messages (default=True)
+
+    capacity: (int) - maximum number of buffered events (default=65536)
+
+    flush_interval: (float) - seconds between flushes of the writer, the writer also
+    flushes as soon as the buffer is half full (default=0.5)
+
+    clock: (Callable, None) - returns the time (unix timestamp) of the events, eg: a
+    broker's time, defaults to time.time
+    """
+    def __init__(
+        self,
+        path:Optional[str]=None,
+        console:bool=True,
+        capacity:int=65536,
+        flush_interval:float=0.5,
+        clock:Optional[Callable[[], float]]=None):
+
+        assert capacity > 0, 'capacity must be positive'
+        self.path:Optional[str] = path
+        self.console:bool = console
+        self.capacity:int = capacity
+        self.flush_interval:float = flush_interval
+        self.clock:Callable[[], float] = clock or time.time
+        self.dropped:int = 0
+
+        # appends and pops of a deque are thread safe
+        self._events:Deque[JournalEvent] = collections.deque(maxlen=capacity)
+        self._file = None
+        self._lock:threading.Lock = threading.Lock()
+        self._wake:threading.Event = threading.Event()
+        self._stop:threading.Event = threading.Event()
+        self._thread:Optional[threading.Thread] = None
+
+    def __len__(self) -> int:
+        return len(self._events)
+
+    def record(self, kind:str, message:Optional[str]=None, **fields) -> None:
+        r"""
+        adds an event to the journal
+
+        parameters
+        -------------
+        kind: (str) - kind of the event (eg: order, fill, sl_modified, closed, risk)
+
+        message: (str, None) - line(s) printed to the console for the event, None for
+        events that are only written to the file
+
+        the keyword arguments are the event's fields, they must be JSON serialisable
+        """
+        n:int = len(self._events)
+        if n == self.capacity: self.dropped += 1
+        self._events.append((self.clock(), kind, fields, message))
+        if n + 1 == self.capacity // 2: self._wake.set()
+
+    def flush(self) -> int:
+        r"""
+        writes the buffered events to the file and prints their console messages
+
+        returns
+        -------------
+        returns the number of events flushed
+        """
+        with self._lock:
+            # only the events buffered so far, events recorded meanwhile wait for the next flush
+            events:List[JournalEvent] = []
+            for _ in range(len(self._events)):
+                try:
+                    events.append(self._events.popleft())
+                except IndexError:
+                    break
+            if len(events) == 0: return 0
+
+            if self.path is not None:
+                try:
+                    if self._file is None: self._file = open(self.path, 'a')
+                    self._file.write(''.join(
+                        json.dumps({'time': event_time, 'kind': kind, **fields}, default=_to_json) + '\n'
+                        for event_time, kind, fields, _ in events
+                    ))
+                    self._file.flush()
+                except OSError as e:
+                    print(f'failed to write the journal {self.path}: {e}')
+
+            if self.console:
+                messages:str = ''.join(message + '\n' for _, _, _, message in events if message is not None)
+                if messages:
+                    sys.stdout.write(messages)
+                    sys.stdout.flush()
+
+            return len(events)
+
+    def start(self) -> None:
+        r"""
+        starts the background writer thread
+        """
+        if self._thread is not None: return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._write_loop, name='journal-writer', daemon=True)
+        self._thread.start()
+
+    def close(self) -> None:
+        r"""
+        stops the writer, flushes the remaining events and closes the file
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+        if self.dropped > 0:
+            print(f'the journal buffer was full, {self.dropped} events were dropped')
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+    def _write_loop(self) -> None:
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+
+
+# journal of the bot's trading events
+_journal:Optional[TradeJournal] = None
+
+
+def get_journal() -> TradeJournal:
+    r"""
+    returns the journal of the bot's trading events, created on first use (console
+    only, with its writer started)
+    """
+    global _journal
+    if _journal is None:
+        _journal = TradeJournal()
+        _journal.start()
+    return _journal
+
+
+def set_journal(journal:TradeJournal) -> None:
+    r"""
+    sets the journal of the bot's trading events
+    """
+    global _journal
+    _journal = journal
@@ -0,0 +1,188 @@
+import math
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+from brokers import Broker, TradeDeal, TradePosition
+from .utilities import get_broker, get_magic_number
+
+# seconds a deal may be added to the history after its (server) time, eg: by a
+# terminal that is still synchronising. The deals of that window are fetched
+# again on every sync, and deduplicated by ticket
+DEAL_LOOKBACK:float = 60.0
+
+# upper bound of the fetched window past the server clock, so that a wrong
+# clock offset does not hide the newest deals
+_FETCH_AHEAD:float = 86400.0
+
+
+class PnLLedger:
+    r"""
+    Session profit and loss of the bot's positions, kept up to date from bulk deal
+    history queries instead of one history_deals_get(position=...) call per closed
+    position. Every sync fetches the deals made since the previous one with a
+    single history_deals_get(date_from, date_to), and adds the profit, commission,
+    swap and fee of the session's deals to the realized P&L. The floating P&L is
+    taken from a positions snapshot (eg: PositionManager.positions), so the
+    session P&L is always available without a broker call.
+
+    The deal fetch (fetch) and its bookkeeping (apply) are separate, so that the
+    fetch can run off the trading loop (eg: on an OrderPipeline); sync does both.
+
+    parameters
+    -------------
+    magic: (int, None) - magic number of the session's orders, defaults to the bot's
+    magic number (see get_magic_number)
+
+    symbols: (Sequence[str], None) - symbols of the session's positions, None for all
+
+    since: (float, None) - server time (unix timestamp) the session started at, the
+    deals made before it are ignored. Defaults to the broker's clock
+
+    clock_offset: (float) - broker server time minus UTC (seconds)
+
+    lookback: (float) - seconds of deals fetched again on every sync (default=60)
+
+    broker: (Broker, None) - broker to query, defaults to the bot's broker
+    """
+    def __init__(
+        self,
+        magic:Optional[int]=None,
+        symbols:Optional[Sequence[str]]=None,
+        since:Optional[float]=None,
+        clock_offset:float=0.0,
+        lookback:float=DEAL_LOOKBACK,
+        broker:Optional[Broker]=None):
+
+        self.broker:Broker = broker or get_broker()
+        self.magic:int = magic if magic is not None else get_magic_number()
+        self.symbols:Optional[Tuple[str, ...]] = tuple(symbols) if symbols is not None else None
+        self.clock_offset:float = clock_offset
+        self.lookback:float = lookback
+        # deal times are whole seconds
+        self.since:int = math.floor(since if since is not None else self.broker.time() + clock_offset)
+
+        # P&L of the session's deals, and of its open positions at the latest snapshot
+        self.realized:float = 0.0
+        self.floating:float = 0.0
+        # time of the newest deal seen, the next sync fetches from it (minus the lookback)
+        self.cursor:int = self.since
+
+        # net P&L of the deals of every position, open positions / closed positions
+        # that have not been taken yet (see take_closed)
+        self._open:Dict[int, float] = {}
+        self._closed:Dict[int, float] = {}
+        # ticket -> time of the deals in the lookback window, to skip them when fetched again
+        self._seen:Dict[int, int] = {}
+
+    @property
+    def pnl(self) -> float:
+        r"""
+        session P&L: realized plus floating
+        """
+        return self.realized + self.floating
+
+    def fetch(self) -> Optional[Tuple[TradeDeal, ...]]:
+        r"""
+        fetches the deals made since the latest sync (minus the lookback window),
+        without updating the ledger (see apply). Safe to call off the trading loop
+
+        returns
+        -------------
+        returns the deals, or None if they could not be fetched
+        """
+        date_to:float = self.broker.time() + self.clock_offset + _FETCH_AHEAD
+        return self.broker.history_deals_get(int(max(self.cursor - self.lookback, self.since)), int(date_to))
+
+    def apply(self, deals:Optional[Iterable[TradeDeal]]) -> int:
+        r"""
+        adds the session's new deals to the ledger
+
+        parameters
+        -------------
+        deals: (Iterable[TradeDeal], None) - deals returned by fetch, None is ignored
+
+        returns
+        -------------
+        returns the number of deals added
+        """
+        if deals is None: return 0
+
+        n_added:int = 0
+        for deal in deals:
+            if deal.ticket in self._seen or deal.time < self.since: continue
+            self._seen[deal.ticket] = deal.time
+            self.cursor = max(self.cursor, deal.time)
+            if deal.magic != self.magic or (self.symbols is not None and deal.symbol not in self.symbols): continue
+
+            net:float = deal.profit + deal.commission + deal.swap + deal.fee
+            self.realized += net
+            self._open[deal.position_id] = self._open.get(deal.position_id, 0.0) + net
+            if deal.entry in (self.broker.DEAL_ENTRY_OUT, self.broker.DEAL_ENTRY_OUT_BY):
+                self._closed[deal.position_id] = self._closed.get(deal.position_id, 0.0) + self._open.pop(deal.position_id)
+            n_added += 1
+
+        # only the deals that can be fetched again are remembered
+        oldest:float = self.cursor - self.lookback
+        if len(self._seen) > 0 and min(self._seen.values()) < oldest:
+            self._seen = {ticket:time for ticket, time in self._seen.items() if time >= oldest}
+        return n_added
+
+    def sync(self) -> int:
+        r"""
+        fetches and adds the session's new deals, see fetch and apply
+
+        returns
+        -------------
+        returns the number of deals added
+        """
+        return self.apply(self.fetch())
+
+    def update_floating(self, positions:Iterable[TradePosition]) -> float:
+        r"""
+        sets the floating P&L from a snapshot of the session's open positions
+
+        parameters
+        -------------
+        positions: (Iterable[TradePosition]) - open positions, eg: the values of
+        PositionManager.positions
+
+        returns
+        -------------
+        returns the floating P&L
+        """
+        self.floating = sum(position.profit + position.swap for position in positions)
+        return self.floating
+
+    def take_closed(self, position_id:int) -> Optional[float]:
+        r"""
+        removes a closed position from the ledger
+
+        parameters
+        -------------
+        position_id: (int) - position id of the position
+
+        returns
+        -------------
+        returns the net P&L of the position's deals (profit, commission, swap and
+        fee), or None if its closing deal has not been synced yet
+        """
+        return self._closed.pop(position_id, None)
+
+    def get_state(self) -> Dict[str, Any]:
+        r"""
+        JSON serialisable state of the ledger, see set_state
+        """
+        return {
+            'since': self.since, 'cursor': self.cursor, 'realized': self.realized,
+            'open': {str(position_id):net for position_id, net in self._open.items()},
+            'closed': {str(position_id):net for position_id, net in self._closed.items()},
+            'seen': {str(ticket):time for ticket, time in self._seen.items()},
+        }
+
+    def set_state(self, state:Dict[str, Any]) -> None:
+        r"""
+        restores a state returned by get_state (eg: after a restart), the next sync
+        fetches the deals made since it was saved
+        """
+        self.since, self.cursor, self.realized = state['since'], state['cursor'], state['realized']
+        self._open = {int(position_id):net for position_id, net in state['open'].items()}
+        self._closed = {int(position_id):net for position_id, net in state['closed'].items()}
+        self._seen = {int(ticket):time for ticket, time in state['seen'].items()}
@@ -0,0 +1,355 @@
+from __future__ import annotations
+import os
+import json
+import math
+import time
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+# the HTTP server is only imported when an endpoint is served, see MetricsExporter.start
+if TYPE_CHECKING: from http.server import ThreadingHTTPServer
+
+# latency histograms cover 1 microsecond to ~20 minutes, every bucket is 5% wider
+# than the previous one, so percentiles are exact to within 5%
+_MIN_LATENCY:float = 1e-6
+_GROWTH:float = 1.05
+_N_BUCKETS:int = 430
+
+
+class LatencyHistogram:
+    r"""
+    Fixed-size histogram of durations with logarithmic buckets. Recording is O(1)
+    and allocation free, percentiles are read from the bucket counts
+    """
+    __slots__ = ('counts', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.counts:List[int] = [0] * _N_BUCKETS
+        self.count:int = 0
+        self.total:float = 0.0
+        self.max:float = 0.0
+
+    def record(self, seconds:float) -> None:
+        r"""
+        adds a duration (in seconds)
+        """
+        bucket:int = 0
+        if seconds > _MIN_LATENCY:
+            bucket = min(_N_BUCKETS - 1, int(math.log(seconds / _MIN_LATENCY) / math.log(_GROWTH)) + 1)
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max: self.max = seconds
+
+    def percentile(self, q:float) -> float:
+        r"""
+        q-th percentile (0 - 100) of the recorded durations, the upper bound of the
+        bucket it falls in (capped at the maximum)
+        """
+        if self.count == 0: return 0.0
+
+        rank:float = q / 100 * self.count
+        cumulative:int = 0
+        for bucket, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count > 0:
+                return min(self.max, _MIN_LATENCY * _GROWTH ** bucket)
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        r"""
+        count, mean, p50, p99 and max of the recorded durations (in milliseconds)
+        """
+        return {
+            'count': self.count,
+            'mean_ms': self.total / self.count * 1e3 if self.count > 0 else 0.0,
+            'p50_ms': self.percentile(50) * 1e3,
+            'p99_ms': self.percentile(99) * 1e3,
+            'max_ms': self.max * 1e3,
+        }
+
+
+class SlippageStats:
+    r"""
+    Running statistics of the difference between the price an order was sent at
+    and the price it was filled at, positive values are adverse (a buy filled
+    higher or a sell filled lower than requested)
+    """
+    __slots__ = ('count', 'total', 'total_points', 'worst', 'adverse')
+
+    def __init__(self):
+        self.count:int = 0
+        self.total:float = 0.0
+        self.total_points:float = 0.0
+        self.worst:float = 0.0
+        self.adverse:int = 0
+
+    def record(self, slippage:float, point:Optional[float]=None) -> None:
+        self.count += 1
+        self.total += slippage
+        if point: self.total_points += slippage / point
+        if slippage > self.worst: self.worst = slippage
+        if slippage > 0: self.adverse += 1
+
+    def summary(self) -> Dict[str, float]:
+        return {
+            'count': self.count,
+            'mean': self.total / self.count if self.count > 0 else 0.0,
+            'mean_points': self.total_points / self.count if self.count > 0 else 0.0,
+            'worst': self.worst,
+            'adverse_pct': self.adverse / self.count * 100 if self.count > 0 else 0.0,
+        }
+
+
+class _StageTimer:
+    # reusable context manager that records the time spent in a block
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram:LatencyHistogram):
+        self.histogram:LatencyHistogram = histogram
+        self.start:float = 0.0
+
+    def __enter__(self) -> "_StageTimer":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.histogram.record(time.perf_counter() - self.start)
+
+
+class StartupTimer:
+    r"""
+    Durations of the startup phases of a session (eg: imports, broker connection,
+    symbols, history backfill), from the start of the process to its first
+    decision. Every mark ends a phase, which began at the previous mark
+
+    parameters
+    -------------
+    started_at: (float, None) - time.perf_counter() value the startup began at, eg:
+    taken before the imports, defaults to now
+    """
+    def __init__(self, started_at:Optional[float]=None):
+        self.started_at:float = started_at if started_at is not None else time.perf_counter()
+        self.phases:Dict[str, float] = {}
+        # the first decision has been made, later marks are ignored
+        self.finished:bool = False
+        self._last:float = self.started_at
+
+    @property
+    def total(self) -> float:
+        r"""
+        seconds from the start to the latest mark
+        """
+        return self._last - self.started_at
+
+    def mark(self, phase:str, last:bool=False) -> float:
+        r"""
+        ends a phase
+
+        parameters
+        -------------
+        phase: (str) - name of the phase, the durations of a repeated phase add up
+
+        last: (bool) - the phase ends the startup (eg: with the first decision)
+
+        returns
+        -------------
+        returns the duration of the phase (seconds), 0 once the startup is finished
+        """
+        if self.finished: return 0.0
+
+        now:float = time.perf_counter()
+        seconds:float = now - self._last
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+        self._last = now
+        self.finished = last
+        return seconds
+
+    def summary(self) -> Dict[str, Any]:
+        r"""
+        duration of every phase and the total (in milliseconds)
+        """
+        return {
+            'phases_ms': {phase:seconds * 1e3 for phase, seconds in self.phases.items()},
+            'total_ms': self.total * 1e3,
+            'finished': self.finished,
+        }
+
+    def report(self) -> str:
+        r"""
+        one line breakdown of the phases, eg: for the console
+        """
+        phases:str = ', '.join(f'{phase} {seconds * 1e3:.1f} ms' for phase, seconds in self.phases.items())
+        return f'startup: {phases} (total {self.total * 1e3:.1f} ms)'
+
+
+class Metrics:
+    r"""
+    Latency histograms per stage of the trading loop (eg: rate fetch, strategy
+    evaluation, order_send round trip) and order slippage per symbol
+
+    usage
+    -------------
+    with metrics.timer('order_send'):
+        order = make_trade(...)
+    """
+    def __init__(self):
+        self.started_at:float = time.time()
+        self.stages:Dict[str, LatencyHistogram] = {}
+        self.slippage:Dict[str, SlippageStats] = {}
+        self._timers:Dict[str, _StageTimer] = {}
+        # startup phases of the session, see StartupTimer
+        self.startup:Optional[StartupTimer] = None
+
+    def timer(self, stage:str) -> _StageTimer:
+        r"""
+        context manager that records the duration of its block in the stage's histogram
+        """
+        timer:Optional[_StageTimer] = self._timers.get(stage)
+        if timer is None:
+            timer = self._timers[stage] = _StageTimer(self.histogram(stage))
+        return timer
+
+    def histogram(self, stage:str) -> LatencyHistogram:
+        r"""
+        latency histogram of a stage, created on first use
+        """
+        if stage not in self.stages: self.stages[stage] = LatencyHistogram()
+        return self.stages[stage]
+
+    def observe(self, stage:str, seconds:float) -> None:
+        r"""
+        records a duration (in seconds) measured elsewhere
+        """
+        self.histogram(stage).record(seconds)
+
+    def record_fill(self, symbol:str, buy:bool, requested:float, filled:float, point:Optional[float]=None) -> None:
+        r"""
+        records the slippage of a filled order
+
+        parameters
+        -------------
+        symbol: (str) - symbol of the order
+
+        buy: (bool) - True for a buy order, else False
+
+        requested: (float) - price the order was sent at (the ask / bid used by make_trade)
+
+        filled: (float) - price the order was filled at
+
+        point: (float, None) - point size of the symbol, to also report slippage in points
+        """
+        if symbol not in self.slippage: self.slippage[symbol] = SlippageStats()
+        self.slippage[symbol].record((filled - requested) if buy else (requested - filled), point)
+
+    def snapshot(self) -> Dict[str, Any]:
+        r"""
+        summary of every stage and symbol (and of the startup phases), as a JSON serialisable dictionary
+        """
+        return {
+            'time': time.time(),
+            'uptime_secs': time.time() - self.started_at,
+            'stages': {stage:histogram.summary() for stage, histogram in list(self.stages.items())},
+            'slippage': {symbol:stats.summary() for symbol, stats in list(self.slippage.items())},
+            'startup': self.startup.summary() if self.startup is not None else None,
+        }
+
+    def write(self, path:str) -> None:
+        r"""
+        writes the snapshot to a JSON file, atomically (readers never see a
+        partially written file)
+        """
+        tmp_path:str = f'{path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(self.snapshot(), f, indent=2)
+        os.replace(tmp_path, path)
+
+
+class MetricsExporter:
+    r"""
+    Exports a Metrics snapshot from a background (daemon) thread, to a JSON file
+    every `interval` seconds and / or on a local HTTP endpoint (GET /metrics)
+
+    parameters
+    -------------
+    metrics: (Metrics) - metrics to export
+
+    path: (str, None) - JSON file to write the snapshot to
+
+    port: (int, None) - port of the HTTP endpoint, served on 127.0.0.1 only
+
+    interval: (float) - seconds between file writes (default=10)
+    """
+    def __init__(
+        self, metrics:"Metrics", path:Optional[str]=None, port:Optional[int]=None, interval:float=10.0):
+        self.metrics:Metrics = metrics
+        self.path:Optional[str] = path
+        self.port:Optional[int] = port
+        self.interval:float = interval
+        self._stop:threading.Event = threading.Event()
+        self._threads:List[threading.Thread] = []
+        self._server:Optional[ThreadingHTTPServer] = None
+
+    def start(self) -> None:
+        r"""
+        starts the file writer and / or HTTP server threads
+        """
+        if self.path is not None:
+            self._threads.append(threading.Thread(target=self._write_loop, name='metrics-writer', daemon=True))
+
+        if self.port is not None:
+            from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+            metrics:Metrics = self.metrics
+
+            class Handler(BaseHTTPRequestHandler):
+                def do_GET(self) -> None:
+                    if self.path.rstrip('/') not in ('', '/metrics'):
+                        self.send_error(404)
+                        return
+                    body:bytes = json.dumps(metrics.snapshot()).encode()
+                    self.send_response(200)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+
+                def log_message(self, *args) -> None:
+                    # keep the bot's console output clean
+                    pass
+
+            self._server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+            self._threads.append(
+                threading.Thread(target=self._server.serve_forever, name='metrics-server', daemon=True)
+            )
+
+        for thread in self._threads: thread.start()
+
+    def stop(self) -> None:
+        r"""
+        stops the threads, a final snapshot is written to the file
+        """
+        self._stop.set()
+        if self._server is not None: self._server.shutdown()
+        for thread in self._threads: thread.join()
+        self._threads = []
+        if self.path is not None: self.metrics.write(self.path)
+
+    def _write_loop(self) -> None:
+        while not self._stop.wait(self.interval):
+            try:
+                self.metrics.write(self.path)
+            except OSError as e:
+                print(f'failed to write metrics to {self.path}: {e}')
+
+
+# metrics of the bot's trading loop
+_metrics:Optional[Metrics] = None
+
+
+def get_metrics() -> Metrics:
+    r"""
+    returns the metrics of the bot's trading loop, created on first use
+    """
+    global _metrics
+    if _metrics is None: _metrics = Metrics()
+    return _metrics
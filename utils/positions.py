@@ -0,0 +1,133 @@
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple, Union
+from brokers import Broker, OrderSendResult, TradePosition
+from .utilities import get_broker, get_magic_number, trail_sl
+
+
+class PositionManager:
+    r"""
+    Keeps track of the bot's open positions from a single positions_get call per
+    refresh, instead of one positions_get(ticket=...) call per position. The
+    snapshot is filtered by symbol and magic number, diffed against the tracked
+    tickets to find the closed positions, and reused for every trailing stop loss
+    update until the next refresh.
+
+    parameters
+    -------------
+    symbols: (Sequence[str], None) - symbols of the tracked positions, None for all
+    symbols. With a single symbol the snapshot is fetched with positions_get(symbol=...)
+
+    magic: (int, None) - magic number of the session's orders, defaults to the bot's
+    magic number (see get_magic_number)
+
+    broker: (Broker, None) - broker to query, defaults to the bot's broker
+    """
+    def __init__(
+        self, symbols:Optional[Sequence[str]]=None, magic:Optional[int]=None, broker:Optional[Broker]=None):
+
+        self.symbols:Optional[Tuple[str, ...]] = tuple(symbols) if symbols is not None else None
+        self.magic:int = magic if magic is not None else get_magic_number()
+        self.broker:Broker = broker or get_broker()
+
+        # tracked ticket -> owner (eg: the instrument that opened the position)
+        self.tickets:Dict[int, Any] = {}
+        # latest snapshot of the session's open positions, by ticket
+        self.positions:Dict[int, TradePosition] = {}
+
+    def __len__(self) -> int:
+        return len(self.tickets)
+
+    def __contains__(self, ticket:int) -> bool:
+        return ticket in self.tickets
+
+    def track(self, ticket:int, owner:Hashable=None) -> None:
+        r"""
+        starts tracking a position
+
+        parameters
+        -------------
+        ticket: (int) - position id (ticket) of the position
+
+        owner: (Hashable) - owner of the position, returned with it once it closes
+        """
+        self.tickets[ticket] = owner
+
+    def owned(self, owner:Hashable) -> List[int]:
+        r"""
+        tickets of the tracked positions of an owner
+        """
+        return [ticket for ticket, ticket_owner in self.tickets.items() if ticket_owner == owner]
+
+    def refresh(self) -> Optional[Dict[int, Any]]:
+        r"""
+        takes a new snapshot of the open positions and stops tracking the closed ones
+
+        returns
+        -------------
+        returns the closed tickets with their owners, or None (and keeps the previous
+        snapshot) if the positions could not be fetched
+        """
+        positions:Optional[Tuple[TradePosition, ...]]
+        if self.symbols is not None and len(self.symbols) == 1:
+            positions = self.broker.positions_get(symbol=self.symbols[0])
+        else:
+            positions = self.broker.positions_get()
+        if positions is None: return None
+
+        self.positions = {
+            position.ticket:position for position in positions
+            if position.magic == self.magic and (self.symbols is None or position.symbol in self.symbols)
+        }
+
+        closed:Dict[int, Any] = {
+            ticket:owner for ticket, owner in self.tickets.items() if ticket not in self.positions
+        }
+        for ticket in closed: del self.tickets[ticket]
+        return closed
+
+    def update_prices(self, symbol:str, bid:float, ask:float) -> int:
+        r"""
+        sets the current price of the snapshot's positions of a symbol to the latest
+        tick, so that they can be trailed between refreshes
+
+        parameters
+        -------------
+        symbol: (str) - symbol of the tick
+
+        bid, ask: (float) - prices of the tick, long positions close at the bid and
+        short positions at the ask
+
+        returns
+        -------------
+        returns the number of positions updated
+        """
+        n_updated:int = 0
+        for ticket, position in self.positions.items():
+            if position.symbol != symbol: continue
+            price:float = bid if position.type == self.broker.ORDER_TYPE_BUY else ask
+            self.positions[ticket] = position._replace(price_current=price)
+            n_updated += 1
+        return n_updated
+
+    def trail(
+        self, ticket:int, default_sl_points:float, max_dist_sl:float,
+        trail_amount:float) -> Union[int, OrderSendResult, TradePosition]:
+        r"""
+        trails the stop loss of a tracked position from the latest snapshot, the
+        parameters and result are those of trail_sl. A stop loss that is moved is
+        also moved in the snapshot, so that the position is not trailed twice from
+        the same stop loss before the next refresh
+        """
+        result:Union[int, OrderSendResult, TradePosition] = trail_sl(
+            position_id=ticket,
+            default_sl_points=default_sl_points,
+            max_dist_sl=max_dist_sl,
+            trail_amount=trail_amount,
+            snapshot=self.positions
+        )
+
+        # MetaTrader5 results are not brokers.OrderSendResult instances
+        if getattr(result, 'retcode', None) == self.broker.TRADE_RETCODE_DONE:
+            request = result.request
+            sl:float = request['sl'] if isinstance(request, dict) else request.sl
+            if ticket in self.positions: self.positions[ticket] = self.positions[ticket]._replace(sl=sl)
+        return result
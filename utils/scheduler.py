@@ -0,0 +1,153 @@
+import math
+from typing import List, Optional, Tuple
+from brokers import Broker
+from .utilities import get_broker
+
+
+class BarScheduler:
+    r"""
+    Decides when the trading loop should poll for bars and when it should run
+    position maintenance, instead of doing both on a fixed 40 ms loop. It sleeps
+    (on the broker's clock) until shortly before the next bar boundary, polls 
+    tightly in that window until the new bar shows up, and runs maintenance on
+    its own cadence in between.
+
+    Bar times are in the broker server's time, so the boundaries are shifted by
+    the server clock offset. The offset is re-aligned from the bar open times if
+    a new bar shows up before the expected boundary, or consistently late.
+
+    parameters
+    -------------
+    period: (int) - bar duration in seconds
+
+    clock_offset: (float) - broker server time minus local (UTC) time, in seconds
+
+    pre_open: (float) - seconds before the bar boundary at which tight polling starts
+
+    poll_interval: (float) - seconds between polls around the bar boundary
+
+    poll_window: (float) - seconds after the bar boundary to keep polling tightly
+    for, if the new bar has not shown up yet (eg: market closed)
+
+    idle_poll_interval: (float) - seconds between polls outside the boundary window,
+    a safety net for a wrong clock offset
+
+    maintenance_interval: (float) - seconds between position maintenance runs
+
+    broker: (Broker, None) - broker whose clock is used, defaults to the bot's broker
+    """
+    def __init__(
+        self, 
+        period:int, 
+        clock_offset:float=0.0, 
+        pre_open:float=0.5, 
+        poll_interval:float=0.04,
+        poll_window:float=10.0, 
+        idle_poll_interval:float=5.0, 
+        maintenance_interval:float=0.5,
+        broker:Optional[Broker]=None):
+
+        self.period:int = period
+        self.clock_offset:float = clock_offset
+        self.pre_open:float = pre_open
+        self.poll_interval:float = poll_interval
+        self.poll_window:float = poll_window
+        self.idle_poll_interval:float = idle_poll_interval
+        self.maintenance_interval:float = maintenance_interval
+        self.broker:Broker = broker or get_broker()
+
+        self._last_bar_time:Optional[float] = None
+        self._late_arrivals:List[float] = []
+
+        now:float = self.broker.time()
+        # poll and maintain right away on the first wait
+        self._next_poll:float = now
+        self._next_maintenance:float = now
+        self._awaited_boundary:float = self.next_boundary(now)
+
+    def next_boundary(self, now:float) -> float:
+        r"""
+        local time of the first bar boundary after `now`
+
+        parameters
+        -------------
+        now: (float) - local time (unix timestamp)
+
+        returns
+        -------------
+        returns the local time (unix timestamp) of the next bar boundary
+        """
+        server_now:float = now + self.clock_offset
+        return (math.floor(server_now / self.period) + 1) * self.period - self.clock_offset
+
+    def wait(self) -> Tuple[bool, bool]:
+        r"""
+        sleeps until the next poll or maintenance is due
+
+        returns
+        -------------
+        returns a Tuple of 2 booleans, whether to poll for bars and whether to
+        run position maintenance
+        """
+        wake:float = min(self._next_poll, self._next_maintenance)
+        now:float = self.broker.time()
+        if wake > now: 
+            self.broker.sleep(wake - now)
+            now = self.broker.time()
+
+        poll:bool = now >= self._next_poll
+        maintain:bool = now >= self._next_maintenance
+
+        if maintain:
+            self._next_maintenance = max(self._next_maintenance + self.maintenance_interval, now)
+        if poll:
+            self._schedule_poll(now)
+        return poll, maintain
+
+    def bar_received(self, bar_time:float) -> None:
+        r"""
+        tells the scheduler that the bar opened at `bar_time` has been received,
+        polling then stops until just before the next boundary
+
+        parameters
+        -------------
+        bar_time: (float) - open time of the newest bar (server time, unix timestamp)
+        """
+        now:float = self.broker.time()
+
+        if self._last_bar_time is not None and bar_time > self._last_bar_time:
+            # seconds between the bar's boundary (in local time) and its arrival
+            lateness:float = now - (bar_time - self.clock_offset)
+
+            if lateness < -self.pre_open:
+                # the bar cannot open before its boundary, the offset is wrong
+                self.clock_offset = bar_time - now
+                self._late_arrivals.clear()
+            elif lateness > self.poll_window:
+                # a single late bar may just be a quiet market, a run of them
+                # means the boundaries are early
+                self._late_arrivals.append(lateness)
+                if len(self._late_arrivals) == 3:
+                    self.clock_offset -= sorted(self._late_arrivals)[1]
+                    self._late_arrivals.clear()
+            else:
+                self._late_arrivals.clear()
+
+        if self._last_bar_time is None or bar_time > self._last_bar_time:
+            self._last_bar_time = bar_time
+        self._awaited_boundary = self.next_boundary(now)
+        self._schedule_poll(now)
+
+    def _schedule_poll(self, now:float) -> None:
+        window_start:float = self._awaited_boundary - self.pre_open
+        window_end:float = self._awaited_boundary + self.poll_window
+
+        if now >= window_end:
+            # the awaited bar never came (eg: market closed), wait for the next one
+            self._awaited_boundary = self.next_boundary(now)
+            window_start = self._awaited_boundary - self.pre_open
+
+        if now >= window_start:
+            self._next_poll = now + self.poll_interval
+        else:
+            self._next_poll = min(window_start, now + self.idle_poll_interval)
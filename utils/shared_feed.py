@@ -0,0 +1,312 @@
+import time
+import numpy as np
+from multiprocessing import shared_memory
+from typing import Optional, Tuple
+from brokers import RATES_DTYPE
+from bot_strategies import Bars
+from .bar_buffer import BarBuffer
+
+# header of a SharedBarRing: seqlock sequence (odd while the writer is publishing),
+# ring state, total number of bars appended, and the latest tick
+RING_HEADER_DTYPE:np.dtype = np.dtype([
+    ('seq', np.int64),
+    ('slot', np.int64),
+    ('count', np.int64),
+    ('appended', np.int64),
+    ('time_msc', np.int64),
+    ('bid', np.float64),
+    ('ask', np.float64),
+])
+
+# head / tail counters of a SharedQueue, on separate cache lines
+_QUEUE_HEADER_SIZE:int = 128
+
+
+class SharedBarRing:
+    r"""
+    Bars of a symbol / timeframe (and its latest tick) in a shared memory block,
+    written by one process and read by any number of processes without locks.
+
+    Like BarBuffer, every bar is written twice, at slot i and i + size, so the
+    latest bars are a contiguous (zero copy) slice of the block. The writer
+    publishes inside a seqlock: the header's sequence is odd while it writes, so
+    a reader retries a header read that overlapped a publish. A reader's closed
+    bars are never rewritten by later publishes until `margin` more bars have been
+    appended (see SharedBarReader.valid). This relies on stores being seen in
+    program order by other cores, as on the x86-64 CPUs the MetaTrader5 terminal
+    runs on.
+
+    parameters
+    -------------
+    window: (int) - number of bars readers see (the forming bar included)
+
+    margin: (int) - extra slots, bars a reader's view stays valid for while new
+    bars are appended (default=64)
+
+    name: (str, None) - name of the block to attach to, None creates a new block
+    """
+    def __init__(self, window:int, margin:int=64, name:Optional[str]=None):
+        self.window:int = window
+        self.margin:int = margin
+        self.size:int = window + margin
+
+        nbytes:int = RING_HEADER_DTYPE.itemsize + 2 * self.size * RATES_DTYPE.itemsize
+        self.owner:bool = name is None
+        self.shm:shared_memory.SharedMemory = (
+            shared_memory.SharedMemory(create=True, size=nbytes) if name is None
+            else shared_memory.SharedMemory(name=name)
+        )
+
+        self.header:np.ndarray = np.ndarray((1,), dtype=RING_HEADER_DTYPE, buffer=self.shm.buf)
+        self.storage:np.ndarray = np.ndarray(
+            (2 * self.size,), dtype=RATES_DTYPE, buffer=self.shm.buf, offset=RING_HEADER_DTYPE.itemsize
+        )
+        if self.owner:
+            self.header[0] = 0
+            self.header['slot'] = -1
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def spec(self) -> Tuple[str, int, int]:
+        r"""
+        (name, window, margin) arguments attaching a reader to the ring, eg: in
+        another process
+        """
+        return self.name, self.window, self.margin
+
+    def publish(self, feed:BarBuffer) -> int:
+        r"""
+        writes the bars of a bar buffer that are new or changed since the last
+        publish (the forming bar and the bars that opened since)
+
+        parameters
+        -------------
+        feed: (BarBuffer) - bar buffer of the ring's symbol / timeframe
+
+        returns
+        -------------
+        returns the number of bars appended
+        """
+        if len(feed) == 0: return 0
+
+        slot:int = int(self.header['slot'][0])
+        count:int = int(self.header['count'][0])
+        rates:np.ndarray = feed.view()
+        last_time:int = -1
+        if count > 0:
+            last_time = int(self.storage['time'][slot + self.size])
+            if feed.last_time == last_time:
+                # only the forming bar changed
+                self.header['seq'] += 1
+                self.storage[slot] = self.storage[slot + self.size] = rates[-1]
+                self.header['seq'] += 1
+                return 0
+
+            rates = rates[rates['time'] >= last_time]
+            if len(rates) == 0: return 0
+        rates = rates[-self.size:]
+
+        self.header['seq'] += 1
+        n_new:int = 0
+        for bar in rates:
+            if bar['time'] > last_time:
+                slot = (slot + 1) % self.size
+                last_time = int(bar['time'])
+                n_new += 1
+            self.storage[slot] = bar
+            self.storage[slot + self.size] = bar
+        self.header['slot'] = slot
+        self.header['count'] = min(count + n_new, self.size)
+        self.header['appended'] += n_new
+        self.header['seq'] += 1
+        return n_new
+
+    def publish_tick(self, time_msc:int, bid:float, ask:float) -> None:
+        r"""
+        writes the latest tick of the ring's symbol
+        """
+        self.header['seq'] += 1
+        self.header['time_msc'] = time_msc
+        self.header['bid'] = bid
+        self.header['ask'] = ask
+        self.header['seq'] += 1
+
+    def close(self) -> None:
+        r"""
+        detaches from the block, and frees it if this instance created it
+        """
+        # the views must be released before the block
+        self.header = self.storage = None
+        self.shm.close()
+        if self.owner: self.shm.unlink()
+
+
+class SharedBarReader:
+    r"""
+    Reader of a SharedBarRing, with the same last_time / view / bars interface as
+    BarBuffer so that it can be an instrument's feed. refresh() takes a consistent
+    snapshot of the ring's header, the views are of the bars of that snapshot
+
+    parameters
+    -------------
+    name, window, margin: - ring to attach to (see SharedBarRing.spec)
+    """
+    def __init__(self, name:str, window:int, margin:int):
+        self.ring:SharedBarRing = SharedBarRing(window, margin=margin, name=name)
+        self.window:int = window
+
+        self._slot:int = -1
+        self._count:int = 0
+        self.appended:int = 0
+        self.time_msc:int = 0
+        self.bid:float = 0.0
+        self.ask:float = 0.0
+
+    def __len__(self) -> int:
+        return min(self._count, self.window)
+
+    @property
+    def last_time(self) -> int:
+        r"""
+        open time (unix timestamp) of the newest (forming) bar of the snapshot,
+        raises IndexError if the ring is empty
+        """
+        if self._count == 0: raise IndexError('bar ring is empty')
+        return int(self.ring.storage['time'][self._slot + self.ring.size])
+
+    def refresh(self) -> int:
+        r"""
+        takes a snapshot of the ring
+
+        returns
+        -------------
+        returns the number of bars appended since the previous snapshot
+        """
+        header:np.ndarray = self.ring.header
+        while True:
+            seq:int = int(header['seq'][0])
+            if seq % 2 == 1:
+                time.sleep(0)
+                continue
+            snapshot:np.void = header[0].copy()
+            if int(header['seq'][0]) == seq: break
+
+        previous:int = self.appended
+        self._slot, self._count = int(snapshot['slot']), int(snapshot['count'])
+        self.appended = int(snapshot['appended'])
+        self.time_msc = int(snapshot['time_msc'])
+        self.bid, self.ask = float(snapshot['bid']), float(snapshot['ask'])
+        return self.appended - previous
+
+    def valid(self) -> bool:
+        r"""
+        True if the bars of the snapshot have not been overwritten since, ie: fewer
+        than `margin` bars were appended after it
+        """
+        return int(self.ring.header['appended'][0]) - self.appended < self.ring.margin
+
+    def view(self, closed_only:bool=False) -> np.ndarray:
+        r"""
+        zero copy view of the snapshot's bars (the latest `window`), oldest first
+        """
+        n:int = len(self)
+        end:int = self._slot + self.ring.size + 1
+        return self.ring.storage[end - n : end - (1 if closed_only and n > 0 else 0)]
+
+    def bars(self, closed_only:bool=False) -> Bars:
+        r"""
+        zero copy Bars of the snapshot's bars, oldest first
+        """
+        return Bars.from_records(self.view(closed_only=closed_only))
+
+    def close(self) -> None:
+        self.ring.close()
+
+
+class SharedQueue:
+    r"""
+    Bounded single producer, single consumer queue of fixed size records in a
+    shared memory block. The producer only writes the head counter and the
+    consumer only the tail counter, so neither takes a lock (with the same store
+    ordering assumption as SharedBarRing)
+
+    parameters
+    -------------
+    dtype: (np.dtype) - record layout
+
+    capacity: (int) - maximum number of queued records
+
+    name: (str, None) - name of the block to attach to, None creates a new block
+    """
+    def __init__(self, dtype:np.dtype, capacity:int=1024, name:Optional[str]=None):
+        self.dtype:np.dtype = np.dtype(dtype)
+        self.capacity:int = capacity
+
+        nbytes:int = _QUEUE_HEADER_SIZE + capacity * self.dtype.itemsize
+        self.owner:bool = name is None
+        self.shm:shared_memory.SharedMemory = (
+            shared_memory.SharedMemory(create=True, size=nbytes) if name is None
+            else shared_memory.SharedMemory(name=name)
+        )
+
+        counters:np.ndarray = np.ndarray((_QUEUE_HEADER_SIZE // 8,), dtype=np.int64, buffer=self.shm.buf)
+        self._head:np.ndarray = counters[0:1]
+        self._tail:np.ndarray = counters[8:9]
+        self.records:np.ndarray = np.ndarray(
+            (capacity,), dtype=self.dtype, buffer=self.shm.buf, offset=_QUEUE_HEADER_SIZE
+        )
+        if self.owner: counters[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def __len__(self) -> int:
+        return int(self._head[0] - self._tail[0])
+
+    def put(self, record:tuple, timeout:Optional[float]=None) -> bool:
+        r"""
+        appends a record, waiting while the queue is full
+
+        parameters
+        -------------
+        record: (tuple) - values of the record's fields
+
+        timeout: (float, None) - seconds to wait for room, None waits forever
+
+        returns
+        -------------
+        returns False if the queue was still full after the timeout, else True
+        """
+        head:int = int(self._head[0])
+        deadline:Optional[float] = time.monotonic() + timeout if timeout is not None else None
+        while head - int(self._tail[0]) >= self.capacity:
+            if deadline is not None and time.monotonic() >= deadline: return False
+            time.sleep(0.001)
+
+        self.records[head % self.capacity] = record
+        self._head[0] = head + 1
+        return True
+
+    def get_all(self) -> np.ndarray:
+        r"""
+        removes and returns every queued record, oldest first
+        """
+        tail:int = int(self._tail[0])
+        head:int = int(self._head[0])
+        if head == tail: return np.zeros(0, dtype=self.dtype)
+
+        idxs:np.ndarray = np.arange(tail, head) % self.capacity
+        records:np.ndarray = self.records[idxs]
+        self._tail[0] = head
+        return records
+
+    def close(self) -> None:
+        r"""
+        detaches from the block, and frees it if this instance created it
+        """
+        self._head = self._tail = self.records = None
+        self.shm.close()
+        if self.owner: self.shm.unlink()
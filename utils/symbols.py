@@ -0,0 +1,163 @@
+import os
+import json
+import time
+import threading
+from typing import Dict, NamedTuple, Optional, Tuple
+from brokers import Broker, SymbolInfo
+
+
+class SymbolSpec(NamedTuple):
+    r"""
+    static contract specification of a symbol
+    """
+    name:str
+    digits:int
+    point:float
+    trade_contract_size:float
+    volume_min:float
+    volume_max:float
+    volume_step:float
+
+
+class SymbolRegistry:
+    r"""
+    Cache of the broker's symbols and their contract specifications. The symbols
+    are loaded once with a single symbols_get call and refreshed in a background
+    thread every `ttl` seconds, so symbol checks and contract specs need no broker
+    call on the order path.
+
+    parameters
+    -------------
+    broker: (Broker) - broker to load the symbols from
+
+    ttl: (float) - seconds between background refreshes (default=3600)
+
+    path: (str, None) - JSON snapshot of the symbols, written after every load. If it
+    exists, the symbols are restored from it on first use instead of being loaded,
+    and the background thread refreshes them as soon as it starts (fast startup)
+    """
+    def __init__(self, broker:Broker, ttl:float=3600.0, path:Optional[str]=None):
+        self.broker:Broker = broker
+        self.ttl:float = ttl
+        self.path:Optional[str] = path
+        self._specs:Dict[str, SymbolSpec] = {}
+        self._loaded_at:Optional[float] = None
+        # the specs were restored from the snapshot and have not been loaded since
+        self._restored:bool = False
+        self._stop:threading.Event = threading.Event()
+        self._thread:Optional[threading.Thread] = None
+
+    def __contains__(self, symbol:str) -> bool:
+        return symbol in self.specs
+
+    def __len__(self) -> int:
+        return len(self.specs)
+
+    @property
+    def specs(self) -> Dict[str, SymbolSpec]:
+        r"""
+        contract specifications by symbol name, loaded on first access
+        """
+        if self._loaded_at is None and not self.restore(): self.load()
+        return self._specs
+
+    @property
+    def age(self) -> float:
+        r"""
+        seconds since the symbols were last loaded (inf if never)
+        """
+        return time.monotonic() - self._loaded_at if self._loaded_at is not None else float('inf')
+
+    def get(self, symbol:str) -> Optional[SymbolSpec]:
+        r"""
+        returns the contract specification of a symbol, None if it is unknown
+        """
+        return self.specs.get(symbol)
+
+    def load(self) -> bool:
+        r"""
+        (re)loads every symbol with a single symbols_get call, the previous specs are
+        kept if the call fails
+
+        returns
+        -------------
+        returns True if the symbols were loaded, else False
+        """
+        symbols:Optional[Tuple[SymbolInfo, ...]] = self.broker.symbols_get()
+        if symbols is None: return False
+
+        # the new dictionary replaces the old one in a single assignment, so readers
+        # on other threads never see a partially loaded registry
+        self._specs = {
+            info.name:SymbolSpec(
+                name=info.name, digits=info.digits, point=info.point,
+                trade_contract_size=info.trade_contract_size, volume_min=info.volume_min,
+                volume_max=info.volume_max, volume_step=info.volume_step
+            ) for info in symbols
+        }
+        self._loaded_at = time.monotonic()
+        self._restored = False
+        if self.path is not None: self.save()
+        return True
+
+    def save(self) -> None:
+        r"""
+        writes the symbols to the snapshot (path), atomically
+        """
+        tmp_path:str = f'{self.path}.tmp'
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump({'saved_at': time.time(), 'symbols': [list(spec) for spec in self._specs.values()]}, f)
+            os.replace(tmp_path, self.path)
+        except OSError as e:
+            print(f'failed to write the symbols snapshot {self.path}: {e}')
+
+    def restore(self) -> bool:
+        r"""
+        restores the symbols from the snapshot (path), without any broker call
+
+        returns
+        -------------
+        returns True if the symbols were restored, else False (no or unreadable snapshot)
+        """
+        if self.path is None or not os.path.isfile(self.path): return False
+        try:
+            with open(self.path, 'r') as f:
+                snapshot:dict = json.load(f)
+            specs:Dict[str, SymbolSpec] = {spec[0]:SymbolSpec(*spec) for spec in snapshot['symbols']}
+            saved_at:float = float(snapshot['saved_at'])
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f'failed to read the symbols snapshot {self.path}: {e}')
+            return False
+
+        self._specs = specs
+        # the age of the snapshot, on the monotonic clock
+        self._loaded_at = time.monotonic() - max(0.0, time.time() - saved_at)
+        self._restored = True
+        return True
+
+    def start(self) -> None:
+        r"""
+        starts refreshing the symbols in a background (daemon) thread every ttl seconds
+        """
+        if self._thread is not None and self._thread.is_alive(): return
+        if self._loaded_at is None and not self.restore(): self.load()
+
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._refresh_loop, name='symbol-registry', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        r"""
+        stops the background refresh thread
+        """
+        self._stop.set()
+        if self._thread is not None: self._thread.join()
+        self._thread = None
+
+    def _refresh_loop(self) -> None:
+        # restored symbols are refreshed right away, off the startup path
+        while not self._stop.wait(0.0 if self._restored else max(0.0, self.ttl - self.age)):
+            if not self.load():
+                # retry sooner than a full ttl when the broker is unavailable
+                self._stop.wait(min(self.ttl, 60.0))
@@ -0,0 +1,145 @@
+import numpy as np
+from typing import List, Optional
+from brokers import Broker, Tick, TICKS_DTYPE, COPY_TICKS_ALL, ticks_to_rates
+from .bar_buffer import BarBuffer
+from .utilities import get_broker
+
+
+class TickFeed:
+    r"""
+    Incremental reader of a symbol's ticks. Each update fetches, with
+    copy_ticks_from, only the ticks that arrived since the previous update, so
+    no tick is returned twice and none is skipped (ticks that share the last
+    seen millisecond included).
+
+    The first update starts the feed at the symbol's latest tick and returns no
+    ticks.
+
+    parameters
+    -------------
+    symbol: (str) - trade symbol
+
+    max_ticks: (int) - number of ticks fetched per copy_ticks_from call, more calls
+    are made if that many ticks arrived since the last update
+
+    broker: (Broker, None) - broker to fetch ticks from, defaults to the bot's broker
+    """
+    def __init__(self, symbol:str, max_ticks:int=10_000, broker:Optional[Broker]=None):
+        self.symbol:str = symbol
+        self.max_ticks:int = max_ticks
+        self.broker:Broker = broker or get_broker()
+
+        # latest tick, from the ticks fetched or symbol_info_tick
+        self.bid:Optional[float] = None
+        self.ask:Optional[float] = None
+        self._last_msc:Optional[int] = None
+        # number of ticks already returned at _last_msc
+        self._seen_at_last:int = 0
+
+    @property
+    def started(self) -> bool:
+        return self._last_msc is not None
+
+    @property
+    def time_msc(self) -> Optional[int]:
+        r"""
+        time (unix timestamp in milliseconds) of the latest tick, None before the first update
+        """
+        return self._last_msc
+
+    def update(self) -> np.ndarray:
+        r"""
+        fetches the ticks that arrived since the last update
+
+        returns
+        -------------
+        returns the new ticks in the layout of copy_ticks_from, oldest first
+        """
+        if self._last_msc is None:
+            tick:Optional[Tick] = self.broker.symbol_info_tick(self.symbol)
+            if tick is not None:
+                self.bid, self.ask = tick.bid, tick.ask
+                self._last_msc, self._seen_at_last = tick.time_msc, 1
+            return np.zeros(0, dtype=TICKS_DTYPE)
+
+        batches:List[np.ndarray] = []
+        count:int = self.max_ticks
+        while True:
+            # copy_ticks_from takes whole seconds, the ticks of the last second that
+            # were already returned are skipped
+            ticks:Optional[np.ndarray] = self.broker.copy_ticks_from(
+                self.symbol, self._last_msc // 1000, count, COPY_TICKS_ALL
+            )
+            if ticks is None or len(ticks) == 0: break
+
+            msc:np.ndarray = ticks['time_msc']
+            first:int = int(np.searchsorted(msc, self._last_msc, side='left'))
+            at_last:int = int(np.searchsorted(msc, self._last_msc, side='right')) - first
+            new:np.ndarray = ticks[first + min(at_last, self._seen_at_last):]
+            if len(new) == 0:
+                # a full page of already returned ticks, the second has more ticks
+                # than fit in a page
+                if len(ticks) < count: break
+                count *= 2
+                continue
+
+            last_msc:int = int(msc[-1])
+            self._seen_at_last = int(len(msc) - np.searchsorted(msc, last_msc, side='left'))
+            self._last_msc = last_msc
+            self.bid, self.ask = float(new['bid'][-1]), float(new['ask'][-1])
+            batches.append(new)
+
+            if len(ticks) < count: break
+            count = self.max_ticks
+
+        if len(batches) == 0: return np.zeros(0, dtype=TICKS_DTYPE)
+        return batches[0] if len(batches) == 1 else np.concatenate(batches)
+
+
+class TickBarBuffer(BarBuffer):
+    r"""
+    BarBuffer whose bars are built locally from ticks (see TickFeed) after the
+    initial backfill, instead of being downloaded with copy_rates_from_pos. The
+    forming bar is updated by every tick and a bar opens with the first tick of
+    its period, the same as the MetaTrader5 terminal's bars.
+
+    parameters
+    -------------
+    the parameters of BarBuffer
+    """
+    def add_ticks(self, ticks:np.ndarray) -> int:
+        r"""
+        adds ticks to the bars, the buffer must have been backfilled first
+
+        parameters
+        -------------
+        ticks: (np.ndarray) - new ticks in the layout of copy_ticks_from, oldest first
+
+        returns
+        -------------
+        returns the number of new bars appended
+        """
+        if self._count == 0: raise IndexError(f'no bars available for {self.symbol}')
+        if len(ticks) == 0: return 0
+
+        n_new:int = 0
+        last_time:int = self.last_time
+        for bar in ticks_to_rates(ticks, self.timeframe):
+            if bar['time'] > last_time:
+                self._append(bar)
+                last_time = int(bar['time'])
+                n_new += 1
+            elif bar['time'] == last_time:
+                self._merge(bar)
+
+        if n_new > 0: self._store_closed()
+        return n_new
+
+    def _merge(self, bar:np.void) -> None:
+        # ticks of the forming bar
+        forming:np.void = self._storage[self._slot]
+        forming['high'] = max(forming['high'], bar['high'])
+        forming['low'] = min(forming['low'], bar['low'])
+        forming['close'] = bar['close']
+        forming['tick_volume'] += bar['tick_volume']
+        self._storage[self._slot + self.capacity] = forming
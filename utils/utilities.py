@@ -1,14 +1,83 @@
+from __future__ import annotations
 import random
 import numpy as np
-import pandas as pd
-import MetaTrader5 as mt5
 from datetime import datetime
-from typing import Union, Optional, Tuple, List
+from typing import TYPE_CHECKING, Union, Optional, Tuple, Dict
+from brokers import (
+    Broker, 
+    MT5Broker, 
+    TradePosition, 
+    Tick,
+    OrderSendResult
+)
+from .symbols import SymbolRegistry
+from .journal import get_journal
+
+if TYPE_CHECKING: import pandas as pd
 
 # The magic number serves as a unique identifier for the current
-# session of the EA (Expert Advisor) running
+# session of the EA (Expert Advisor) running, it is restored when a
+# session is resumed (see set_magic_number)
 MAGIC_NUMBER:int = random.randint(10000, 214748000)
 
+# broker every utility talks to, defaults to the MetaTrader5 terminal
+_broker:Optional[Broker] = None
+
+# cached symbols of the broker, created on first use
+_symbol_registry:Optional[SymbolRegistry] = None
+
+
+def set_broker(broker:Broker) -> None:
+    r"""
+    sets the broker used by the bot (eg: MT5Broker or SimulatedBroker)
+
+    parameters
+    -------------
+    broker: (Broker) - broker instance
+    """
+    global _broker, _symbol_registry
+    _broker = broker
+    _symbol_registry = None
+
+
+def get_magic_number() -> int:
+    r"""
+    returns the magic number of the session's orders
+    """
+    return MAGIC_NUMBER
+
+
+def set_magic_number(magic:int) -> None:
+    r"""
+    sets the magic number of the session's orders, eg: to resume a session whose
+    positions were opened by a previous process
+
+    parameters
+    -------------
+    magic: (int) - magic number
+    """
+    global MAGIC_NUMBER
+    MAGIC_NUMBER = magic
+
+
+def get_broker() -> Broker:
+    r"""
+    returns the broker used by the bot, a MT5Broker is created if none was set
+    """
+    global _broker
+    if _broker is None: _broker = MT5Broker()
+    return _broker
+
+
+def get_symbol_registry() -> SymbolRegistry:
+    r"""
+    returns the symbol registry of the bot's broker, it is created (and loaded)
+    on first use
+    """
+    global _symbol_registry
+    if _symbol_registry is None: _symbol_registry = SymbolRegistry(get_broker())
+    return _symbol_registry
+
 
 def format_uts(uts:Union[int, float], dt_obj:bool=False) -> Union[str, datetime]:
     r"""
@@ -43,12 +112,10 @@ def is_valid_symbol(symbol:str) -> bool:
     -------------
     returns True if symbol is valid, else False
     """
-    all_symbols:Tuple[mt5.SymbolInfo] = mt5.symbols_get()
-    symbols:List[str] = [all_symbols[i].name for i in range(len(all_symbols))]
-    return symbol in symbols
+    return symbol in get_symbol_registry()
 
 
-def make_trade(symbol:str, buy:bool, position_id:Optional[int]=None, **kwargs) -> mt5.OrderSendResult:
+def make_trade(symbol:str, buy:bool, position_id:Optional[int]=None, **kwargs) -> OrderSendResult:
     r"""
     This function is responsible for making a buy or sell trade
 
@@ -77,14 +144,18 @@ def make_trade(symbol:str, buy:bool, position_id:Optional[int]=None, **kwargs) -
         
     returns
     -------------
-    returns MetaTrader5.OrderSendResult object for the order status and data
+    returns OrderSendResult object for the order status and data, None if the
+    order could not be sent (the broker's error is recorded in the journal)
     """
+    broker:Broker = get_broker()
     _default_kwargs:dict = {'sl_points':None, 'tp_points':None, 'deviation':0}
     kwargs = {**_default_kwargs, **kwargs}
 
     assert is_valid_symbol(symbol), f'{symbol} is an invalid symbol'
 
-    symbol_info:mt5.SymbolInfo = mt5.symbol_info(symbol)
+    # only the live price is fetched, the symbol itself is checked against the
+    # cached symbol registry
+    tick:Tick = broker.symbol_info_tick(symbol)
 
     order_type:int 
     price:float
@@ -92,18 +163,18 @@ def make_trade(symbol:str, buy:bool, position_id:Optional[int]=None, **kwargs) -
     tp:float = 0.0
 
     if buy:
-        order_type = mt5.ORDER_TYPE_BUY
-        price = symbol_info.ask
+        order_type = broker.ORDER_TYPE_BUY
+        price = tick.ask
         sl = price - float(kwargs['sl_points']) if (kwargs['sl_points'] is not None) and (kwargs['sl_points']!=0) else sl
         tp = price + float(kwargs['tp_points']) if (kwargs['tp_points'] is not None) and (kwargs['tp_points']!=0) else tp
     else:
-        order_type = mt5.ORDER_TYPE_SELL
-        price = symbol_info.bid
+        order_type = broker.ORDER_TYPE_SELL
+        price = tick.bid
         sl = price + float(kwargs['sl_points']) if (kwargs['sl_points'] is not None) and (kwargs['sl_points']!=0) else sl
         tp = price - float(kwargs['tp_points']) if (kwargs['tp_points'] is not None) and (kwargs['tp_points']!=0) else tp
 
     request = {
-        "action": mt5.TRADE_ACTION_DEAL,
+        "action": broker.TRADE_ACTION_DEAL,
         "symbol": symbol,
         "volume": float(kwargs['volume']),
         "type": order_type,
@@ -113,20 +184,24 @@ def make_trade(symbol:str, buy:bool, position_id:Optional[int]=None, **kwargs) -
         "deviation": kwargs['deviation'],
         "magic": MAGIC_NUMBER,
         "comment": "Peinjo bot",
-        "type_time": mt5.ORDER_TIME_GTC,
+        "type_time": broker.ORDER_TIME_GTC,
         "type_filling": kwargs['filling_mode'],
     }
 
     if position_id:request['position']=position_id
 
-    order:mt5.OrderSendResult = mt5.order_send(request)
-    if not order:print(mt5.last_error())
+    order:OrderSendResult = broker.order_send(request)
+    if not order:
+        error:Tuple[int, str] = broker.last_error()
+        get_journal().record(
+            'order', symbol=symbol, action='buy' if buy else 'sell', position_id=position_id, error=error,
+            message=f'{symbol}: order_send failed: {error}')
     return order
 
 
 def trail_sl(
     position_id:int, default_sl_points:float, max_dist_sl:float,
-    trail_amount:float) -> Union[int, mt5.OrderSendResult, mt5.TradePosition]:
+    trail_amount:float, snapshot:Optional[Dict[int, TradePosition]]=None) -> Union[int, OrderSendResult, TradePosition]:
     r"""
     This function implements the trailing stop loss for a trade
 
@@ -142,14 +217,23 @@ def trail_sl(
     trail_amount: (float) - incremental or decremental amount to add to stop loss price
     to trail current price
 
+    snapshot: (Dict[int, TradePosition], None) - open positions by ticket, taken with a 
+    single positions_get call. If provided, the position is looked up in it instead of 
+    being fetched from the broker (default=None)
+
     returns
     -------------
-    returns MetaTrader5.OrderSendResult object for the order status and data or the
+    returns OrderSendResult object for the order status and data or the
     position_id if ticket is closed
     """
-    position:Tuple[mt5.TradePosition] = mt5.positions_get(ticket=position_id)
-    if position:position:mt5.TradePosition = position[0]
-    else: 
+    broker:Broker = get_broker()
+    if snapshot is not None:
+        position:Optional[TradePosition] = snapshot.get(position_id)
+    else:
+        position:Tuple[TradePosition] = broker.positions_get(ticket=position_id)
+        position = position[0] if position else None
+
+    if position is None:
         return position_id
 
     order_type:int = position.type
@@ -164,73 +248,33 @@ def trail_sl(
     if dist_from_sl > max_dist_sl and  trail_amount != 0:
         if current_sl == 0:
             #setting default SL if no SL in position
-            new_sl = open_price + (-default_sl_points if (order_type==mt5.ORDER_TYPE_BUY) else default_sl_points)
+            new_sl = open_price + (-default_sl_points if (order_type==broker.ORDER_TYPE_BUY) else default_sl_points)
 
         else:
-            if order_type == mt5.ORDER_TYPE_BUY:
+            if order_type == broker.ORDER_TYPE_BUY:
                 new_sl = current_sl + trail_amount
 
-            elif order_type == mt5.ORDER_TYPE_SELL:
+            elif order_type == broker.ORDER_TYPE_SELL:
                 new_sl = current_sl - trail_amount
 
         request:dict = {
-            'action': mt5.TRADE_ACTION_SLTP,
+            'action': broker.TRADE_ACTION_SLTP,
             'position': position_id,
             'sl': float(new_sl),
             'tp':float(current_tp),
         }
 
-        order:mt5.OrderSendResult = mt5.order_send(request)
-        if not order:print(mt5.last_error())
+        order:OrderSendResult = broker.order_send(request)
+        if not order:
+            error:Tuple[int, str] = broker.last_error()
+            get_journal().record(
+                'order', symbol=position.symbol, action='sltp', position_id=position_id, sl=float(new_sl), error=error,
+                message=f'{position.symbol}: stop loss modification of position_id {position_id} failed: {error}')
         return order
 
     return position
 
 
-def check_profit(position_id:int) -> Optional[float]:
-    r"""
-    This function implements the trailing stop loss for a trade
-
-    parameters
-    -------------
-    position_id: (int) - position id of order
-
-    returns
-    -------------
-    returns profit value for position id, or raises assertation error, 
-    if order is not closed yet
-    """
-    position_history:mt5.TradeDeal = mt5.history_deals_get(position=position_id)
-    assert len(position_history) > 1, \
-        f'order at position {position_id} not closed'
-
-    return position_history[-1].profit + position_history[-1].commission
-
-
-def log_open_order(order:mt5.OrderSendResult, buy:bool) -> None:
-    r"""
-    This function checks if a trade symbol is valid / available
-
-    parameters
-    -------------
-    order: (mt5.OrderSendResult) - result object of sent order
-
-    buy: (bool) - to be set to True if order is buy order, else False
-    """
-    deal_order:str = 'buy' if buy else 'sell'
-    position:mt5.TradePosition = mt5.positions_get(ticket=order.order)[0]
-    open_time = format_uts(position.time, dt_obj=False)
-    sl:float = position.sl
-    tp:float = position.tp
-    open_price:float = position.price_open
-
-    print(f'\n{deal_order} order is opened at position_id:  {order.order}')
-    print(f'open price: -----------------------  {open_price}')
-    print(f'time of trade:---------------------  {open_time}')
-    print(f'initial stop loss:-----------------  {sl}')
-    print(f'initial take profit:---------------  {tp}')
-
-
 def compute_latest_atr(df:pd.DataFrame) -> float:
     r"""
     This function computes the latest ATR (Average True Range) value for a stock price dataframe
@@ -243,6 +287,7 @@ def compute_latest_atr(df:pd.DataFrame) -> float:
     -------------
     returns ATR value as float
     """
+    import pandas as pd
     HL_range:pd.Series = df['high'] - df['low']
     HCp_range:pd.Series = np.abs(df['high'] - df['close'].shift())
     LCp_range:pd.Series = np.abs(df['low'] - df['close'].shift())